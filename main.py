@@ -1,7 +1,8 @@
 import logging
 import os
 import asyncio
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_from_directory
+import threading
+from flask import Flask, Response, render_template, request, redirect, url_for, jsonify, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from prometheus_flask_exporter import PrometheusMetrics
@@ -54,6 +55,33 @@ except ImportError:
     logger.warning("AI agent modules not available")
     has_ai_agents = False
 
+# Import the raster tile renderer and TerraMap's tile cache
+try:
+    from services.terra_map.raster import PNG_CONTENT_TYPE, RASTER_STYLES, get_raster_tile_async
+    from services.terra_map.cache import TILE_HEADERS, tile_cache, etag_matches
+    from services.terra_map.tiles import is_valid_tile
+    from services.terra_map.versions import tile_versions
+    has_raster_tiles = True
+except ImportError:
+    logger.warning("Raster tile renderer not available")
+    has_raster_tiles = False
+
+# Event loop running the tile cache, its tile version listener and the
+# asyncpg pool, shared by all request threads
+tile_loop = None
+tile_loop_lock = threading.Lock()
+
+def get_tile_loop():
+    """Start the tile event loop in a background thread on first use"""
+    global tile_loop
+    with tile_loop_lock:
+        if tile_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="tile-loop", daemon=True).start()
+            asyncio.run_coroutine_threadsafe(tile_versions.start(), loop).result()
+            tile_loop = loop
+    return tile_loop
+
 # Create routes for main pages
 @app.route('/')
 def index():
@@ -114,8 +142,49 @@ def auth_login():
 
 @app.route('/api/tiles/<path:tile_path>')
 def map_tiles(tile_path):
-    # Simplified tile endpoint
-    return jsonify({"status": "success", "message": f"Map tiles for {tile_path}"})
+    # PNG raster tiles as z/x/y.png, styled with ?style=features|heatmap
+    if not has_raster_tiles:
+        return jsonify({"status": "error", "message": "Raster tiles are not available"}), 503
+    
+    try:
+        z, x, y = (int(part) for part in tile_path.removesuffix('.png').split('/'))
+    except ValueError:
+        return jsonify({"status": "error", "message": "Tile path must be z/x/y.png"}), 400
+    
+    if not is_valid_tile(z, x, y):
+        return jsonify({"status": "error", "message": f"Invalid tile coordinates: {z}/{x}/{y}"}), 400
+    
+    style = request.args.get('style', 'features')
+    if style not in RASTER_STYLES:
+        return jsonify({"status": "error", "message": f"Unsupported raster style: {style}"}), 400
+    
+    source = request.args.get('source')
+    layers = request.args.get('layers')
+    layer_list = layers.split(',') if layers else None
+    
+    # Same cache keys, ETags and revalidation headers as TerraMap's PNG tiles, so either service reuses the other's renders
+    loop = get_tile_loop()
+    tile_format = f"png:{style}"
+    headers = dict(TILE_HEADERS)
+    etag = tile_cache.tile_etag(z, x, y, tile_format, source, layer_list)
+    if etag:
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return Response(status=304, headers=headers)
+    
+    try:
+        tile_png = asyncio.run_coroutine_threadsafe(
+            tile_cache.get_or_render(
+                z, x, y, tile_format, source, layer_list,
+                lambda: get_raster_tile_async(z, x, y, style, source, layer_list)
+            ),
+            loop
+        ).result()
+    except Exception as e:
+        logger.error(f"Error rendering raster tile {tile_path}: {str(e)}")
+        return jsonify({"status": "error", "message": "Error rendering raster tile"}), 500
+    
+    return Response(tile_png, mimetype=PNG_CONTENT_TYPE, headers=headers)
 
 @app.route('/api/etl/<path:process_path>', methods=['GET', 'POST'])
 def etl_process(process_path):
@@ -1,10 +1,18 @@
+import io
 import os
+import re
+import json
+import queue
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Iterable, AsyncIterator, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import sqlalchemy
 from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+import asyncpg
 import pyodbc
 from contextlib import contextmanager
 
@@ -40,6 +48,21 @@ postgres_engine = create_engine(
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=postgres_engine)
 
+# Async PostgreSQL pool for request handlers, created on first use
+PG_ASYNC_POOL_MIN_SIZE = int(os.getenv("PG_ASYNC_POOL_MIN_SIZE", "2"))
+PG_ASYNC_POOL_MAX_SIZE = int(os.getenv("PG_ASYNC_POOL_MAX_SIZE", "20"))
+async_pool: Optional[asyncpg.Pool] = None
+async_pool_lock = asyncio.Lock()
+
+# Rows fetched per round trip by server-side cursors
+PG_STREAM_PREFETCH = int(os.getenv("PG_STREAM_PREFETCH", "500"))
+
+# Rows fetched per round trip when streaming from JCHARRISPACS
+JCHARRISPACS_FETCH_SIZE = int(os.getenv("JCHARRISPACS_FETCH_SIZE", "5000"))
+
+# Maximum concurrent JCHARRISPACS connections of one partitioned extract
+JCHARRISPACS_MAX_CONNECTIONS = int(os.getenv("JCHARRISPACS_MAX_CONNECTIONS", "8"))
+
 @contextmanager
 def get_db_session() -> Session:
     """
@@ -97,6 +120,69 @@ def get_sqlserver_cursor():
         if connection:
             connection.close()
 
+# Characters escaped in COPY text format values
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+class CopyStream(io.RawIOBase):
+    """
+    Readable file producing COPY text format lines from rows on demand
+    """
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        """
+        Initialize the stream
+        
+        Args:
+            rows: Rows of values; None is written as NULL, other values as str()
+        """
+        self._lines = (encode_copy_row(row) for row in rows)
+        self._buffer = b""
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        # Fill up with whole lines, keeping the remainder for the next read
+        while len(self._buffer) < len(buffer):
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+def encode_copy_row(row: Sequence[Any]) -> bytes:
+    """
+    Encode one row as a COPY text format line
+    """
+    return ("\t".join("\\N" if value is None else str(value).translate(COPY_ESCAPES) for value in row) + "\n").encode("utf-8")
+
+# Bulk load rows with COPY
+def copy_rows(session: Session, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]):
+    """
+    Stream rows into a PostgreSQL table with COPY FROM STDIN
+    
+    Rows are encoded as they are read, so the whole load is never held in
+    memory. The copy runs in the session's transaction.
+    
+    Args:
+        session: Database session
+        table: Target table name
+        columns: Target column names, in row order
+        rows: Rows of values
+    """
+    try:
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", CopyStream(rows))
+        finally:
+            cursor.close()
+    except Exception as e:
+        logger.error(f"COPY into {table} error: {str(e)}")
+        raise
+
 # Database initialization function
 def init_database():
     """
@@ -141,6 +227,155 @@ def execute_spatial_query(query: str, params: Optional[Dict[str, Any]] = None) -
         logger.error(f"Spatial query error: {str(e)}")
         return {"status": "error", "message": str(e)}
 
+# Names of server-side prepared statements must be plain SQL identifiers
+PREPARED_STATEMENT_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+# Execute a hot query through a server-side prepared statement on PostGIS
+def execute_prepared_query(name: str, query: str, args: Sequence[Any] = ()) -> Dict[str, Any]:
+    """
+    Execute a query through a server-side prepared statement and return the results
+    
+    The statement is prepared once per pooled connection and reused on later
+    calls, so PostgreSQL parses it once and can reuse its plan. Values are
+    always sent as bound parameters.
+    
+    Args:
+        name: Statement name, unique per distinct query text
+        query: SQL query string using $1, $2, ... placeholders
+        args: Positional query parameters
+        
+    Returns:
+        Query results as dictionary
+    """
+    if not PREPARED_STATEMENT_NAME.match(name):
+        raise ValueError(f"Invalid prepared statement name: {name}")
+    
+    try:
+        with get_db_session() as session:
+            connection = session.connection()
+            
+            # Prepared statements live as long as the DBAPI connection, which
+            # is also the lifetime of the pool's per-connection info dict
+            prepared = connection.info.setdefault("prepared_statements", set())
+            if name not in prepared:
+                connection.exec_driver_sql(f"PREPARE {name} AS {query}", execution_options={"no_parameters": True})
+                prepared.add(name)
+            
+            if args:
+                placeholders = ", ".join(["%s"] * len(args))
+                result = connection.exec_driver_sql(f"EXECUTE {name}({placeholders})", tuple(args))
+            else:
+                result = connection.exec_driver_sql(f"EXECUTE {name}", execution_options={"no_parameters": True})
+            
+            # Convert to list of dicts
+            column_names = result.keys()
+            rows = [dict(zip(column_names, row)) for row in result.fetchall()]
+            return {"status": "success", "data": rows}
+    except Exception as e:
+        logger.error(f"Prepared query {name} error: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+async def init_async_connection(connection: asyncpg.Connection):
+    """
+    Decode JSON columns to Python objects, matching the psycopg2 engine
+    """
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(
+            type_name,
+            encoder=json.dumps,
+            decoder=json.loads,
+            schema="pg_catalog"
+        )
+
+async def get_async_pool() -> asyncpg.Pool:
+    """
+    Get the asyncpg connection pool, creating it on first use
+    """
+    global async_pool
+    
+    if async_pool is None:
+        async with async_pool_lock:
+            if async_pool is None:
+                async_pool = await asyncpg.create_pool(
+                    get_postgres_connection_string(),
+                    min_size=PG_ASYNC_POOL_MIN_SIZE,
+                    max_size=PG_ASYNC_POOL_MAX_SIZE,
+                    init=init_async_connection
+                )
+                logger.info("Async PostgreSQL pool created")
+    
+    return async_pool
+
+async def close_async_pool():
+    """
+    Close the asyncpg connection pool
+    """
+    global async_pool
+    
+    if async_pool is not None:
+        await async_pool.close()
+        async_pool = None
+
+# Execute spatial query on PostGIS without blocking the event loop
+async def execute_spatial_query_async(query: str, args: Sequence[Any] = ()) -> Dict[str, Any]:
+    """
+    Execute a spatial query on PostGIS through the asyncpg pool and return the results
+    
+    asyncpg prepares every query on first use and keeps it in a per-connection
+    statement cache, so the $n queries shared with execute_prepared_query get
+    the same plan reuse here.
+    
+    Args:
+        query: SQL query string using $1, $2, ... placeholders
+        args: Positional query parameters
+        
+    Returns:
+        Query results as dictionary
+    """
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as connection:
+            records = await connection.fetch(query, *args)
+        
+        # Convert to list of dicts
+        rows = [dict(record) for record in records]
+        return {"status": "success", "data": rows}
+    except Exception as e:
+        logger.error(f"Async spatial query error: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+# Stream a spatial query on PostGIS through a server-side cursor
+async def stream_spatial_query_async(
+    query: str,
+    args: Sequence[Any] = (),
+    prefetch: int = PG_STREAM_PREFETCH
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream the rows of a spatial query through a server-side cursor
+    
+    Rows are fetched in batches of `prefetch`, so memory stays flat however
+    many rows the query returns. The pooled connection is held until the
+    iteration ends or is abandoned.
+    
+    Args:
+        query: SQL query string using $1, $2, ... placeholders
+        args: Positional query parameters
+        prefetch: Number of rows fetched per round trip
+        
+    Yields:
+        Query rows as dictionaries
+    """
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as connection:
+            # Cursors only live inside a transaction
+            async with connection.transaction(readonly=True):
+                async for record in connection.cursor(query, *args, prefetch=prefetch):
+                    yield dict(record)
+    except Exception as e:
+        logger.error(f"Async spatial stream error: {str(e)}")
+        raise
+
 # Execute query on JCHARRISPACS
 def execute_jcharrispacs_query(query: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
@@ -170,3 +405,186 @@ def execute_jcharrispacs_query(query: str, params: Optional[Dict[str, Any]] = No
     except Exception as e:
         logger.error(f"JCHARRISPACS query error: {str(e)}")
         return {"status": "error", "message": str(e)}
+
+# Stream a query on JCHARRISPACS in batches
+def stream_jcharrispacs_query(
+    query: str,
+    params: Optional[Sequence[Any]] = None,
+    batch_size: int = JCHARRISPACS_FETCH_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream the rows of a JCHARRISPACS query in batches
+    
+    Rows are read with cursor.fetchmany, so only one batch is held in memory
+    at a time. The connection stays open until the iteration ends or is
+    abandoned.
+    
+    Args:
+        query: SQL query string
+        params: Positional query parameters
+        batch_size: Number of rows fetched per batch
+        
+    Yields:
+        Batches of query rows as dictionaries
+    """
+    try:
+        with get_sqlserver_cursor() as cursor:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            
+            if not cursor.description:
+                return
+            
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(zip(columns, row)) for row in rows]
+    except Exception as e:
+        logger.error(f"JCHARRISPACS stream error: {str(e)}")
+        raise
+
+# Stream a query on JCHARRISPACS over several connections at once
+def stream_jcharrispacs_partitioned(
+    query: str,
+    partition_column: str,
+    partitions: int,
+    params: Optional[Sequence[Any]] = None,
+    batch_size: int = JCHARRISPACS_FETCH_SIZE,
+    max_connections: int = JCHARRISPACS_MAX_CONNECTIONS
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream the rows of a JCHARRISPACS query split into key ranges
+    
+    The range of the partition column is split into equal key ranges that
+    are streamed concurrently, each over its own connection. Batches are
+    yielded as they arrive, so rows of different ranges interleave. The
+    query must be usable as a derived table, and the partition column must
+    be numeric or a date/time.
+    
+    Args:
+        query: SQL query string
+        partition_column: Column of the query to split on
+        partitions: Number of key ranges
+        params: Positional parameters of the query
+        batch_size: Number of rows fetched per batch
+        max_connections: Maximum number of concurrent connections
+        
+    Yields:
+        Batches of query rows as dictionaries
+    """
+    column = quote_sqlserver_identifier(partition_column)
+    source = f"SELECT * FROM ({query}) AS partitioned_source"
+    params = list(params or [])
+    
+    # Find the key range to split
+    with get_sqlserver_cursor() as cursor:
+        bounds_query = f"SELECT MIN({column}), MAX({column}) FROM ({query}) AS partitioned_source"
+        if params:
+            cursor.execute(bounds_query, params)
+        else:
+            cursor.execute(bounds_query)
+        low, high = cursor.fetchone()
+    
+    ranges = partition_predicates(column, low, high, partitions)
+    if len(ranges) == 1:
+        yield from stream_jcharrispacs_query(source, params, batch_size)
+        return
+    
+    logger.info(f"Extracting {len(ranges)} key ranges of {partition_column} from JCHARRISPACS")
+    
+    # Workers hand batches over through a bounded queue, so a slow consumer
+    # stalls them instead of letting batches pile up in memory
+    batches: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=max_connections * 2)
+    stop = threading.Event()
+    
+    def hand_over(item: Tuple[str, Any]) -> bool:
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def extract_range(predicate: str, range_params: List[Any]):
+        try:
+            for rows in stream_jcharrispacs_query(f"{source} WHERE {predicate}", params + range_params, batch_size):
+                if not hand_over(("rows", rows)):
+                    return
+            hand_over(("done", None))
+        except Exception as e:
+            hand_over(("error", e))
+    
+    executor = ThreadPoolExecutor(max_workers=min(len(ranges), max_connections), thread_name_prefix="jcharrispacs")
+    try:
+        for predicate, range_params in ranges:
+            executor.submit(extract_range, predicate, range_params)
+        
+        remaining = len(ranges)
+        while remaining:
+            kind, value = batches.get()
+            if kind == "rows":
+                yield value
+            elif kind == "done":
+                remaining -= 1
+            else:
+                raise value
+    except Exception as e:
+        logger.error(f"JCHARRISPACS partitioned stream error: {str(e)}")
+        raise
+    finally:
+        # Release workers blocked on a full queue when iteration stops early
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def quote_sqlserver_identifier(name: str) -> str:
+    """
+    Quote a column name for SQL Server
+    """
+    return "[" + name.replace("]", "]]") + "]"
+
+def partition_predicates(column: str, low: Any, high: Any, partitions: int) -> List[Tuple[str, List[Any]]]:
+    """
+    Split a key range into WHERE predicates
+    
+    The first range also takes NULL keys and the outer ranges are open
+    ended, so every row falls into exactly one range.
+    
+    Args:
+        column: Quoted partition column
+        low: Smallest key
+        high: Largest key
+        partitions: Number of ranges
+        
+    Returns:
+        (predicate, positional parameters) per range
+    """
+    if low is None or partitions <= 1:
+        return [("1 = 1", [])]
+    
+    if isinstance(low, str):
+        raise ValueError(f"Partition column {column} must be numeric or a date/time")
+    
+    # Integer keys split on integer boundaries; dates and decimals split exactly
+    boundaries = []
+    for index in range(1, partitions):
+        if isinstance(low, int):
+            boundary = low + (high - low) * index // partitions
+        else:
+            boundary = low + (high - low) * index / partitions
+        if boundary > low and (not boundaries or boundary > boundaries[-1]):
+            boundaries.append(boundary)
+    
+    if not boundaries:
+        return [("1 = 1", [])]
+    
+    predicates = [(f"({column} < ? OR {column} IS NULL)", [boundaries[0]])]
+    for lower, upper in zip(boundaries, boundaries[1:]):
+        predicates.append((f"{column} >= ? AND {column} < ?", [lower, upper]))
+    predicates.append((f"{column} >= ?", [boundaries[-1]]))
+    
+    return predicates
@@ -1,7 +1,7 @@
 import json
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, SmallInteger, BigInteger, String, Float, DateTime, ForeignKey, Boolean, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
@@ -69,6 +69,47 @@ class SpatialFeature(Base):
             "geometry": json.loads(self.geometry)
         }
 
+class GeneralizedGeometry(Base):
+    """Pre-simplified Web Mercator geometry of a spatial feature for one zoom band"""
+    __tablename__ = "spatial_feature_generalized"
+
+    feature_id = Column(Integer, ForeignKey("spatial_features.id", ondelete="CASCADE"), primary_key=True)
+    zoom_band = Column(SmallInteger, primary_key=True)  # See services.terra_map.generalization.ZOOM_BANDS
+    geometry = Column(Geometry(geometry_type='GEOMETRY', srid=3857), nullable=False)
+
+    def __repr__(self):
+        return f"<GeneralizedGeometry {self.feature_id} (band {self.zoom_band})>"
+
+class FeatureCatalogStats(Base):
+    """Incrementally maintained feature counts and extents per layer and per source"""
+    __tablename__ = "spatial_feature_stats"
+
+    dimension = Column(String(16), primary_key=True)  # feature_type or source_system
+    key = Column(String(64), primary_key=True)  # Layer or source name
+    feature_count = Column(Integer, nullable=False, default=0)
+    min_x = Column(Float)
+    min_y = Column(Float)
+    max_x = Column(Float)
+    max_y = Column(Float)
+    extent_stale = Column(Boolean, default=False)  # Extent may be larger than the features after deletes
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<FeatureCatalogStats {self.dimension}:{self.key}>"
+
+class TileVersion(Base):
+    """Data version of one tile area, bumped by every write to spatial_features inside it"""
+    __tablename__ = "spatial_tile_versions"
+
+    zoom = Column(SmallInteger, primary_key=True)  # See services.terra_map.versions.TILE_VERSION_ZOOM
+    x = Column(Integer, primary_key=True)
+    y = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, index=True)  # Only ever grows
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TileVersion {self.zoom}/{self.x}/{self.y}: {self.version}>"
+
 class Task(Base):
     """Task model for tracking ETL and processing jobs"""
     __tablename__ = "tasks"
@@ -131,3 +172,20 @@ class SyncRecord(Base):
 
     def __repr__(self):
         return f"<SyncRecord {self.id} ({self.source_system} -> {self.entity_type})>"
+
+class SyncWatermark(Base):
+    """High-water mark of the last successful incremental sync of a source table"""
+    __tablename__ = "sync_watermarks"
+
+    source_system = Column(String(64), primary_key=True)  # JCHARRISPACS, etc.
+    source_table = Column(String(128), primary_key=True)  # Table the watermark column belongs to
+    watermark_column = Column(String(64), nullable=False)  # rowversion or last-modified column
+    watermark_type = Column(String(16), nullable=False)  # rowversion or timestamp
+    watermark_value = Column(String(64), nullable=False)  # Hex rowversion or ISO timestamp
+    rows_synced = Column(Integer, default=0)  # Rows merged by the last run
+    last_synced_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SyncWatermark {self.source_system}:{self.source_table} ({self.watermark_value})>"
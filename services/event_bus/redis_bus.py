@@ -79,12 +79,13 @@ class RedisBus:
             logger.error(f"Error disconnecting from Redis: {str(e)}")
             return False
     
-    async def publish(self, message: Dict[str, Any]) -> bool:
+    async def publish(self, message: Dict[str, Any], channel: Optional[str] = None) -> bool:
         """
         Publish a message to the event bus
         
         Args:
             message: Message to publish
+            channel: Channel to publish on instead of the bus's own channel
             
         Returns:
             True if successful, False otherwise
@@ -98,7 +99,7 @@ class RedisBus:
             message_str = json.dumps(message)
             
             # Publish message
-            await self.redis_client.publish(self.channel, message_str)
+            await self.redis_client.publish(channel or self.channel, message_str)
             
             return True
         except Exception as e:
@@ -208,3 +209,57 @@ class RedisBus:
         except Exception as e:
             logger.error(f"Error deleting key: {str(e)}")
             return False
+    
+    async def acquire_lock(self, key: str, token: str, expiration_ms: int) -> bool:
+        """
+        Acquire a short-lived lock in Redis
+        
+        Args:
+            key: Lock key
+            token: Unique value identifying the holder
+            expiration_ms: Lock lifetime in milliseconds
+            
+        Returns:
+            True if the lock was acquired, False otherwise
+        """
+        try:
+            if not self.redis_client:
+                if not await self.connect():
+                    return False
+            
+            # Set the key only if nobody holds the lock
+            acquired = await self.redis_client.set(key, token, nx=True, px=expiration_ms)
+            
+            return bool(acquired)
+        except Exception as e:
+            logger.error(f"Error acquiring lock: {str(e)}")
+            return False
+    
+    async def release_lock(self, key: str, token: str) -> bool:
+        """
+        Release a lock held with the given token
+        
+        Args:
+            key: Lock key
+            token: Value the lock was acquired with
+            
+        Returns:
+            True if the lock was released, False otherwise
+        """
+        try:
+            if not self.redis_client:
+                if not await self.connect():
+                    return False
+            
+            # Delete the key only if it still holds our token
+            released = await self.redis_client.eval(
+                "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end",
+                1,
+                key,
+                token
+            )
+            
+            return bool(released)
+        except Exception as e:
+            logger.error(f"Error releasing lock: {str(e)}")
+            return False
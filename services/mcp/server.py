@@ -3,7 +3,7 @@ import logging
 import json
 import asyncio
 import uuid
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, Body
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
@@ -46,6 +46,9 @@ agent_registry = AgentRegistry()
 # Store active WebSocket connections
 active_connections: Dict[str, WebSocket] = {}
 
+# Map clients subscribed to dirty tile notices, with their layers (None for every layer)
+tile_subscriptions: Dict[str, Optional[Set[str]]] = {}
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize components on startup"""
@@ -172,6 +175,10 @@ async def process_event(event_data: Dict[str, Any]):
                 "error": error
             })
         
+        elif event_type == "tiles_dirty":
+            # Map data changed - forward the dirty tile ranges to subscribed map clients
+            await broadcast_dirty_tiles(payload)
+        
     except Exception as e:
         logger.error(f"Error processing event: {str(e)}")
 
@@ -193,6 +200,47 @@ async def broadcast_to_websockets(message: Dict[str, Any]):
     # Clean up disconnected clients
     for client_id in disconnected:
         active_connections.pop(client_id, None)
+        tile_subscriptions.pop(client_id, None)
+
+async def broadcast_dirty_tiles(payload: Dict[str, Any]):
+    """
+    Send a dirty tile notice to the map clients subscribed to its layers
+    
+    Ranges are [min_x, min_y, max_x, max_y] tile coordinates at the notice's
+    zoom; changes of unknown layers come under "*" and reach every subscriber.
+    
+    Args:
+        payload: Notice payload with "zoom" and per-layer "layers" ranges
+    """
+    disconnected = []
+    
+    for client_id, layers in list(tile_subscriptions.items()):
+        websocket = active_connections.get(client_id)
+        if websocket is None:
+            disconnected.append(client_id)
+            continue
+        
+        # Keep only the layers this client follows
+        entries = [
+            entry for entry in payload.get("layers", [])
+            if layers is None or entry.get("layer") == "*" or entry.get("layer") in layers
+        ]
+        if not entries:
+            continue
+        
+        try:
+            await websocket.send_json({
+                "type": "tiles_dirty",
+                "zoom": payload.get("zoom"),
+                "layers": entries
+            })
+        except Exception:
+            disconnected.append(client_id)
+    
+    # Clean up disconnected clients
+    for client_id in disconnected:
+        active_connections.pop(client_id, None)
+        tile_subscriptions.pop(client_id, None)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -230,6 +278,23 @@ async def websocket_endpoint(websocket: WebSocket):
                     "timestamp": data.get("timestamp")
                 })
             
+            elif message_type == "subscribe_tiles":
+                # Map client asking for dirty tile notices, optionally for some layers only
+                layers = data.get("layers")
+                tile_subscriptions[client_id] = set(layers) if layers else None
+                
+                await websocket.send_json({
+                    "type": "tiles_subscribed",
+                    "layers": sorted(layers) if layers else None
+                })
+            
+            elif message_type == "unsubscribe_tiles":
+                tile_subscriptions.pop(client_id, None)
+                
+                await websocket.send_json({
+                    "type": "tiles_unsubscribed"
+                })
+            
             elif message_type == "agent_request":
                 # Agent request
                 agent_name = data.get("agent")
@@ -256,11 +321,13 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         # Remove connection
         active_connections.pop(client_id, None)
+        tile_subscriptions.pop(client_id, None)
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
         
         # Remove connection
         active_connections.pop(client_id, None)
+        tile_subscriptions.pop(client_id, None)
 
 @app.get("/health")
 async def health():
@@ -11,6 +11,7 @@ from services.terra_flow.etl import (
     get_etl_job_list,
     cancel_etl_job
 )
+from services.terra_flow.expressions import ExpressionError
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -38,8 +39,8 @@ async def create_etl_job(
     Start a new ETL job
     
     Job specification should include:
-    - source: Source system (e.g., "jcharrispacs", "shapefile")
-    - target: Target system (e.g., "postgresql", "geojson")
+    - source: Source system (e.g., "jcharrispacs", "shapefile", or "spatial_features" for mbtiles)
+    - target: Target system (e.g., "postgresql", "geojson", "mbtiles")
     - source_params: Parameters for the source system
     - target_params: Parameters for the target system
     - transformation: Optional transformation steps
@@ -61,6 +62,12 @@ async def create_etl_job(
             "job_id": job_id,
             "message": "ETL job started successfully"
         }
+    except HTTPException:
+        raise
+    except ExpressionError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid field calculation: {str(e)}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid job specification: {str(e)}")
     except Exception as e:
         logger.error(f"Error starting ETL job: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error starting ETL job: {str(e)}")
@@ -1,19 +1,38 @@
 import os
+import gzip
 import logging
 import json
 import time
-from datetime import datetime
-from typing import Dict, Any, List, Optional, Union
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Union, Iterable, Iterator, Tuple
 import threading
+from concurrent.futures import ProcessPoolExecutor
+import mercantile
 import pandas as pd
 import geopandas as gpd
+import shapely
 from shapely import wkt
 from fastapi import BackgroundTasks
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from services.common.database import get_db_session, execute_jcharrispacs_query, execute_spatial_query
-from services.common.models import Task, SpatialFeature, SyncRecord, User
+from services.common.database import (
+    get_db_session,
+    get_sqlserver_cursor,
+    quote_sqlserver_identifier,
+    stream_jcharrispacs_query,
+    stream_jcharrispacs_partitioned,
+    execute_spatial_query,
+    copy_rows,
+    postgres_engine,
+    JCHARRISPACS_FETCH_SIZE
+)
+from services.common.models import Task, SpatialFeature, SyncRecord, SyncWatermark, User
+from services.terra_flow.expressions import compile_expression, evaluate_expression
+from services.terra_map.archive import write_mbtiles
+from services.terra_map.layers import LAYER_CONFIG_VERSION
+from services.terra_map.tiles import get_vector_tile_mvt, get_map_layers
+from services.terra_map.versions import TILE_VERSION_ZOOM, read_tile_versions
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -21,6 +40,62 @@ logger = logging.getLogger(__name__)
 # Dictionary to track running ETL jobs
 running_jobs = {}
 
+# Kinds of JCHARRISPACS change-tracking columns incremental syncs can follow
+WATERMARK_TYPES = ["rowversion", "timestamp"]
+
+# Timestamp syncs re-read the changes stamped up to this many seconds before
+# the previous run's upper bound, catching rows committed after a row with a
+# later stamp was already synced
+JCHARRISPACS_WATERMARK_OVERLAP = int(os.getenv("JCHARRISPACS_WATERMARK_OVERLAP", "300"))
+
+# Columns mapped onto spatial_features columns instead of properties
+SPATIAL_FEATURE_KEYS = ["feature_id", "id", "feature_type", "source_system"]
+
+# Unlogged per-transaction staging table for bulk feature loads, reused by every chunk
+STAGING_TABLE_SQL = """
+CREATE TEMPORARY TABLE IF NOT EXISTS spatial_features_staging (
+    seq bigserial,
+    feature_id varchar(64) NOT NULL,
+    feature_type varchar(32) NOT NULL,
+    properties jsonb,
+    geometry geometry(Geometry, 4326),
+    source_system varchar(64)
+) ON COMMIT DROP
+"""
+
+# Set-based merge of the staged rows into spatial_features
+STAGED_UPSERT_SQL = """
+INSERT INTO spatial_features (
+    feature_id, feature_type, properties, geometry, source_system, is_synced, created_at, updated_at
+)
+SELECT DISTINCT ON (s.feature_id)
+    s.feature_id,
+    s.feature_type,
+    s.properties,
+    s.geometry,
+    s.source_system,
+    true,
+    timezone('utc', now()),
+    timezone('utc', now())
+FROM
+    spatial_features_staging s
+ORDER BY
+    s.feature_id, s.seq DESC
+ON CONFLICT (feature_id) DO UPDATE SET
+    feature_type = EXCLUDED.feature_type,
+    properties = EXCLUDED.properties,
+    geometry = EXCLUDED.geometry,
+    source_system = EXCLUDED.source_system,
+    is_synced = true,
+    updated_at = EXCLUDED.updated_at
+"""
+
+# Extent of the loaded features, seeded into archives when a job gives no bbox
+SPATIAL_FEATURES_EXTENT_SQL = """
+SELECT ST_XMin(extent) AS minx, ST_YMin(extent) AS miny, ST_XMax(extent) AS maxx, ST_YMax(extent) AS maxy
+FROM (SELECT ST_Extent(geometry) AS extent FROM spatial_features) AS features
+"""
+
 def start_etl_job(
     job_spec: Dict[str, Any], 
     username: str,
@@ -37,6 +112,12 @@ def start_etl_job(
     Returns:
         job_id: ID of the created job
     """
+    # Reject field calculations outside the expression language before queuing
+    for expression in job_spec.get("transformation", {}).get("field_calculations", {}).values():
+        compile_expression(expression)
+    check_incremental_job(job_spec)
+    check_mbtiles_job(job_spec)
+    
     try:
         with get_db_session() as db:
             # Get user ID
@@ -63,6 +144,50 @@ def start_etl_job(
         logger.error(f"Error starting ETL job: {str(e)}")
         raise
 
+def check_incremental_job(job_spec: Dict[str, Any]):
+    """
+    Reject incremental syncs into targets that cannot merge changed rows
+    
+    An incremental run extracts only the rows changed since the previous
+    one. Only spatial_features merges them by key; appending to any other
+    table would duplicate rows, and replacing it would keep only the changes.
+    
+    Args:
+        job_spec: ETL job specification
+        
+    Raises:
+        ValueError: If an incremental job loads anywhere but spatial_features
+    """
+    if not job_spec.get("source_params", {}).get("incremental"):
+        return
+    
+    if job_spec.get("target") != "postgresql" or job_spec.get("target_params", {}).get("table_name") != "spatial_features":
+        raise ValueError("Incremental syncs can only load into the spatial_features table")
+
+def check_mbtiles_job(job_spec: Dict[str, Any]):
+    """
+    Reject jobs pairing the spatial_features source and the MBTiles target with anything else
+    
+    MBTiles archives are rendered from the features already loaded into
+    spatial_features, so the "spatial_features" source extracts nothing and
+    only the "mbtiles" target accepts it.
+    
+    Args:
+        job_spec: ETL job specification
+        
+    Raises:
+        ValueError: If only one side of the job is spatial_features/mbtiles
+    """
+    source = job_spec.get("source")
+    target = job_spec.get("target")
+    if target == "mbtiles" and source != "spatial_features":
+        raise ValueError(
+            "MBTiles archives are seeded from spatial_features; load the data there first "
+            "and use the spatial_features source"
+        )
+    if source == "spatial_features" and target != "mbtiles":
+        raise ValueError("The spatial_features source can only seed an MBTiles archive")
+
 def execute_etl_job(job_id: int, job_spec: Dict[str, Any]):
     """
     Execute ETL job in background
@@ -97,30 +222,42 @@ def execute_etl_job(job_id: int, job_spec: Dict[str, Any]):
             target_params = job_spec.get("target_params", {})
             transform_params = job_spec.get("transformation", {})
             
-            # Load data from source
-            data = None
+            # Load data from source as a stream of GeoDataFrame chunks
+            chunks: Iterable[gpd.GeoDataFrame]
+            watermark = None
             if source == "jcharrispacs":
-                data = extract_from_jcharrispacs(source_params)
+                if source_params.get("incremental"):
+                    watermark = start_watermark(source_params)
+                chunks = extract_from_jcharrispacs(source_params, watermark)
             elif source == "shapefile":
-                data = extract_from_shapefile(source_params)
+                chunks = [extract_from_shapefile(source_params)]
             elif source == "geojson":
-                data = extract_from_geojson(source_params)
+                chunks = [extract_from_geojson(source_params)]
+            elif source == "spatial_features":
+                # Tiles are rendered straight from the loaded features
+                chunks = []
             else:
                 raise ValueError(f"Unsupported source: {source}")
             
-            # Apply transformations
+            # Apply transformations chunk by chunk
             if transform_params:
-                data = transform_data(data, transform_params)
+                chunks = (transform_data(chunk, transform_params) for chunk in chunks)
             
-            # Load data to target
+            # Load data to target, consuming the chunks as they are extracted
             result = None
             if target == "postgresql":
-                result = load_to_postgresql(data, target_params)
+                result = load_to_postgresql(chunks, target_params)
             elif target == "geojson":
-                result = load_to_geojson(data, target_params)
+                result = load_to_geojson(chunks, target_params)
+            elif target == "mbtiles":
+                result = load_to_mbtiles(chunks, target_params)
             else:
                 raise ValueError(f"Unsupported target: {target}")
             
+            # Move the watermark only once the changed rows are loaded
+            if watermark:
+                save_watermark(watermark)
+            
             # Update task record
             task.status = "completed"
             task.completed_at = datetime.utcnow()
@@ -129,7 +266,7 @@ def execute_etl_job(job_id: int, job_spec: Dict[str, Any]):
             
             # Create sync records if needed
             if source == "jcharrispacs" and target == "postgresql":
-                create_sync_records(db, data, result, "inbound", source, target)
+                create_sync_records(db, result, "inbound", source, target)
             
             # Remove from running jobs
             if job_id in running_jobs:
@@ -152,39 +289,231 @@ def execute_etl_job(job_id: int, job_spec: Dict[str, Any]):
         except Exception as inner_e:
             logger.error(f"Error updating failed task status: {str(inner_e)}")
 
-def extract_from_jcharrispacs(params: Dict[str, Any]) -> gpd.GeoDataFrame:
+def extract_from_jcharrispacs(params: Dict[str, Any], watermark: Optional[Dict[str, Any]] = None) -> Iterator[gpd.GeoDataFrame]:
     """
-    Extract data from JCHARRISPACS SQL Server
+    Extract data from JCHARRISPACS SQL Server in chunks
+    
+    Rows are fetched in batches of chunk_size, so memory is bounded by a
+    few chunks however large the source table is. With partition_column and
+    partitions, key ranges of the query are extracted concurrently over
+    separate connections.
     
     Args:
-        params: Extraction parameters including SQL query
+        params: Extraction parameters including SQL query and optional
+            chunk_size, partition_column, partitions and key_column (the
+            column loaded as feature_id)
+        watermark: Incremental sync plan from start_watermark; only rows
+            changed inside its range are extracted
         
-    Returns:
-        GeoDataFrame containing the extracted data
+    Yields:
+        GeoDataFrames of at most chunk_size rows
     """
     query = params.get("query")
     if not query:
         raise ValueError("SQL query is required for JCHARRISPACS extraction")
     
-    # Execute query against SQL Server
-    result = execute_jcharrispacs_query(query)
+    chunk_size = int(params.get("chunk_size", JCHARRISPACS_FETCH_SIZE))
+    geom_column = params.get("geometry_column", "geometry")
+    key_column = params.get("key_column")
+    partition_column = params.get("partition_column")
+    partitions = int(params.get("partitions", 1))
+    
+    # Limit the query to the rows changed since the last successful sync
+    query_params: List[Any] = []
+    if watermark:
+        if watermark["high"] is None:
+            logger.info(f"No rows to sync from {watermark['source_table']}")
+            watermark["rows"] = 0
+            return
+        query, query_params = incremental_query(query, watermark)
     
-    if result.get("status") != "success" or not result.get("data"):
-        raise ValueError(f"Error executing JCHARRISPACS query: {result.get('message')}")
+    # Stream the query results from SQL Server
+    if partition_column and partitions > 1:
+        batches = stream_jcharrispacs_partitioned(query, partition_column, partitions, query_params, batch_size=chunk_size)
+    else:
+        batches = stream_jcharrispacs_query(query, query_params, chunk_size)
     
-    # Convert to DataFrame
-    df = pd.DataFrame(result.get("data"))
+    extracted = 0
+    for rows in batches:
+        df = pd.DataFrame(rows)
+        extracted += len(df)
+        if key_column:
+            df["feature_id"] = df[key_column]
+        
+        # Convert to GeoDataFrame if geometry column exists
+        if geom_column in df.columns:
+            df[geom_column] = df[geom_column].apply(lambda x: wkt.loads(x) if x else None)
+            yield gpd.GeoDataFrame(df, geometry=geom_column, crs="EPSG:4326")
+        else:
+            # Create GeoDataFrame without geometry
+            yield gpd.GeoDataFrame(df)
     
-    # Convert to GeoDataFrame if geometry column exists
-    geom_column = params.get("geometry_column", "geometry")
-    if geom_column in df.columns:
-        df[geom_column] = df[geom_column].apply(lambda x: wkt.loads(x) if x else None)
-        gdf = gpd.GeoDataFrame(df, geometry=geom_column, crs="EPSG:4326")
+    if watermark:
+        # An incremental run without changes is not an error
+        watermark["rows"] = extracted
+    elif not extracted:
+        raise ValueError("JCHARRISPACS query returned no data")
+    
+    logger.info(f"Extracted {extracted} rows from JCHARRISPACS")
+
+def start_watermark(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Plan an incremental JCHARRISPACS extract
+    
+    Reads the last successful watermark of the source table and fixes the
+    upper bound of this run before any row is read, so rows changing while
+    the job runs are picked up by the next run.
+    
+    Changed rows are merged into spatial_features by feature ID, so the
+    query must return a feature_id or id column, or name the column to
+    use as key_column.
+    
+    Args:
+        params: Extraction parameters including query, source_table,
+            watermark_column, optional watermark_type ("rowversion" or
+            "timestamp"), key_column and full_refresh
+        
+    Returns:
+        Watermark plan with source_table, column, type, low and high bounds
+    """
+    source_table = params.get("source_table")
+    column = params.get("watermark_column")
+    watermark_type = params.get("watermark_type", "rowversion")
+    key_column = params.get("key_column")
+    if not source_table or not column:
+        raise ValueError("source_table and watermark_column are required for incremental extraction")
+    if watermark_type not in WATERMARK_TYPES:
+        raise ValueError(f"Unsupported watermark type: {watermark_type}")
+    
+    # Read the last successful watermark
+    low = None
+    if not params.get("full_refresh"):
+        with get_db_session() as db:
+            stored = db.query(SyncWatermark).filter(
+                SyncWatermark.source_system == "jcharrispacs",
+                SyncWatermark.source_table == source_table
+            ).first()
+            if stored and stored.watermark_column == column and stored.watermark_type == watermark_type:
+                low = decode_watermark(stored.watermark_value, watermark_type)
+            elif stored:
+                logger.warning(f"Watermark column of {source_table} changed, extracting all rows")
+    
+    # Fix the upper bound: for rowversion every lower version is committed,
+    # for timestamps it is the newest change visible now
+    with get_sqlserver_cursor() as cursor:
+        # Without a stable key, changed rows could not be matched to the features they update
+        cursor.execute(f"SELECT TOP 0 * FROM ({params['query']}) AS incremental_source")
+        columns = [description[0] for description in cursor.description]
+        if key_column and key_column not in columns:
+            raise ValueError(f"Key column {key_column} is not returned by the incremental query")
+        if not key_column and "feature_id" not in columns and "id" not in columns:
+            raise ValueError("Incremental extraction needs a feature_id or id column, or a key_column")
+        
+        if watermark_type == "rowversion":
+            cursor.execute("SELECT MIN_ACTIVE_ROWVERSION()")
+        else:
+            cursor.execute(f"SELECT MAX({quote_sqlserver_identifier(column)}) FROM ({params['query']}) AS incremental_source")
+        high = cursor.fetchone()[0]
+    
+    return {
+        "source_table": source_table,
+        "column": column,
+        "type": watermark_type,
+        "low": low,
+        "high": high
+    }
+
+def incremental_query(query: str, watermark: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Limit a query to the rows inside a watermark range
+    
+    Rowversion ranges exclude their upper bound (MIN_ACTIVE_ROWVERSION is
+    not yet used). Timestamp ranges include it, and start
+    JCHARRISPACS_WATERMARK_OVERLAP seconds before their lower bound: a row
+    may commit after one with a later stamp was synced, and merging the
+    re-read rows again is harmless.
+    
+    Args:
+        query: SQL query string
+        watermark: Watermark plan from start_watermark
+        
+    Returns:
+        Query and its positional parameters
+    """
+    column = quote_sqlserver_identifier(watermark["column"])
+    low = watermark["low"]
+    if watermark["type"] == "rowversion":
+        lower, upper = f"{column} >= ?", f"{column} < ?"
     else:
-        # Create empty GeoDataFrame
-        gdf = gpd.GeoDataFrame(df)
+        lower, upper = f"{column} >= ?", f"{column} <= ?"
+        if low is not None:
+            low -= timedelta(seconds=JCHARRISPACS_WATERMARK_OVERLAP)
     
-    return gdf
+    conditions = [upper]
+    params = [watermark["high"]]
+    if low is not None:
+        conditions.insert(0, lower)
+        params.insert(0, low)
+    
+    return f"SELECT * FROM ({query}) AS incremental_source WHERE {' AND '.join(conditions)}", params
+
+def save_watermark(watermark: Dict[str, Any]):
+    """
+    Record the upper bound of a successful incremental run
+    
+    Args:
+        watermark: Watermark plan from start_watermark, after its rows were loaded
+    """
+    if watermark["high"] is None:
+        return
+    
+    with get_db_session() as db:
+        stored = db.query(SyncWatermark).filter(
+            SyncWatermark.source_system == "jcharrispacs",
+            SyncWatermark.source_table == watermark["source_table"]
+        ).first()
+        if not stored:
+            stored = SyncWatermark(source_system="jcharrispacs", source_table=watermark["source_table"])
+            db.add(stored)
+        
+        stored.watermark_column = watermark["column"]
+        stored.watermark_type = watermark["type"]
+        stored.watermark_value = encode_watermark(watermark["high"], watermark["type"])
+        stored.rows_synced = watermark.get("rows", 0)
+        stored.last_synced_at = datetime.utcnow()
+        db.commit()
+    
+    logger.info(f"Synced {watermark.get('rows', 0)} changed rows of {watermark['source_table']}")
+
+def encode_watermark(value: Any, watermark_type: str) -> str:
+    """
+    Encode a watermark value for storage
+    
+    Args:
+        value: Watermark value read from the source
+        watermark_type: "rowversion" or "timestamp"
+        
+    Returns:
+        Hex string for row versions, ISO 8601 string for timestamps
+    """
+    if watermark_type == "rowversion":
+        return bytes(value).hex()
+    return value.isoformat()
+
+def decode_watermark(value: str, watermark_type: str) -> Any:
+    """
+    Decode a stored watermark value into a query parameter
+    
+    Args:
+        value: Stored watermark value
+        watermark_type: "rowversion" or "timestamp"
+        
+    Returns:
+        Bytes for row versions, datetime for timestamps
+    """
+    if watermark_type == "rowversion":
+        return bytes.fromhex(value)
+    return datetime.fromisoformat(value)
 
 def extract_from_shapefile(params: Dict[str, Any]) -> gpd.GeoDataFrame:
     """
@@ -258,12 +587,10 @@ def transform_data(data: gpd.GeoDataFrame, transform_params: Dict[str, Any]) ->
             if source_field in result.columns:
                 result[target_field] = result[source_field]
     
-    # Apply field calculations
+    # Apply field calculations, each evaluated over whole columns at once
     field_calculations = transform_params.get("field_calculations", {})
     for field, expression in field_calculations.items():
-        # DANGER: eval can be dangerous, only use with trusted expressions
-        # In production, use a safer expression parser
-        result[field] = result.apply(lambda row: eval(expression, {"row": row, "pd": pd}), axis=1)
+        result[field] = evaluate_expression(expression, result)
     
     # Apply spatial transformations
     spatial_transforms = transform_params.get("spatial_transforms", [])
@@ -283,12 +610,18 @@ def transform_data(data: gpd.GeoDataFrame, transform_params: Dict[str, Any]) ->
     
     return result
 
-def load_to_postgresql(data: gpd.GeoDataFrame, params: Dict[str, Any]) -> Dict[str, Any]:
+def load_to_postgresql(chunks: Iterable[gpd.GeoDataFrame], params: Dict[str, Any]) -> Dict[str, Any]:
     """
     Load data to PostgreSQL/PostGIS
     
+    Each chunk is written before the next one is extracted, so only one
+    chunk is held in memory. All chunks are written in one transaction,
+    committed after the last chunk: a failed load leaves the table as it
+    was, and if_exists="replace" never exposes a table holding only part
+    of the data.
+    
     Args:
-        data: GeoDataFrame to load
+        chunks: GeoDataFrame chunks to load
         params: Load parameters
         
     Returns:
@@ -302,76 +635,128 @@ def load_to_postgresql(data: gpd.GeoDataFrame, params: Dict[str, Any]) -> Dict[s
     if_exists = params.get("if_exists", "append")  # append, replace, fail
     
     try:
+        inserted = 0
+        inserted_features = []
         with get_db_session() as db:
-            # Check if we're writing to spatial_features table
-            if table_name == "spatial_features":
-                # Insert records one by one to use the SpatialFeature model
-                inserted_features = []
-                for _, row in data.iterrows():
-                    properties = {col: row[col] for col in data.columns if col != "geometry"}
-                    
-                    # Create feature ID if not present
-                    feature_id = properties.get("feature_id") or properties.get("id") or f"feature_{len(inserted_features)}"
-                    feature_type = properties.get("feature_type") or "unknown"
-                    source_system = properties.get("source_system") or params.get("source_system", "unknown")
-                    
-                    # Remove these from properties to avoid duplication
-                    for key in ["feature_id", "id", "feature_type", "source_system"]:
-                        if key in properties:
-                            del properties[key]
-                    
-                    # Create SpatialFeature
-                    feature = SpatialFeature(
-                        feature_id=str(feature_id),
-                        feature_type=feature_type,
-                        properties=properties,
-                        geometry=f"SRID=4326;{row.geometry.wkt}",
-                        source_system=source_system,
-                        is_synced=True
-                    )
-                    db.add(feature)
-                    inserted_features.append(feature_id)
-                
-                db.commit()
-                return {
-                    "table": f"{schema}.{table_name}",
-                    "inserted": len(inserted_features),
-                    "features": inserted_features
-                }
-            else:
-                # Use GeoPandas to_postgis for other tables
-                if hasattr(data, "to_postgis"):
-                    data.to_postgis(
-                        table_name,
-                        db.bind,
-                        schema=schema,
-                        if_exists=if_exists,
-                        index=False
-                    )
+            for index, data in enumerate(chunks):
+                # Check if we're writing to spatial_features table
+                if table_name == "spatial_features":
+                    inserted_features.extend(load_spatial_features(db, data, params))
                 else:
-                    # Fallback to pandas to_sql for non-spatial data
-                    data.to_sql(
-                        table_name,
-                        db.bind,
-                        schema=schema,
-                        if_exists=if_exists,
-                        index=False
-                    )
+                    # Later chunks always append to the table the first one created
+                    chunk_if_exists = if_exists if index == 0 else "append"
+                    
+                    # Use GeoPandas to_postgis for other tables, writing
+                    # through the session's connection to stay in its transaction
+                    if hasattr(data, "to_postgis"):
+                        data.to_postgis(
+                            table_name,
+                            db.connection(),
+                            schema=schema,
+                            if_exists=chunk_if_exists,
+                            index=False
+                        )
+                    else:
+                        # Fallback to pandas to_sql for non-spatial data
+                        data.to_sql(
+                            table_name,
+                            db.connection(),
+                            schema=schema,
+                            if_exists=chunk_if_exists,
+                            index=False
+                        )
                 
-                return {
-                    "table": f"{schema}.{table_name}",
-                    "inserted": len(data)
-                }
+                inserted += len(data)
+            
+            db.commit()
+        
+        if table_name == "spatial_features":
+            return {
+                "table": f"{schema}.{table_name}",
+                "inserted": len(inserted_features),
+                "features": inserted_features
+            }
+        
+        return {
+            "table": f"{schema}.{table_name}",
+            "inserted": inserted
+        }
     except Exception as e:
         logger.error(f"Error loading to PostgreSQL: {str(e)}")
         raise
 
-def load_to_geojson(data: gpd.GeoDataFrame, params: Dict[str, Any]) -> Dict[str, Any]:
+def load_spatial_features(db: Session, data: gpd.GeoDataFrame, params: Dict[str, Any]) -> List[str]:
+    """
+    Bulk load one chunk of features into spatial_features
+    
+    The chunk is streamed as hex EWKB and JSON through COPY into an unlogged
+    staging table, then merged with a single INSERT ... ON CONFLICT
+    (feature_id) DO UPDATE. The spatial_features triggers bump the tile
+    versions of both the previous and the new geometries. Nothing is
+    committed; the caller commits once every chunk is loaded.
+    
+    Args:
+        db: Database session
+        data: GeoDataFrame chunk to load
+        params: Load parameters
+        
+    Returns:
+        IDs of the loaded features
+        
+    Raises:
+        ValueError: If a row has neither a feature_id nor an id, since the
+            merge would otherwise overwrite whichever feature its position maps to
+    """
+    if data.empty:
+        return []
+    
+    # Encode geometries and properties for the whole chunk at once
+    geometries = shapely.to_wkb(
+        shapely.set_srid(data.geometry.to_numpy(), 4326),
+        hex=True,
+        include_srid=True
+    )
+    property_columns = [col for col in data.columns if col != data.geometry.name and col not in SPATIAL_FEATURE_KEYS]
+    if property_columns:
+        properties = pd.DataFrame(data[property_columns]).to_json(orient="records", lines=True, date_format="iso").splitlines()
+    else:
+        properties = ["{}"] * len(data)
+    
+    # Resolve the key columns, treating missing values as absent
+    keys = data.reindex(columns=SPATIAL_FEATURE_KEYS).astype(object)
+    keys = keys.where(keys.notna(), None)
+    feature_ids = [row.feature_id or row.id for row in keys.itertuples(index=False)]
+    if None in feature_ids:
+        raise ValueError("Every feature loaded into spatial_features needs a feature_id or id column value")
+    feature_ids = [str(feature_id) for feature_id in feature_ids]
+    feature_types = [feature_type or "unknown" for feature_type in keys["feature_type"]]
+    default_source = params.get("source_system", "unknown")
+    source_systems = [source_system or default_source for source_system in keys["source_system"]]
+    
+    # Stage the chunk, replacing the previous one; the table is dropped when the transaction commits
+    db.execute(text(STAGING_TABLE_SQL))
+    db.execute(text("TRUNCATE spatial_features_staging"))
+    copy_rows(
+        db,
+        "spatial_features_staging",
+        ["feature_id", "feature_type", "properties", "geometry", "source_system"],
+        zip(feature_ids, feature_types, properties, geometries, source_systems)
+    )
+    db.execute(text("ANALYZE spatial_features_staging"))
+    
+    # Merge the staged features, keeping the last row of any repeated feature ID
+    db.execute(text(STAGED_UPSERT_SQL))
+    
+    return feature_ids
+
+def load_to_geojson(chunks: Iterable[gpd.GeoDataFrame], params: Dict[str, Any]) -> Dict[str, Any]:
     """
     Load data to GeoJSON file
     
+    The FeatureCollection is written incrementally, one chunk at a time.
+    
     Args:
-        data: GeoDataFrame to load
+        chunks: GeoDataFrame chunks to load
         params: Load parameters
         
     Returns:
@@ -384,20 +769,149 @@ def load_to_geojson(data: gpd.GeoDataFrame, params: Dict[str, Any]) -> Dict[str,
     # Ensure directory exists
     os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
     
-    # Convert to GeoJSON and save
-    geojson_data = json.loads(data.to_json())
-    
+    # Convert each chunk to GeoJSON and append its features
+    count = 0
     with open(file_path, 'w') as f:
-        json.dump(geojson_data, f)
+        f.write('{"type": "FeatureCollection", "features": [')
+        for data in chunks:
+            for feature in json.loads(data.to_json())["features"]:
+                if count:
+                    f.write(", ")
+                json.dump(feature, f)
+                count += 1
+        f.write("]}")
     
     return {
         "file": file_path,
-        "features": len(data)
+        "features": count
     }
 
+def load_to_mbtiles(chunks: Iterable[gpd.GeoDataFrame], params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Pre-seed a tile pyramid from PostGIS into an MBTiles archive
+    
+    Every vector tile for the bbox and zoom range is rendered from
+    spatial_features in a process pool and written to a single archive that
+    TerraMap can serve without touching the database. The tile versions the
+    tiles are rendered from are recorded in the metadata, so TerraMap skips
+    archived tiles whose data changed since.
+    
+    The archive holds only what is already in spatial_features: jobs use the
+    "spatial_features" source, which extracts nothing, and any extracted
+    data is rejected rather than silently left out of the archive.
+    
+    Args:
+        chunks: Extracted data chunks; must be empty
+        params: Load parameters (file_path, bbox, minzoom, maxzoom,
+            processes); without a bbox the extent of spatial_features is used
+        
+    Returns:
+        Result information
+    """
+    file_path = params.get("file_path")
+    if not file_path:
+        raise ValueError("File path is required for MBTiles loading")
+    
+    for data in chunks:
+        if not data.empty:
+            raise ValueError("MBTiles archives are seeded from spatial_features, not from extracted data")
+    
+    # Determine the area to render
+    bbox = params.get("bbox")
+    if not bbox:
+        bbox = spatial_features_extent()
+        if not bbox:
+            raise ValueError("spatial_features holds no features to seed an archive from")
+    
+    minzoom = int(params.get("minzoom", 0))
+    maxzoom = int(params.get("maxzoom", 14))
+    processes = int(params.get("processes", os.cpu_count() or 1))
+    
+    if minzoom < 0 or maxzoom < minzoom:
+        raise ValueError(f"Invalid zoom range: {minzoom}-{maxzoom}")
+    
+    tiles = [
+        (tile.z, tile.x, tile.y)
+        for tile in mercantile.tiles(bbox[0], bbox[1], bbox[2], bbox[3], list(range(minzoom, maxzoom + 1)))
+    ]
+    logger.info(f"Rendering {len(tiles)} tiles for z{minzoom}-{maxzoom} into {file_path}")
+    
+    # Describe the vector layers for MBTiles clients
+    layer_ids = [layer["id"] for layer in get_map_layers()]
+    metadata = {
+        "name": params.get("name", os.path.splitext(os.path.basename(file_path))[0]),
+        "format": "pbf",
+        "type": "baselayer",
+        "bounds": ",".join(str(value) for value in bbox),
+        "minzoom": str(minzoom),
+        "maxzoom": str(maxzoom),
+        "json": {"vector_layers": [{"id": layer_id, "fields": {}} for layer_id in layer_ids]}
+    }
+    
+    # Versions of every tile area under the archived tiles, read before any
+    # tile is rendered so a change made meanwhile shows up as a newer version
+    version_zoom = min(minzoom, TILE_VERSION_ZOOM)
+    shift = TILE_VERSION_ZOOM - version_zoom
+    covered = {(tile.x, tile.y) for tile in mercantile.tiles(bbox[0], bbox[1], bbox[2], bbox[3], [version_zoom])}
+    metadata.update({
+        "layer_config_version": LAYER_CONFIG_VERSION,
+        "tile_version_zoom": str(TILE_VERSION_ZOOM),
+        "tile_versions": [
+            [x, y, version] for x, y, version in read_tile_versions()
+            if (x >> shift, y >> shift) in covered
+        ]
+    })
+    
+    # Render in worker processes and stream the results into the archive
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_tile_render_worker) as executor:
+        rendered = executor.map(render_archive_tile, tiles, chunksize=16)
+        count = write_mbtiles(file_path, rendered, metadata)
+    
+    return {
+        "file": file_path,
+        "tiles": count,
+        "bounds": bbox,
+        "minzoom": minzoom,
+        "maxzoom": maxzoom
+    }
+
+def spatial_features_extent() -> Optional[List[float]]:
+    """
+    Get the extent of every feature in spatial_features
+    
+    Returns:
+        Extent as [minx, miny, maxx, maxy], or None if the table has no geometries
+    """
+    result = execute_spatial_query(SPATIAL_FEATURES_EXTENT_SQL)
+    if result["status"] != "success":
+        raise Exception(f"Error reading the extent of spatial_features: {result.get('message')}")
+    
+    row = result["data"][0]
+    if row["minx"] is None:
+        return None
+    return [row["minx"], row["miny"], row["maxx"], row["maxy"]]
+
+def init_tile_render_worker():
+    """
+    Drop database connections inherited from the parent process
+    """
+    postgres_engine.dispose(close=False)
+
+def render_archive_tile(tile: tuple) -> tuple:
+    """
+    Render one gzip-compressed MVT tile for an MBTiles archive
+    
+    Args:
+        tile: Tile coordinates as (z, x, y)
+        
+    Returns:
+        Tile coordinates and compressed tile data as (z, x, y, data)
+    """
+    z, x, y = tile
+    return (z, x, y, gzip.compress(get_vector_tile_mvt(z, x, y)))
+
 def create_sync_records(
     db: Session,
-    data: gpd.GeoDataFrame,
     result: Dict[str, Any],
     sync_direction: str,
     source_system: str,
@@ -408,7 +922,6 @@ def create_sync_records(
     
     Args:
         db: Database session
-        data: Source data
         result: Load result
         sync_direction: Direction of sync (inbound or outbound)
         source_system: Source system name
@@ -0,0 +1,543 @@
+import ast
+import operator
+import functools
+from typing import Dict, Any, List, Callable, Tuple
+import numpy as np
+import pandas as pd
+
+# Compiled expression: evaluated against a DataFrame, returns a Series or a scalar
+Compiled = Callable[[pd.DataFrame], Any]
+
+# Name under which expressions may reference the current row's columns
+ROW_NAME = "row"
+
+# Largest exponent of **; greater powers only overflow, at a cost the caller controls
+MAX_EXPONENT = 1024
+
+class ExpressionError(ValueError):
+    """
+    Expression outside the field calculation language, or invalid for the data
+    """
+
+def has_text(value: Any) -> bool:
+    """
+    Check whether a value is a string, or a column holding strings
+    
+    Args:
+        value: Scalar or Series
+        
+    Returns:
+        True when the value holds strings
+    """
+    if isinstance(value, pd.Series):
+        return value.dtype == object and value.map(lambda item: isinstance(item, (str, bytes))).any()
+    return isinstance(value, (str, bytes))
+
+def multiply(left: Any, right: Any) -> Any:
+    """
+    Multiply numbers, refusing to repeat strings
+    
+    The repetition size would otherwise be controlled by the expression.
+    
+    Args:
+        left: Left operand
+        right: Right operand
+        
+    Returns:
+        Product
+    """
+    if has_text(left) or has_text(right):
+        raise ExpressionError("* only multiplies numbers; strings cannot be repeated")
+    return operator.mul(left, right)
+
+def check_exponent(exponent: Any):
+    """
+    Check that the exponents of ** are no greater than MAX_EXPONENT
+    
+    Args:
+        exponent: Scalar or Series of exponents
+    """
+    if isinstance(exponent, pd.Series):
+        largest = pd.to_numeric(exponent, errors="coerce").abs().max()
+    elif isinstance(exponent, (int, float, np.number)):
+        largest = abs(exponent)
+    else:
+        largest = 0
+    if largest > MAX_EXPONENT:
+        raise ExpressionError(f"Exponents are limited to {MAX_EXPONENT}")
+
+def power(base: Any, exponent: Any) -> Any:
+    """
+    Raise to a power no greater than MAX_EXPONENT
+    
+    Args:
+        base: Base
+        exponent: Exponent
+        
+    Returns:
+        Result of the power
+    """
+    check_exponent(exponent)
+    return operator.pow(base, exponent)
+
+BINARY_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: multiply,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: power
+}
+
+UNARY_OPERATORS: Dict[type, Callable[[Any], Any]] = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos
+}
+
+# Comparisons with a null value are false (and != is true), as in pandas
+COMPARE_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge
+}
+
+def as_series(value: Any, index: pd.Index) -> pd.Series:
+    """
+    Broadcast a scalar to a Series over an index, leaving Series unchanged
+    
+    Args:
+        value: Scalar or Series
+        index: Index of the data
+        
+    Returns:
+        Series over the index
+    """
+    if isinstance(value, pd.Series):
+        return value
+    return pd.Series([value] * len(index), index=index, dtype=object if value is None or isinstance(value, str) else None)
+
+def as_text(value: Any, index: pd.Index) -> pd.Series:
+    """
+    Convert a value to a Series of strings, keeping nulls
+    
+    Args:
+        value: Scalar or Series
+        index: Index of the data
+        
+    Returns:
+        Series of strings
+    """
+    series = as_series(value, index)
+    return series.where(series.isna(), series.astype(str))
+
+def as_mask(value: Any, index: pd.Index) -> pd.Series:
+    """
+    Convert a value to a boolean Series where nulls are false
+    
+    Args:
+        value: Scalar or Series
+        index: Index of the data
+        
+    Returns:
+        Boolean Series
+    """
+    series = as_series(value, index)
+    present = series.notna()
+    return present & series.where(present, False).astype(bool)
+
+def as_scalar(value: Any, function: str) -> Any:
+    """
+    Check that a function argument is a single value rather than a column
+    
+    Args:
+        value: Argument value
+        function: Name of the function, for error messages
+        
+    Returns:
+        The value
+    """
+    if isinstance(value, pd.Series):
+        raise ExpressionError(f"{function}() expects a constant here, not a column")
+    return value
+
+def coalesce(index: pd.Index, *values: Any) -> pd.Series:
+    """
+    First non-null value of each row
+    
+    Args:
+        index: Index of the data
+        *values: Scalars or Series, in order of preference
+        
+    Returns:
+        Series of the first non-null values
+    """
+    result = as_series(values[0], index)
+    for value in values[1:]:
+        result = result.where(result.notna(), as_series(value, index))
+    return result
+
+def concat(index: pd.Index, *values: Any) -> pd.Series:
+    """
+    Concatenate values as strings, treating nulls as empty strings
+    
+    Args:
+        index: Index of the data
+        *values: Scalars or Series
+        
+    Returns:
+        Series of strings
+    """
+    result = pd.Series([""] * len(index), index=index, dtype=object)
+    for value in values:
+        result = result + as_text(value, index).fillna("")
+    return result
+
+def to_number(value: Any, index: pd.Index) -> pd.Series:
+    """
+    Convert a value to numbers, with null where it does not parse
+    
+    Args:
+        value: Scalar or Series
+        index: Index of the data
+        
+    Returns:
+        Numeric Series
+    """
+    return pd.to_numeric(as_series(value, index), errors="coerce")
+
+# Functions of the language: name -> (minimum arguments, maximum arguments, implementation)
+# Implementations take the DataFrame index followed by the evaluated arguments
+FUNCTIONS: Dict[str, Tuple[int, int, Callable[..., Any]]] = {
+    "upper": (1, 1, lambda index, x: as_text(x, index).str.upper()),
+    "lower": (1, 1, lambda index, x: as_text(x, index).str.lower()),
+    "title": (1, 1, lambda index, x: as_text(x, index).str.title()),
+    "strip": (1, 1, lambda index, x: as_text(x, index).str.strip()),
+    "len": (1, 1, lambda index, x: as_text(x, index).str.len()),
+    "substr": (2, 3, lambda index, x, start, length=None: as_text(x, index).str.slice(
+        int(as_scalar(start, "substr")),
+        None if length is None else int(as_scalar(start, "substr")) + int(as_scalar(length, "substr"))
+    )),
+    "replace": (3, 3, lambda index, x, old, new: as_text(x, index).str.replace(
+        str(as_scalar(old, "replace")), str(as_scalar(new, "replace")), regex=False
+    )),
+    "startswith": (2, 2, lambda index, x, prefix: as_mask(as_text(x, index).str.startswith(str(as_scalar(prefix, "startswith"))), index)),
+    "endswith": (2, 2, lambda index, x, suffix: as_mask(as_text(x, index).str.endswith(str(as_scalar(suffix, "endswith"))), index)),
+    "concat": (1, 32, concat),
+    "coalesce": (2, 32, coalesce),
+    "isnull": (1, 1, lambda index, x: as_series(x, index).isna()),
+    "notnull": (1, 1, lambda index, x: as_series(x, index).notna()),
+    "str": (1, 1, lambda index, x: as_text(x, index)),
+    "float": (1, 1, lambda index, x: to_number(x, index).astype(float)),
+    "int": (1, 1, lambda index, x: np.trunc(to_number(x, index).astype(float)).astype("Int64")),
+    "abs": (1, 1, lambda index, x: to_number(x, index).abs()),
+    "round": (1, 2, lambda index, x, digits=0: to_number(x, index).round(int(as_scalar(digits, "round"))))
+}
+
+# Functions that may also be called as methods, e.g. row["name"].upper()
+METHODS = {"upper", "lower", "title", "strip", "replace", "startswith", "endswith"}
+
+@functools.lru_cache(maxsize=256)
+def compile_expression(source: str) -> Compiled:
+    """
+    Compile a field calculation into vectorized column operations
+    
+    The language is a small subset of Python expressions:
+    - literals: numbers, strings, True, False, None
+    - columns: name, row["name"] or row.name
+    - arithmetic: + - * / // % ** and unary minus; * only on numbers, and
+      exponents up to MAX_EXPONENT
+    - comparisons: == != < <= > >=, and in / not in a list of literals
+    - logic: and, or, not, and a if condition else b
+    - functions: upper, lower, title, strip, len, substr, replace,
+      startswith, endswith, concat, coalesce, isnull, notnull, str, float,
+      int, abs, round
+    
+    Nulls propagate through arithmetic and string functions, count as false
+    in conditions, and can be replaced with coalesce(). Anything else, such
+    as attribute access, imports or arbitrary calls, is rejected.
+    
+    Args:
+        source: Expression text
+        
+    Returns:
+        Function evaluating the expression over a whole DataFrame at once
+    """
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+        return compile_node(tree.body)
+    except ExpressionError:
+        raise
+    except (SyntaxError, RecursionError) as e:
+        raise ExpressionError(f"Invalid expression {source!r}: {str(e)}")
+
+def evaluate_expression(source: str, data: pd.DataFrame) -> Any:
+    """
+    Evaluate a field calculation over a DataFrame
+    
+    Args:
+        source: Expression text
+        data: Rows to evaluate the expression for
+        
+    Returns:
+        Series aligned with the DataFrame, or a scalar for constant expressions
+    """
+    return compile_expression(source)(data)
+
+def compile_node(node: ast.AST) -> Compiled:
+    """
+    Compile one expression node
+    
+    Args:
+        node: Python AST node
+        
+    Returns:
+        Compiled expression of the node
+    """
+    if isinstance(node, ast.Constant):
+        return compile_constant(node)
+    
+    if isinstance(node, ast.Name) or is_row_reference(node):
+        return compile_column(column_name(node))
+    
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        check_binary(node)
+        apply_binary = BINARY_OPERATORS[type(node.op)]
+        left = compile_node(node.left)
+        right = compile_node(node.right)
+        return lambda data: apply_binary(left(data), right(data))
+    
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        apply_unary = UNARY_OPERATORS[type(node.op)]
+        operand = compile_node(node.operand)
+        return lambda data: apply_unary(operand(data))
+    
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = compile_node(node.operand)
+        return lambda data: ~as_mask(operand(data), data.index)
+    
+    if isinstance(node, ast.BoolOp):
+        return compile_bool(node)
+    
+    if isinstance(node, ast.Compare):
+        return compile_compare(node)
+    
+    if isinstance(node, ast.IfExp):
+        test = compile_node(node.test)
+        body = compile_node(node.body)
+        orelse = compile_node(node.orelse)
+        return lambda data: as_series(body(data), data.index).where(
+            as_mask(test(data), data.index),
+            as_series(orelse(data), data.index)
+        )
+    
+    if isinstance(node, ast.Call):
+        return compile_call(node)
+    
+    raise ExpressionError(f"Unsupported expression: {ast.unparse(node)}")
+
+def check_binary(node: ast.BinOp):
+    """
+    Reject string repetition and oversized exponents known without the data
+    
+    Values that depend on columns are checked when evaluated.
+    
+    Args:
+        node: Binary operation node
+    """
+    if isinstance(node.op, ast.Mult) and any(
+        isinstance(operand, ast.Constant) and isinstance(operand.value, (str, bytes))
+        for operand in (node.left, node.right)
+    ):
+        raise ExpressionError(f"* only multiplies numbers: {ast.unparse(node)}")
+    
+    # Exponents without column references are evaluated now, through the same guards
+    if isinstance(node.op, ast.Pow) and not any(isinstance(child, ast.Name) for child in ast.walk(node.right)):
+        try:
+            exponent = compile_node(node.right)(pd.DataFrame())
+        except ExpressionError:
+            raise
+        except Exception:
+            # Invalid for any data; reported when evaluated
+            return
+        check_exponent(exponent)
+
+def compile_constant(node: ast.Constant) -> Compiled:
+    """
+    Compile a literal
+    
+    Integers become NumPy integers, so constant arithmetic overflows
+    instead of growing unbounded Python integers.
+    
+    Args:
+        node: Constant node
+        
+    Returns:
+        Compiled expression
+    """
+    value = node.value
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return lambda data: value
+    if isinstance(value, int):
+        if not np.iinfo(np.int64).min <= value <= np.iinfo(np.int64).max:
+            raise ExpressionError(f"Integer literal out of range: {value}")
+        number = np.int64(value)
+        return lambda data: number
+    if isinstance(value, float):
+        number = np.float64(value)
+        return lambda data: number
+    
+    raise ExpressionError(f"Unsupported literal: {value!r}")
+
+def is_row_reference(node: ast.AST) -> bool:
+    """
+    Check for a row["name"] or row.name column reference
+    
+    Args:
+        node: Expression node
+        
+    Returns:
+        True when the node references a column through row
+    """
+    if isinstance(node, ast.Subscript):
+        return (
+            isinstance(node.value, ast.Name)
+            and node.value.id == ROW_NAME
+            and isinstance(node.slice, ast.Constant)
+            and isinstance(node.slice.value, str)
+        )
+    if isinstance(node, ast.Attribute):
+        return isinstance(node.value, ast.Name) and node.value.id == ROW_NAME
+    return False
+
+def column_name(node: ast.AST) -> str:
+    """
+    Get the column referenced by a name, row["name"] or row.name node
+    
+    Args:
+        node: Column reference node
+        
+    Returns:
+        Column name
+    """
+    if isinstance(node, ast.Name):
+        if node.id == ROW_NAME:
+            raise ExpressionError(f"{ROW_NAME} must be indexed with a column name")
+        return node.id
+    if isinstance(node, ast.Subscript):
+        return node.slice.value
+    return node.attr
+
+def compile_column(name: str) -> Compiled:
+    """
+    Compile a column reference
+    
+    Args:
+        name: Column name
+        
+    Returns:
+        Compiled expression
+    """
+    def column(data: pd.DataFrame) -> pd.Series:
+        if name not in data.columns:
+            raise ExpressionError(f"Unknown column: {name}")
+        return data[name]
+    return column
+
+def compile_bool(node: ast.BoolOp) -> Compiled:
+    """
+    Compile and / or over null-safe boolean masks
+    
+    Args:
+        node: Boolean operation node
+        
+    Returns:
+        Compiled expression
+    """
+    operands = [compile_node(value) for value in node.values]
+    combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+    return lambda data: functools.reduce(
+        combine,
+        [as_mask(operand(data), data.index) for operand in operands]
+    )
+
+def compile_compare(node: ast.Compare) -> Compiled:
+    """
+    Compile a (possibly chained) comparison
+    
+    Args:
+        node: Comparison node
+        
+    Returns:
+        Compiled expression
+    """
+    operands = [compile_node(node.left)]
+    
+    if isinstance(node.ops[0], (ast.In, ast.NotIn)):
+        if len(node.ops) > 1:
+            raise ExpressionError("in / not in cannot be chained")
+        values = literal_list(node.comparators[0])
+        negate = isinstance(node.ops[0], ast.NotIn)
+        return lambda data: as_series(operands[0](data), data.index).isin(values) != negate
+    
+    compares: List[Callable[[Any, Any], Any]] = []
+    for op, comparator in zip(node.ops, node.comparators):
+        if type(op) not in COMPARE_OPERATORS:
+            raise ExpressionError(f"Unsupported comparison: {type(op).__name__}")
+        compares.append(COMPARE_OPERATORS[type(op)])
+        operands.append(compile_node(comparator))
+    
+    def evaluate(data: pd.DataFrame) -> pd.Series:
+        values = [operand(data) for operand in operands]
+        return functools.reduce(operator.and_, [
+            as_mask(compare(as_series(values[position], data.index), values[position + 1]), data.index)
+            for position, compare in enumerate(compares)
+        ])
+    return evaluate
+
+def literal_list(node: ast.AST) -> List[Any]:
+    """
+    Get the literal values on the right-hand side of in / not in
+    
+    Args:
+        node: List, tuple or set node
+        
+    Returns:
+        Literal values
+    """
+    if not isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        raise ExpressionError("in / not in expects a list of literals")
+    if not all(isinstance(element, ast.Constant) for element in node.elts):
+        raise ExpressionError("in / not in expects a list of literals")
+    return [element.value for element in node.elts]
+
+def compile_call(node: ast.Call) -> Compiled:
+    """
+    Compile a function call, or a method call on a string value
+    
+    Args:
+        node: Call node
+        
+    Returns:
+        Compiled expression
+    """
+    if node.keywords:
+        raise ExpressionError("Keyword arguments are not supported")
+    
+    if isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS:
+        name = node.func.id
+        arguments = [compile_node(argument) for argument in node.args]
+    elif isinstance(node.func, ast.Attribute) and node.func.attr in METHODS:
+        name = node.func.attr
+        arguments = [compile_node(node.func.value)] + [compile_node(argument) for argument in node.args]
+    else:
+        raise ExpressionError(f"Unsupported function: {ast.unparse(node.func)}")
+    
+    min_args, max_args, function = FUNCTIONS[name]
+    if not min_args <= len(arguments) <= max_args:
+        raise ExpressionError(f"{name}() takes {min_args} to {max_args} arguments, got {len(arguments)}")
+    
+    return lambda data: function(data.index, *[argument(data) for argument in arguments])
@@ -1,21 +1,45 @@
+import os
+import gzip
+import json
 import logging
-from fastapi import FastAPI, Depends, HTTPException, Query
-from fastapi.responses import JSONResponse
-from typing import Dict, Any, List, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import Dict, Any, List, Optional, AsyncIterator
 import uvicorn
 
 from services.common.auth import get_current_user
+from services.common.database import get_async_pool, close_async_pool
 from services.terra_map.tiles import (
-    get_vector_tile, 
-    get_feature_info,
-    get_map_layers,
-    get_map_sources
+    MVT_CONTENT_TYPE,
+    is_valid_tile,
+    get_vector_tile_json_async, 
+    get_vector_tile_mvt_async,
+    get_vector_tiles_batch_json_async,
+    get_feature_info_json_async,
+    get_features_json_async,
+    query_features_json_async,
+    stream_features_ndjson_async,
+    get_map_layers_async,
+    get_map_sources_async
 )
+from services.terra_map.raster import PNG_CONTENT_TYPE, RASTER_STYLES, get_raster_tile_async
+from services.terra_map.cache import REVALIDATE_HEADERS, TILE_HEADERS, tile_cache, feature_cache, etag_matches
+from services.terra_map.identify import IDENTIFY_MAX_RESULTS, start_feature_index, identify_features_async
+from services.terra_map.archive import open_tile_archive
+from services.terra_map.catalog import install_catalog_stats
+from services.terra_map.generalization import install_generalization
+from services.terra_map.versions import install_tile_versions, tile_versions
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Pre-seeded MBTiles archive, served before falling back to PostGIS for tiles whose data is unchanged
+tile_archive = open_tile_archive(os.getenv("TERRAMAP_TILE_ARCHIVE"))
+
+# In-memory identify index of the hot layers, built at startup when configured
+feature_index = None
+
 # Initialize FastAPI application
 app = FastAPI(
     title="TerraMap Service",
@@ -23,81 +47,449 @@ app = FastAPI(
     version="1.0.0"
 )
 
+@app.on_event("startup")
+async def startup_event():
+    """Prepare derived tables, the identify index and start following tile data versions"""
+    global feature_index
+    
+    install_generalization()
+    install_catalog_stats()
+    install_tile_versions()
+    await get_async_pool()
+    tile_versions.add_callback(tile_cache.publish_dirty_tiles)
+    await tile_versions.start()
+    feature_index = await start_feature_index()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Clean up resources on shutdown"""
+    await tile_versions.stop()
+    
+    # The tile tier and dirty tile notices may share one bus
+    for bus in {tile_cache.bus, tile_cache.notice_bus}:
+        if bus:
+            await bus.disconnect()
+    
+    if tile_archive:
+        tile_archive.close()
+    
+    await close_async_pool()
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
     return {"status": "healthy", "service": "terra_map"}
 
-@app.get("/tiles/{z}/{x}/{y}", response_model=Dict[str, Any])
-async def tile_endpoint(
-    z: int, 
-    x: int, 
+# Tile formats by file extension
+TILE_FORMATS = {
+    "json": "json",
+    "geojson": "json",
+    "mvt": "mvt",
+    "pbf": "mvt",
+    "png": "png"
+}
+
+# Maximum number of tiles in one batch request
+MAX_BATCH_TILES = 64
+
+# Maximum number of features in one batch lookup
+MAX_BATCH_FEATURES = 500
+
+# Media type of streamed newline-delimited GeoJSON
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Media types that select the binary MVT encoding
+MVT_MEDIA_TYPES = (MVT_CONTENT_TYPE, "application/x-protobuf")
+
+class RawJSONResponse(Response):
+    """
+    JSON response whose content is already-encoded JSON, sent unchanged
+    """
+    media_type = "application/json"
+
+def raw_json_object(fields: Dict[str, Any]) -> bytes:
+    """
+    Encode a JSON object, embedding bytes values as pre-encoded JSON
+    
+    Args:
+        fields: Object fields; bytes values are inserted verbatim, others are JSON-encoded
+        
+    Returns:
+        Encoded JSON object
+    """
+    members = []
+    for name, value in fields.items():
+        encoded = value if isinstance(value, bytes) else json.dumps(value).encode()
+        members.append(json.dumps(name).encode() + b": " + encoded)
+    
+    return b"{" + b", ".join(members) + b"}"
+
+def resolve_tile_format(extension: Optional[str], accept: Optional[str]) -> str:
+    """
+    Resolve the tile encoding from a file extension or the Accept header
+    
+    Args:
+        extension: File extension from the tile URL, if any
+        accept: Value of the Accept request header
+        
+    Returns:
+        Tile format ("json", "mvt" or "png")
+    """
+    if extension:
+        tile_format = TILE_FORMATS.get(extension.lower())
+        if not tile_format:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported tile format '{extension}'. Use one of: {', '.join(TILE_FORMATS)}"
+            )
+        return tile_format
+    
+    # Fall back to content negotiation, keeping GeoJSON as the default
+    if accept and any(media_type in accept for media_type in MVT_MEDIA_TYPES):
+        return "mvt"
+    return "json"
+
+async def render_tile(
+    z: int,
+    x: int,
     y: int,
+    tile_format: str,
     source: Optional[str] = None,
     layers: Optional[str] = None,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    accept_encoding: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    style: Optional[str] = None
 ):
     """
-    Get vector tile for the given tile coordinates
+    Render a tile in the requested format
     
     Args:
         z: Zoom level
         x: Tile X coordinate
         y: Tile Y coordinate
+        tile_format: Tile format ("json", "mvt" or "png")
         source: Optional source name
         layers: Optional comma-separated list of layers
+        accept_encoding: Value of the Accept-Encoding request header
+        if_none_match: Value of the If-None-Match request header
+        style: Raster style of PNG tiles ("features" or "heatmap")
     """
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail=f"Invalid tile coordinates: {z}/{x}/{y}")
+    
+    # Raster styles are cached as formats of their own
+    if tile_format == "png":
+        style = style or "features"
+        if style not in RASTER_STYLES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported raster style '{style}'. Use one of: {', '.join(RASTER_STYLES)}"
+            )
+        tile_format = f"png:{style}"
+    
     try:
         # Parse layers if provided
         layer_list = layers.split(",") if layers else None
         
-        # Get tile data
-        tile_data = get_vector_tile(z, x, y, source, layer_list)
+        # Answer conditional requests from the tile's data version alone
+        etag = tile_cache.tile_etag(z, x, y, tile_format, source, layer_list)
+        headers = {**TILE_HEADERS, "ETag": etag} if etag else dict(TILE_HEADERS)
+        if etag and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
         
-        return {
-            "status": "success",
-            "tile": tile_data
-        }
+        # Unfiltered MVT tiles come straight from the pre-seeded archive while their data is unchanged
+        if (
+            tile_format == "mvt" and tile_archive and not source and not layer_list
+            and tile_archive.is_current(z, x, y, tile_versions)
+        ):
+            archived_tile = tile_archive.get_tile(z, x, y)
+            if archived_tile is not None:
+                if accept_encoding and "gzip" in accept_encoding:
+                    return Response(
+                        content=archived_tile,
+                        media_type=MVT_CONTENT_TYPE,
+                        headers={**headers, "Content-Encoding": "gzip"}
+                    )
+                return Response(content=gzip.decompress(archived_tile), media_type=MVT_CONTENT_TYPE, headers=headers)
+        
+        if tile_format == "mvt":
+            tile_bytes = await tile_cache.get_or_render(
+                z, x, y, tile_format, source, layer_list,
+                lambda: get_vector_tile_mvt_async(z, x, y, source, layer_list)
+            )
+            return Response(content=tile_bytes, media_type=MVT_CONTENT_TYPE, headers=headers)
+        
+        if tile_format.startswith("png:"):
+            tile_png = await tile_cache.get_or_render(
+                z, x, y, tile_format, source, layer_list,
+                lambda: get_raster_tile_async(z, x, y, style, source, layer_list)
+            )
+            return Response(content=tile_png, media_type=PNG_CONTENT_TYPE, headers=headers)
+        
+        # Get tile data as GeoJSON assembled by PostGIS
+        tile_json = await tile_cache.get_or_render(
+            z, x, y, tile_format, source, layer_list,
+            lambda: get_vector_tile_json_async(z, x, y, source, layer_list)
+        )
+        
+        return RawJSONResponse(
+            content=raw_json_object({
+                "status": "success",
+                "tile": tile_json
+            }),
+            headers=headers
+        )
     except Exception as e:
         logger.error(f"Error getting tile: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting tile: {str(e)}")
 
+def parse_batch_tiles(tiles: List[Any]) -> List[tuple]:
+    """
+    Parse the tile list of a batch request
+    
+    Args:
+        tiles: Tiles as [z, x, y] lists, {"z", "x", "y"} objects or "z/x/y" strings
+        
+    Returns:
+        Tile coordinates as (z, x, y)
+    """
+    parsed = []
+    for tile in tiles:
+        try:
+            if isinstance(tile, dict):
+                z, x, y = tile["z"], tile["x"], tile["y"]
+            elif isinstance(tile, str):
+                z, x, y = tile.split("/")
+            else:
+                z, x, y = tile
+            z, x, y = int(z), int(x), int(y)
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid tile coordinates: {tile}")
+        
+        if not is_valid_tile(z, x, y):
+            raise HTTPException(status_code=400, detail=f"Invalid tile coordinates: {tile}")
+        parsed.append((z, x, y))
+    
+    return parsed
+
+@app.post("/tiles/batch", response_model=Dict[str, Any])
+async def tile_batch_endpoint(
+    batch: Dict[str, Any],
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Get many GeoJSON tiles in one request
+    
+    Batch should include:
+    - tiles: List of tiles as [z, x, y], {"z": z, "x": x, "y": y} or "z/x/y"
+    - source: Optional source name
+    - layers: Optional list (or comma-separated string) of layers
+    
+    Cached tiles are answered from the tile cache; the rest are fetched
+    with a single database query.
+    """
+    tiles = parse_batch_tiles(batch.get("tiles") or [])
+    if not tiles:
+        raise HTTPException(status_code=400, detail="Batch must include at least one tile")
+    if len(tiles) > MAX_BATCH_TILES:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {MAX_BATCH_TILES} tiles")
+    
+    source = batch.get("source")
+    layers = batch.get("layers")
+    layer_list = layers.split(",") if isinstance(layers, str) else layers
+    
+    try:
+        results = {}
+        misses = {}
+        
+        # Answer what we can from the tile cache
+        for z, x, y in tiles:
+            if not tile_cache.is_cacheable(z):
+                misses[(z, x, y)] = None
+                continue
+            
+            key = tile_cache.variant_key(z, x, y, "json", source, layer_list)
+            value, versioned_key = await tile_cache.lookup(key)
+            if value is not None:
+                results[(z, x, y)] = value
+            else:
+                misses[(z, x, y)] = versioned_key
+        
+        # Fetch every remaining tile in one round trip
+        if misses:
+            rendered = await get_vector_tiles_batch_json_async(list(misses), source, layer_list)
+            for tile, tile_json in rendered.items():
+                results[tile] = tile_json
+                versioned_key = misses[tile]
+                if versioned_key:
+                    await tile_cache.store(versioned_key, tile_json)
+        
+        return RawJSONResponse(content=raw_json_object({
+            "status": "success",
+            "tiles": raw_json_object({f"{z}/{x}/{y}": results[(z, x, y)] for z, x, y in tiles})
+        }))
+    except Exception as e:
+        logger.error(f"Error getting tile batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error getting tile batch: {str(e)}")
+
+@app.get("/tiles/{z}/{x}/{y}.{extension}")
+async def tile_with_extension_endpoint(
+    request: Request,
+    z: int, 
+    x: int, 
+    y: int,
+    extension: str,
+    source: Optional[str] = None,
+    layers: Optional[str] = None,
+    style: Optional[str] = Query(None, description="Raster style of PNG tiles: features or heatmap"),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Get a tile for the given tile coordinates in the format named by the extension
+    
+    PNG tiles are rendered server-side, either from the tile's geometries
+    or as a density heatmap, for overview maps of dense layers.
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        extension: Tile format extension (json, geojson, mvt, pbf or png)
+        source: Optional source name
+        layers: Optional comma-separated list of layers
+        style: Raster style of PNG tiles (features or heatmap)
+    """
+    tile_format = resolve_tile_format(extension, None)
+    return await render_tile(
+        z, x, y, tile_format, source, layers,
+        accept_encoding=request.headers.get("accept-encoding"),
+        if_none_match=request.headers.get("if-none-match"),
+        style=style
+    )
+
+@app.get("/tiles/{z}/{x}/{y}")
+async def tile_endpoint(
+    request: Request,
+    z: int, 
+    x: int, 
+    y: int,
+    source: Optional[str] = None,
+    layers: Optional[str] = None,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Get vector tile for the given tile coordinates
+    
+    Returns GeoJSON by default, or a Mapbox Vector Tile when the Accept
+    header asks for application/vnd.mapbox-vector-tile.
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source name
+        layers: Optional comma-separated list of layers
+    """
+    tile_format = resolve_tile_format(None, request.headers.get("accept"))
+    return await render_tile(
+        z, x, y, tile_format, source, layers,
+        accept_encoding=request.headers.get("accept-encoding"),
+        if_none_match=request.headers.get("if-none-match")
+    )
+
 @app.get("/layers", response_model=Dict[str, Any])
 async def layers_endpoint(
+    request: Request,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Get available map layers
     """
     try:
-        layers = get_map_layers()
+        # Answer conditional requests without querying PostGIS
+        etag = tile_cache.catalog_etag("layers")
+        headers = {**REVALIDATE_HEADERS, "ETag": etag} if etag else dict(REVALIDATE_HEADERS)
+        if etag and etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
         
-        return {
-            "status": "success",
-            "layers": layers
-        }
+        layers = await get_map_layers_async()
+        
+        return JSONResponse(
+            content={
+                "status": "success",
+                "layers": layers
+            },
+            headers=headers
+        )
     except Exception as e:
         logger.error(f"Error getting layers: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting layers: {str(e)}")
 
 @app.get("/sources", response_model=Dict[str, Any])
 async def sources_endpoint(
+    request: Request,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Get available map sources
     """
     try:
-        sources = get_map_sources()
+        # Answer conditional requests without querying PostGIS
+        etag = tile_cache.catalog_etag("sources")
+        headers = {**REVALIDATE_HEADERS, "ETag": etag} if etag else dict(REVALIDATE_HEADERS)
+        if etag and etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
         
-        return {
-            "status": "success",
-            "sources": sources
-        }
+        sources = await get_map_sources_async()
+        
+        return JSONResponse(
+            content={
+                "status": "success",
+                "sources": sources
+            },
+            headers=headers
+        )
     except Exception as e:
         logger.error(f"Error getting sources: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting sources: {str(e)}")
 
+@app.get("/features", response_model=Dict[str, Any])
+async def features_batch_endpoint(
+    ids: str = Query(..., description="Comma-separated feature IDs"),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Get many features in one request
+    
+    Features are looked up with a single query; features cached at their
+    current updated_at are served from the feature cache without their
+    GeoJSON crossing the wire again.
+    
+    Args:
+        ids: Comma-separated feature IDs
+    """
+    # Keep the request order, dropping duplicates
+    feature_ids = list(dict.fromkeys(feature_id for feature_id in ids.split(",") if feature_id))
+    if not feature_ids:
+        raise HTTPException(status_code=400, detail="At least one feature ID is required")
+    if len(feature_ids) > MAX_BATCH_FEATURES:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {MAX_BATCH_FEATURES} features")
+    
+    try:
+        features = await feature_cache.get_many(
+            feature_ids,
+            lambda known_versions: get_features_json_async(feature_ids, known_versions)
+        )
+        
+        return RawJSONResponse(content=raw_json_object({
+            "status": "success",
+            "features": b"[" + b", ".join(features[feature_id] for feature_id in feature_ids if feature_id in features) + b"]",
+            "missing": [feature_id for feature_id in feature_ids if feature_id not in features]
+        }))
+    except Exception as e:
+        logger.error(f"Error getting features: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error getting features: {str(e)}")
+
 @app.get("/features/{feature_id}", response_model=Dict[str, Any])
 async def feature_endpoint(
     feature_id: str,
@@ -110,36 +502,109 @@ async def feature_endpoint(
         feature_id: ID of the feature
     """
     try:
-        feature_info = get_feature_info(feature_id)
+        feature_json = await get_feature_info_json_async(feature_id)
         
-        if not feature_info:
+        if not feature_json:
             raise HTTPException(status_code=404, detail=f"Feature {feature_id} not found")
         
-        return {
+        return RawJSONResponse(content=raw_json_object({
             "status": "success",
-            "feature": feature_info
-        }
+            "feature": feature_json
+        }))
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error getting feature info: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting feature info: {str(e)}")
 
+@app.get("/identify", response_model=Dict[str, Any])
+async def identify_endpoint(
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the point"),
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the point"),
+    layers: Optional[str] = None,
+    limit: int = Query(IDENTIFY_MAX_RESULTS, ge=1, le=IDENTIFY_MAX_RESULTS, description="Maximum number of features"),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Identify the features under a point
+    
+    Lookups on indexed layers are answered from the in-memory identify
+    index; other layers fall back to PostGIS.
+    
+    Args:
+        lon: Longitude (EPSG:4326)
+        lat: Latitude (EPSG:4326)
+        layers: Optional comma-separated list of layers (defaults to the indexed layers when the index is enabled)
+        limit: Maximum number of features to return
+    """
+    layer_list = layers.split(",") if layers else None
+    if layer_list is None and feature_index:
+        layer_list = feature_index.layers
+    
+    try:
+        if feature_index and feature_index.covers(layer_list):
+            features = feature_index.identify(lon, lat, layer_list, limit)
+        else:
+            features = await identify_features_async(lon, lat, layer_list, limit)
+        
+        return {
+            "status": "success",
+            "features": features,
+            "count": len(features)
+        }
+    except Exception as e:
+        logger.error(f"Error identifying features: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error identifying features: {str(e)}")
+
+async def stream_ndjson(lines: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Relay a newline-delimited JSON stream, reporting a failure in the stream itself
+    
+    The 200 status is sent with the first line, so an error after that ends
+    the stream with an error line rather than a silently truncated body.
+    
+    Args:
+        lines: Encoded lines, each ending with a newline
+        
+    Yields:
+        The lines, then an error line if the stream failed
+    """
+    try:
+        async for line in lines:
+            yield line
+    except Exception as e:
+        logger.error(f"Error streaming features: {str(e)}")
+        yield json.dumps({"status": "error", "message": f"Error querying features: {str(e)}"}).encode() + b"\n"
+
 @app.get("/query", response_model=Dict[str, Any])
-async def query_features(
+async def query_endpoint(
     bbox: str = Query(..., description="Bounding box in format minx,miny,maxx,maxy"),
     layer: Optional[str] = None,
-    limit: int = 100,
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of features (default 100; unlimited when streaming)"),
+    zoom: Optional[int] = Query(None, ge=0, description="Map zoom level selecting coordinate precision and properties"),
+    cursor: Optional[int] = Query(None, ge=0, description="Continue after this cursor (next_cursor of the previous page)"),
+    output: str = Query("json", alias="format", description="json for a page of features, ndjson to stream them"),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Query features within a bounding box
     
+    Results are ordered by feature id. JSON responses are pages carrying a
+    next_cursor for the following page; format=ndjson streams every match
+    as newline-delimited GeoJSON features, each with the cursor to resume
+    after it. A stream that fails midway ends with a {"status": "error"} line.
+    
     Args:
         bbox: Bounding box coordinates (minx,miny,maxx,maxy)
         layer: Optional layer name to filter by
         limit: Maximum number of features to return
+        zoom: Optional map zoom level; payloads follow the layer settings of that zoom
+        cursor: Optional keyset cursor to continue from
+        output: Response format (json or ndjson)
     """
+    if output not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="Invalid format. Use json or ndjson")
+    
     try:
         # Parse bounding box
         try:
@@ -147,52 +612,24 @@ async def query_features(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid bounding box format. Use minx,miny,maxx,maxy")
         
-        # Build query
-        query = f"""
-        SELECT 
-            id, 
-            feature_id, 
-            feature_type, 
-            properties, 
-            ST_AsGeoJSON(geometry) as geometry,
-            source_system,
-            is_synced
-        FROM 
-            spatial_features
-        WHERE 
-            ST_Intersects(geometry, ST_MakeEnvelope({minx}, {miny}, {maxx}, {maxy}, 4326))
-        """
-        
-        if layer:
-            query += f" AND feature_type = '{layer}'"
-        
-        query += f" LIMIT {limit}"
-        
-        # Execute query
-        result = await execute_query(query)
-        
-        # Convert to GeoJSON
-        features = []
-        for row in result:
-            feature = {
-                "type": "Feature",
-                "id": row["feature_id"],
-                "properties": {
-                    **row["properties"],
-                    "id": row["feature_id"],
-                    "feature_type": row["feature_type"],
-                    "source_system": row["source_system"],
-                    "is_synced": row["is_synced"]
-                },
-                "geometry": json.loads(row["geometry"])
-            }
-            features.append(feature)
+        # Stream through a server-side cursor, holding one batch of rows at a time
+        if output == "ndjson":
+            return StreamingResponse(
+                stream_ndjson(stream_features_ndjson_async((minx, miny, maxx, maxy), layer, limit, zoom, cursor)),
+                media_type=NDJSON_MEDIA_TYPE
+            )
         
-        return {
+        # Query one page with bound parameters
+        features_json, count, next_cursor = await query_features_json_async(
+            (minx, miny, maxx, maxy), layer, limit or 100, zoom, cursor
+        )
+        
+        return RawJSONResponse(content=raw_json_object({
             "status": "success",
-            "features": features,
-            "count": len(features)
-        }
+            "features": features_json,
+            "count": count,
+            "next_cursor": next_cursor
+        }))
     except HTTPException:
         raise
     except Exception as e:
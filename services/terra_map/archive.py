@@ -0,0 +1,198 @@
+import os
+import json
+import logging
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+from services.terra_map.layers import LAYER_CONFIG_VERSION
+from services.terra_map.versions import TileVersions
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Memory-map up to this many bytes of the archive (SQLite mmap_size pragma)
+MBTILES_MMAP_SIZE = int(os.getenv("MBTILES_MMAP_SIZE", str(1 << 30)))
+
+class MBTilesArchive:
+    """
+    Read-only access to an MBTiles archive of gzip-compressed vector tiles
+    
+    Reads go through SQLite memory-mapped I/O, so hot tiles are served from
+    the page cache without copying through read() calls. The tile versions
+    recorded at seeding tell which tiles still match the database.
+    """
+    def __init__(self, file_path: str, mmap_size: int = MBTILES_MMAP_SIZE):
+        """
+        Open an MBTiles archive
+        
+        Args:
+            file_path: Path to the .mbtiles file
+            mmap_size: Maximum number of bytes to memory-map
+        """
+        if not os.path.exists(file_path):
+            raise ValueError(f"MBTiles archive not found: {file_path}")
+        
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            f"file:{file_path}?mode=ro&immutable=1",
+            uri=True,
+            check_same_thread=False
+        )
+        self._connection.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        
+        # Load archive metadata
+        self.metadata = dict(self._connection.execute("SELECT name, value FROM metadata").fetchall())
+        self.minzoom = int(self.metadata.get("minzoom", 0))
+        self.maxzoom = int(self.metadata.get("maxzoom", 14))
+        
+        # Data versions the tiles were rendered from, if the seeder recorded them
+        self.versions: Optional[TileVersions] = None
+        if "tile_versions" in self.metadata and "tile_version_zoom" in self.metadata:
+            self.versions = TileVersions(int(self.metadata["tile_version_zoom"]))
+            self.versions.replace(tuple(row) for row in json.loads(self.metadata["tile_versions"]))
+        self.layer_config_current = self.metadata.get("layer_config_version") == LAYER_CONFIG_VERSION
+    
+    def is_current(self, z: int, x: int, y: int, versions: TileVersions) -> bool:
+        """
+        Check whether an archived tile still matches the data it was rendered from
+        
+        Args:
+            z: Zoom level
+            x: Tile X coordinate
+            y: Tile Y coordinate
+            versions: Current tile versions
+            
+        Returns:
+            True if neither the tile's data nor the layer configuration changed since seeding
+        """
+        return (
+            self.versions is not None
+            and self.layer_config_current
+            and versions.ready
+            and versions.zoom == self.versions.zoom
+            and versions.tile_version(z, x, y) == self.versions.tile_version(z, x, y)
+        )
+    
+    def get_tile(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """
+        Get a tile from the archive
+        
+        Args:
+            z: Zoom level
+            x: Tile X coordinate
+            y: Tile Y coordinate (XYZ scheme)
+            
+        Returns:
+            Gzip-compressed tile data, or None if the archive has no such tile
+        """
+        if z < self.minzoom or z > self.maxzoom:
+            return None
+        
+        # MBTiles stores rows in the TMS scheme
+        tile_row = (1 << z) - 1 - y
+        
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (z, x, tile_row)
+            ).fetchone()
+        
+        return bytes(row[0]) if row else None
+    
+    def close(self):
+        """
+        Close the archive
+        """
+        with self._lock:
+            self._connection.close()
+
+def write_mbtiles(
+    file_path: str,
+    tiles: Iterable[Tuple[int, int, int, bytes]],
+    metadata: Dict[str, Any],
+    batch_size: int = 500
+) -> int:
+    """
+    Write tiles to a new MBTiles archive
+    
+    The archive is written next to the target and moved into place once
+    complete, so readers never see a partially written file.
+    
+    Args:
+        file_path: Path of the .mbtiles file to create
+        tiles: Iterable of (z, x, y, gzip-compressed tile data) in the XYZ scheme
+        metadata: MBTiles metadata values
+        batch_size: Number of tiles inserted per transaction
+        
+    Returns:
+        Number of tiles written
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    temp_path = f"{file_path}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+        connection.execute(
+            "CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)"
+        )
+        
+        connection.executemany(
+            "INSERT INTO metadata (name, value) VALUES (?, ?)",
+            [(name, value if isinstance(value, str) else json.dumps(value)) for name, value in metadata.items()]
+        )
+        
+        count = 0
+        batch: List[Tuple[int, int, int, bytes]] = []
+        for z, x, y, tile_data in tiles:
+            batch.append((z, x, (1 << z) - 1 - y, sqlite3.Binary(tile_data)))
+            
+            if len(batch) >= batch_size:
+                connection.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", batch)
+                connection.commit()
+                count += len(batch)
+                batch = []
+        
+        if batch:
+            connection.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", batch)
+            count += len(batch)
+        
+        # Index after bulk insert, as required by the MBTiles spec
+        connection.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+        connection.commit()
+    finally:
+        connection.close()
+    
+    os.replace(temp_path, file_path)
+    logger.info(f"Wrote {count} tiles to MBTiles archive {file_path}")
+    return count
+
+def open_tile_archive(file_path: Optional[str]) -> Optional[MBTilesArchive]:
+    """
+    Open a tile archive if one is configured
+    
+    Args:
+        file_path: Path to the archive, or None
+        
+    Returns:
+        Opened archive, or None if not configured or not readable
+    """
+    if not file_path:
+        return None
+    
+    try:
+        archive = MBTilesArchive(file_path)
+        if archive.versions is None:
+            logger.warning(f"Tile archive {file_path} records no tile versions and will not be served; seed it again")
+        else:
+            logger.info(f"Serving tiles z{archive.minzoom}-{archive.maxzoom} from {file_path}")
+        return archive
+    except Exception as e:
+        logger.error(f"Error opening tile archive {file_path}: {str(e)}")
+        return None
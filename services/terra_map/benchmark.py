@@ -0,0 +1,534 @@
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Callable
+import mercantile
+from sqlalchemy import text
+
+from services.common.database import get_db_session, get_async_pool, close_async_pool, execute_spatial_query_async
+from services.terra_map.catalog import CATALOG_STATS_SQL, install_catalog_stats
+from services.terra_map.generalization import install_generalization
+from services.terra_map.tiles import (
+    Statement,
+    TILE_FEATURE_BUDGET,
+    TILE_AGGREGATION_MAX_ZOOM,
+    get_vector_tile_json_async,
+    get_vector_tile_mvt_async,
+    get_feature_info_json_async,
+    get_map_layers_async,
+    tile_exceeds_feature_budget_async,
+    feature_budget_statement,
+    vector_tile_json_statement,
+    aggregated_tile_json_statement,
+    vector_tile_mvt_statement,
+    aggregated_tile_mvt_statement,
+    feature_info_json_statement,
+    query_features_json_statement
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Source system of every seeded feature, so benchmark data is easy to remove
+BENCHMARK_SOURCE = "benchmark"
+
+# Seeded parcels cover this extent (minx, miny, maxx, maxy in EPSG:4326);
+# larger datasets in the same extent give denser tiles
+BENCHMARK_EXTENT: Tuple[float, float, float, float] = (-95.84, 36.96, -95.59, 37.21)
+
+# Space left between neighbouring parcels, as a fraction of the grid cell
+PARCEL_GAP = 0.05
+
+# Synthetic parcels on a regular grid, with properties resembling assessor data
+SEED_PARCELS_SQL = """
+INSERT INTO spatial_features (feature_id, feature_type, properties, geometry, source_system, is_synced, created_at, updated_at)
+SELECT
+    :layer || '-' || i,
+    :layer,
+    jsonb_build_object(
+        'parcel_id', :layer || '-' || i,
+        'owner', 'Owner ' || (i % 997),
+        'land_use', (ARRAY['residential', 'commercial', 'agricultural', 'industrial'])[1 + i % 4],
+        'assessed_value', 50000 + (i * 7919) % 900000,
+        'acres', round(((i * 31) % 500 / 100.0 + 0.1)::numeric, 2)
+    ),
+    ST_MakeEnvelope(
+        :minx + (i % :side + :gap) * :cell,
+        :miny + (i / :side + :gap) * :cell,
+        :minx + (i % :side + 1 - :gap) * :cell,
+        :miny + (i / :side + 1 - :gap) * :cell,
+        4326
+    ),
+    :source,
+    false,
+    now(),
+    now()
+FROM generate_series(0, :count - 1) AS i
+"""
+
+def dataset_layer(size: int) -> str:
+    """
+    Get the layer name of a seeded dataset
+    
+    Args:
+        size: Number of parcels in the dataset
+        
+    Returns:
+        Layer (feature_type) name
+    """
+    return f"bench_parcel_{size}"
+
+def seed_dataset(size: int, extent: Tuple[float, float, float, float] = BENCHMARK_EXTENT) -> bool:
+    """
+    Load a synthetic parcel dataset unless it is already present
+    
+    Args:
+        size: Number of parcels
+        extent: Extent the parcel grid covers
+        
+    Returns:
+        True if the dataset was loaded, False if it already existed
+    """
+    layer = dataset_layer(size)
+    minx, miny, maxx, maxy = extent
+    side = math.ceil(math.sqrt(size))
+    cell = min(maxx - minx, maxy - miny) / side
+    
+    with get_db_session() as db:
+        existing = db.execute(
+            text("SELECT COUNT(*) FROM spatial_features WHERE feature_type = :layer AND source_system = :source"),
+            {"layer": layer, "source": BENCHMARK_SOURCE}
+        ).scalar()
+        if existing == size:
+            return False
+        
+        # Replace partial or differently sized leftovers
+        db.execute(
+            text("DELETE FROM spatial_features WHERE feature_type = :layer AND source_system = :source"),
+            {"layer": layer, "source": BENCHMARK_SOURCE}
+        )
+        db.execute(text(SEED_PARCELS_SQL), {
+            "layer": layer,
+            "source": BENCHMARK_SOURCE,
+            "count": size,
+            "side": side,
+            "cell": cell,
+            "gap": PARCEL_GAP,
+            "minx": minx,
+            "miny": miny
+        })
+        db.execute(text("ANALYZE spatial_features"))
+        db.commit()
+    
+    logger.info(f"Seeded {size} parcels into layer {layer}")
+    return True
+
+def drop_datasets(sizes: List[int]):
+    """
+    Remove seeded datasets
+    
+    Args:
+        sizes: Sizes of the datasets to remove
+    """
+    with get_db_session() as db:
+        db.execute(
+            text("DELETE FROM spatial_features WHERE feature_type = ANY(:layers) AND source_system = :source"),
+            {"layers": [dataset_layer(size) for size in sizes], "source": BENCHMARK_SOURCE}
+        )
+        db.commit()
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """
+    Get a nearest-rank percentile
+    
+    Args:
+        values: Sample values
+        fraction: Percentile as a fraction (0.95 for p95)
+        
+    Returns:
+        Percentile value, or None without samples
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize(values: List[float], digits: int = 3) -> Dict[str, Any]:
+    """
+    Summarize samples as p50/p95/p99, mean and max
+    
+    Args:
+        values: Sample values
+        digits: Decimal places to round to
+        
+    Returns:
+        Summary statistics
+    """
+    summary = {
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "mean": sum(values) / len(values) if values else None,
+        "max": max(values) if values else None
+    }
+    return {key: round(value, digits) if value is not None else None for key, value in summary.items()}
+
+def plan_rows_scanned(plan: Dict[str, Any]) -> int:
+    """
+    Count the rows read by the scan nodes of an EXPLAIN ANALYZE plan
+    
+    Rows discarded by filters and index rechecks count as read.
+    
+    Args:
+        plan: Plan node from EXPLAIN (ANALYZE, FORMAT JSON)
+        
+    Returns:
+        Number of rows scanned
+    """
+    rows = 0
+    if "Scan" in plan.get("Node Type", ""):
+        loops = plan.get("Actual Loops", 1)
+        rows += (plan.get("Actual Rows", 0) + plan.get("Rows Removed by Filter", 0)) * loops
+        rows += plan.get("Rows Removed by Index Recheck", 0)
+    
+    for child in plan.get("Plans", []):
+        rows += plan_rows_scanned(child)
+    return int(rows)
+
+async def rows_scanned(statements: List[Statement]) -> int:
+    """
+    Run statements under EXPLAIN ANALYZE and count the rows they scanned
+    
+    Args:
+        statements: Statements a benchmarked call runs
+        
+    Returns:
+        Total number of rows scanned
+    """
+    total = 0
+    for _, query, args in statements:
+        result = await execute_spatial_query_async(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}", args)
+        if result["status"] != "success":
+            raise Exception(f"Error explaining benchmark query: {result.get('message')}")
+        
+        plan = result["data"][0]["QUERY PLAN"]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        total += plan_rows_scanned(plan[0]["Plan"])
+    return total
+
+async def sample_rows_scanned(samples: List[Any], statements: Callable[[Any], Any]) -> List[int]:
+    """
+    Count the rows scanned by each timed call
+    
+    Each distinct sample is explained once.
+    
+    Args:
+        samples: Arguments of the timed calls, such as tiles or feature IDs
+        statements: Function giving the statements a call with a sample's
+            arguments runs; may return an awaitable
+            
+    Returns:
+        Rows scanned per sample, in sample order
+    """
+    scanned: Dict[Any, int] = {}
+    for sample in samples:
+        if sample not in scanned:
+            sample_statements = statements(sample)
+            if asyncio.iscoroutine(sample_statements):
+                sample_statements = await sample_statements
+            scanned[sample] = await rows_scanned(sample_statements)
+    return [scanned[sample] for sample in samples]
+
+async def tile_statements(
+    tile: Tuple[int, int, int],
+    layers: List[str],
+    statement: Callable[..., Statement],
+    aggregated_statement: Callable[..., Statement]
+) -> List[Statement]:
+    """
+    Get the statements the service runs to render a tile
+    
+    The feature budget is only counted up to TILE_AGGREGATION_MAX_ZOOM;
+    deeper tiles are never aggregated.
+    
+    Args:
+        tile: Tile as (z, x, y)
+        layers: Layers of the tile
+        statement: Statement builder of the tile's features
+        aggregated_statement: Statement builder of the tile's grid cells
+        
+    Returns:
+        Statements run for the tile
+    """
+    z, x, y = tile
+    if z > TILE_AGGREGATION_MAX_ZOOM:
+        return [statement(z, x, y, None, layers)]
+    
+    dense = await tile_exceeds_feature_budget_async(z, x, y, None, layers)
+    return [
+        feature_budget_statement(z, x, y, None, layers),
+        (aggregated_statement if dense else statement)(z, x, y, None, layers)
+    ]
+
+def payload_size(value: Any) -> int:
+    """
+    Get the size of a result as served
+    
+    Args:
+        value: Result of a benchmarked call (bytes, a response or JSON data)
+        
+    Returns:
+        Payload size in bytes
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if hasattr(value, "body"):
+        return len(value.body)
+    return len(json.dumps(value, default=str).encode())
+
+async def measure(
+    call: Callable[[], Any],
+    iterations: int,
+    warmup: int
+) -> Tuple[List[float], List[int]]:
+    """
+    Time repeated calls
+    
+    Args:
+        call: Function to benchmark; may return an awaitable
+        iterations: Number of timed calls
+        warmup: Number of untimed calls made first
+        
+    Returns:
+        Tuple of latencies in milliseconds and payload sizes in bytes
+    """
+    latencies = []
+    sizes = []
+    for i in range(warmup + iterations):
+        started = time.perf_counter()
+        value = call()
+        if asyncio.iscoroutine(value):
+            value = await value
+        elapsed = (time.perf_counter() - started) * 1000
+        
+        if i >= warmup:
+            latencies.append(elapsed)
+            sizes.append(payload_size(value))
+    return latencies, sizes
+
+def sample_tiles(z: int, count: int, rng: random.Random, extent: Tuple[float, float, float, float] = BENCHMARK_EXTENT) -> List[Tuple[int, int, int]]:
+    """
+    Pick tiles covering the seeded extent
+    
+    Args:
+        z: Zoom level
+        count: Number of tiles to pick
+        rng: Random number generator
+        extent: Extent the tiles must intersect
+        
+    Returns:
+        List of (z, x, y) tiles, repeating when the extent has fewer tiles
+    """
+    tiles = [(tile.z, tile.x, tile.y) for tile in mercantile.tiles(*extent, zooms=[z])]
+    return [rng.choice(tiles) for _ in range(count)]
+
+async def benchmark_dataset(size: int, zooms: List[int], iterations: int, warmup: int, query_limit: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    Benchmark the tile and feature paths against one dataset
+    
+    Args:
+        size: Dataset size
+        zooms: Zoom levels to request tiles and queries at
+        iterations: Number of timed calls per case
+        warmup: Number of untimed calls per case
+        query_limit: Feature limit of /query requests
+        rng: Random number generator
+        
+    Returns:
+        One result per case and zoom level
+    """
+    # Imported here so the service's startup (archive, tile cache) only loads when needed
+    from services.terra_map.app import query_endpoint
+    
+    layer = dataset_layer(size)
+    layers = [layer]
+    results = []
+    
+    def result(case: str, zoom: Optional[int], latencies: List[float], sizes: List[int], scanned: List[int]) -> Dict[str, Any]:
+        return {
+            "case": case,
+            "dataset": size,
+            "layer": layer,
+            "zoom": zoom,
+            "samples": len(latencies),
+            "latency_ms": summarize(latencies),
+            "payload_bytes": summarize(sizes, 0),
+            "rows_scanned": summarize(scanned, 0)
+        }
+    
+    for z in zooms:
+        # Vector tiles as the service renders them, sampled across the dataset;
+        # rows scanned are counted for the same tiles that were timed
+        sampled = sample_tiles(z, warmup + iterations, rng)
+        tiles = iter(sampled)
+        latencies, sizes = await measure(lambda: get_vector_tile_json_async(*next(tiles), layers=layers), iterations, warmup)
+        scanned = await sample_rows_scanned(
+            sampled[warmup:],
+            lambda tile: tile_statements(tile, layers, vector_tile_json_statement, aggregated_tile_json_statement)
+        )
+        results.append(result("vector_tile", z, latencies, sizes, scanned))
+        
+        sampled = sample_tiles(z, warmup + iterations, rng)
+        tiles = iter(sampled)
+        latencies, sizes = await measure(lambda: get_vector_tile_mvt_async(*next(tiles), layers=layers), iterations, warmup)
+        scanned = await sample_rows_scanned(
+            sampled[warmup:],
+            lambda tile: tile_statements(tile, layers, vector_tile_mvt_statement, aggregated_tile_mvt_statement)
+        )
+        results.append(result("vector_tile_mvt", z, latencies, sizes, scanned))
+        
+        # /query over the extent of a sampled tile
+        sampled = [tuple(mercantile.bounds(*tile)) for tile in sample_tiles(z, warmup + iterations, rng)]
+        bboxes = iter(sampled)
+        latencies, sizes = await measure(
+            lambda: query_endpoint(
+                bbox=",".join(str(value) for value in next(bboxes)),
+                layer=layer,
+                limit=query_limit,
+                zoom=z,
+                cursor=None,
+                output="json",
+                current_user={}
+            ),
+            iterations,
+            warmup
+        )
+        scanned = await sample_rows_scanned(
+            sampled[warmup:],
+            lambda bbox: [query_features_json_statement(bbox, layer, query_limit, z)]
+        )
+        results.append(result("query", z, latencies, sizes, scanned))
+    
+    # Single feature lookups by random ID
+    sampled = [f"{layer}-{rng.randrange(size)}" for _ in range(warmup + iterations)]
+    feature_ids = iter(sampled)
+    latencies, sizes = await measure(lambda: get_feature_info_json_async(next(feature_ids)), iterations, warmup)
+    scanned = await sample_rows_scanned(sampled[warmup:], lambda feature_id: [feature_info_json_statement(feature_id)])
+    results.append(result("feature_info", None, latencies, sizes, scanned))
+    
+    # Layer catalogue, which covers every dataset
+    latencies, sizes = await measure(get_map_layers_async, iterations, warmup)
+    scanned = await rows_scanned([("catalog_stats", CATALOG_STATS_SQL, ["feature_type"])])
+    results.append(result("map_layers", None, latencies, sizes, [scanned]))
+    
+    return results
+
+async def run_benchmark(
+    sizes: List[int],
+    zooms: List[int],
+    iterations: int = 50,
+    warmup: int = 5,
+    query_limit: int = 100,
+    seed: int = 0,
+    keep: bool = False
+) -> Dict[str, Any]:
+    """
+    Seed the datasets and benchmark each of them
+    
+    Args:
+        sizes: Dataset sizes (number of parcels)
+        zooms: Zoom levels to request tiles and queries at
+        iterations: Number of timed calls per case
+        warmup: Number of untimed calls per case
+        query_limit: Feature limit of /query requests
+        seed: Random seed for tile and feature sampling
+        keep: Keep the seeded datasets for later runs
+        
+    Returns:
+        Benchmark report
+    """
+    install_generalization()
+    install_catalog_stats()
+    await get_async_pool()
+    
+    rng = random.Random(seed)
+    results = []
+    try:
+        for size in sizes:
+            started = time.perf_counter()
+            seeded = seed_dataset(size)
+            seed_seconds = round(time.perf_counter() - started, 3) if seeded else None
+            
+            dataset_results = await benchmark_dataset(size, zooms, iterations, warmup, query_limit, rng)
+            for dataset_result in dataset_results:
+                dataset_result["seed_seconds"] = seed_seconds
+            results.extend(dataset_results)
+    finally:
+        if not keep:
+            drop_datasets(sizes)
+        await close_async_pool()
+    
+    return {
+        "generated_at": datetime.utcnow().isoformat(),
+        "config": {
+            "sizes": sizes,
+            "zooms": zooms,
+            "iterations": iterations,
+            "warmup": warmup,
+            "query_limit": query_limit,
+            "seed": seed,
+            "extent": list(BENCHMARK_EXTENT),
+            "tile_feature_budget": TILE_FEATURE_BUDGET
+        },
+        "results": results
+    }
+
+def parse_arguments():
+    """
+    Parse command-line arguments
+    """
+    parser = argparse.ArgumentParser(description="TerraMap tile and feature-query benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="Comma-separated dataset sizes (parcels per dataset)")
+    parser.add_argument("--zooms", default="10,12,14,16",
+                        help="Comma-separated zoom levels")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed calls per case")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed calls per case")
+    parser.add_argument("--query-limit", type=int, default=100, help="Feature limit of /query requests")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for sampling")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded datasets")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    return parser.parse_args()
+
+async def main():
+    """
+    Benchmark entry point
+    """
+    args = parse_arguments()
+    
+    report = await run_benchmark(
+        sizes=[int(size) for size in args.sizes.split(",")],
+        zooms=[int(z) for z in args.zooms.split(",")],
+        iterations=args.iterations,
+        warmup=args.warmup,
+        query_limit=args.query_limit,
+        seed=args.seed,
+        keep=args.keep
+    )
+    
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(report_json)
+    else:
+        print(report_json)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,677 @@
+import os
+import json
+import base64
+import hashlib
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Callable, Iterable, Awaitable
+import mercantile
+
+from services.event_bus.redis_bus import RedisBus
+from services.terra_map.layers import LAYER_CONFIG_VERSION
+from services.terra_map.versions import TileVersions, tile_versions
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Tile cache configuration
+TILE_CACHE_MAX_ENTRIES = int(os.getenv("TILE_CACHE_MAX_ENTRIES", "2048"))
+TILE_CACHE_LOCAL_TTL = int(os.getenv("TILE_CACHE_LOCAL_TTL", "300"))
+TILE_CACHE_TTL = int(os.getenv("TILE_CACHE_TTL", "3600"))
+TILE_CACHE_MAX_ZOOM = int(os.getenv("TILE_CACHE_MAX_ZOOM", "16"))
+TILE_CACHE_REDIS_ENABLED = os.getenv("TILE_CACHE_REDIS", "true").lower() == "true"
+
+# Concurrent renders of one tile across workers are serialized by a Redis
+# lock held for at most this long; other workers poll for the result
+TILE_RENDER_LOCK_TTL_MS = int(os.getenv("TILE_RENDER_LOCK_TTL_MS", "10000"))
+TILE_RENDER_POLL_INTERVAL_MS = int(os.getenv("TILE_RENDER_POLL_INTERVAL_MS", "50"))
+
+# Maximum number of features held by the feature cache
+FEATURE_CACHE_MAX_ENTRIES = int(os.getenv("FEATURE_CACHE_MAX_ENTRIES", "10000"))
+
+# Channel of the MCP server's event bus, which forwards dirty tile notices to map clients
+MCP_EVENTS_CHANNEL = "mcp_events"
+
+# Dirty tile notices list tile ranges at this zoom; clients derive other
+# zoom levels by shifting the tile coordinates
+DIRTY_TILE_ZOOM = int(os.getenv("DIRTY_TILE_ZOOM", str(TILE_CACHE_MAX_ZOOM)))
+
+# Dirty tile notices go to the MCP event bus whether or not tiles are shared through Redis
+TILE_DIRTY_NOTICES_ENABLED = os.getenv("TILE_DIRTY_NOTICES", "true").lower() == "true"
+
+# Every worker receives each change notice; the first to claim a notice's
+# version publishes it to map clients, the claim lasting this long
+TILE_DIRTY_NOTICE_LOCK_TTL_MS = int(os.getenv("TILE_DIRTY_NOTICE_LOCK_TTL_MS", "60000"))
+
+# Clients may store responses but must revalidate them with their ETag
+REVALIDATE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+# Tiles may be sent gzip-encoded, so caches must key them by Accept-Encoding too
+TILE_HEADERS = {**REVALIDATE_HEADERS, "Vary": "Accept-Encoding"}
+
+Bounds = Tuple[float, float, float, float]
+
+def dirty_tile_ranges(bounds_list: Iterable[Bounds], zoom: int = DIRTY_TILE_ZOOM) -> List[List[int]]:
+    """
+    Get the tile ranges covering changed bounds at one zoom level
+    
+    Args:
+        bounds_list: Bounds as (minx, miny, maxx, maxy) in EPSG:4326
+        zoom: Zoom level of the ranges
+        
+    Returns:
+        Distinct ranges as [min_x, min_y, max_x, max_y] tile coordinates
+    """
+    ranges = set()
+    for minx, miny, maxx, maxy in bounds_list:
+        # Tile rows grow southwards, so the north-west corner holds the minimums
+        top_left = mercantile.tile(minx, maxy, zoom, truncate=True)
+        bottom_right = mercantile.tile(maxx, miny, zoom, truncate=True)
+        ranges.add((top_left.x, top_left.y, bottom_right.x, bottom_right.y))
+    
+    return [list(tile_range) for tile_range in sorted(ranges)]
+
+class TileCache:
+    """
+    Two-tier tile cache: a bounded in-process LRU in front of a shared Redis tier
+    
+    Keys of both tiers embed the tile's data version, kept by a trigger on
+    spatial_features (see services.terra_map.versions). A write bumps the
+    versions of the tiles it touches, whoever made it, so entries of changed
+    tiles are never looked up again: they age out of the LRU and expire
+    from Redis with the TTL.
+    """
+    def __init__(
+        self,
+        max_entries: int = TILE_CACHE_MAX_ENTRIES,
+        local_ttl: int = TILE_CACHE_LOCAL_TTL,
+        ttl: int = TILE_CACHE_TTL,
+        bus: Optional[RedisBus] = None,
+        versions: TileVersions = tile_versions,
+        notice_bus: Optional[RedisBus] = None
+    ):
+        """
+        Initialize the tile cache
+        
+        Args:
+            max_entries: Maximum number of tiles held in process
+            local_ttl: Lifetime of in-process entries in seconds
+            ttl: Lifetime of Redis tile entries in seconds
+            bus: Optional Redis bus for the shared tier
+            versions: Tile data versions the cache keys are built from
+            notice_bus: Optional Redis bus dirty tile notices are published on
+        """
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self.ttl = ttl
+        self.bus = bus
+        self.versions = versions
+        self.notice_bus = notice_bus
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple, "asyncio.Task"] = {}
+    
+    @staticmethod
+    def variant_key(
+        z: int,
+        x: int,
+        y: int,
+        tile_format: str,
+        source: Optional[str] = None,
+        layers: Optional[List[str]] = None
+    ) -> Tuple:
+        """
+        Build the key identifying a tile request
+        
+        Args:
+            z, x, y: Tile coordinates
+            tile_format: Requested tile format
+            source: Data source the tile is rendered from
+            layers: Layers included in the tile
+            
+        Returns:
+            Tuple identifying the request regardless of data version
+        """
+        return (z, x, y, tile_format, source or "*", ",".join(sorted(layers)) if layers else "*")
+    
+    def versioned_key(self, key: Tuple) -> Tuple:
+        """
+        Build the cache key of a tile request
+        
+        The key combines the variant key with the tile's current data version.
+        
+        Args:
+            key: Variant key of the request
+            
+        Returns:
+            Tuple keying the cached tile
+        """
+        z, x, y = key[:3]
+        return key + (self.versions.tile_version(z, x, y),)
+    
+    def is_cacheable(self, z: int) -> bool:
+        """
+        Check whether tiles at this zoom level are cached
+        
+        Nothing is cached until the tile versions are loaded.
+        
+        Args:
+            z: Zoom level
+            
+        Returns:
+            True when tiles at this zoom level are cached
+        """
+        return 0 <= z <= TILE_CACHE_MAX_ZOOM and self.versions.ready
+    
+    def get_local(self, key: Tuple) -> Optional[Any]:
+        """
+        Get a tile from the in-process tier
+        
+        Args:
+            key: Versioned key of the tile
+            
+        Returns:
+            Cached tile, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.local_ttl:
+                del self._entries[key]
+                return None
+            
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+            return value
+    
+    def set_local(self, key: Tuple, value: Any):
+        """
+        Store a tile in the in-process tier, evicting the least recently used
+        
+        Args:
+            key: Versioned key of the tile
+            value: Tile to store
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    @staticmethod
+    def shared_key(key: Tuple) -> str:
+        """
+        Build the Redis key for a tile
+        
+        The key covers the versioned key and the layer configuration.
+        
+        Args:
+            key: Versioned key of the tile
+            
+        Returns:
+            Redis key string
+        """
+        z, x, y, tile_format, source, layers, version = key
+        return f"tile:{LAYER_CONFIG_VERSION}:{z}/{x}/{y}:{version}:{tile_format}:{source}:{layers}"
+    
+    def tile_etag(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        tile_format: str,
+        source: Optional[str] = None,
+        layers: Optional[List[str]] = None
+    ) -> Optional[str]:
+        """
+        Get a weak ETag for a tile, derived from its data version
+        
+        The ETag is weak because one tile may be sent gzip-encoded or not,
+        depending on Accept-Encoding.
+        
+        Args:
+            z: Zoom level
+            x: Tile X coordinate
+            y: Tile Y coordinate
+            tile_format: Tile format ("json" or "mvt")
+            source: Optional source system filter
+            layers: Optional list of layers
+            
+        Returns:
+            Quoted ETag value, or None while the tile versions are not loaded
+        """
+        if not self.versions.ready:
+            return None
+        
+        return make_etag(self.shared_key(self.versioned_key(self.variant_key(z, x, y, tile_format, source, layers))), weak=True)
+    
+    def catalog_etag(self, name: str) -> Optional[str]:
+        """
+        Get a strong ETag for a catalogue resource such as "layers" or "sources"
+        
+        Args:
+            name: Catalogue resource name
+            
+        Returns:
+            Quoted ETag value, or None while the tile versions are not loaded
+        """
+        if not self.versions.ready:
+            return None
+        
+        return make_etag(f"catalog:{name}:{self.versions.dataset_version()}")
+    
+    async def lookup(self, key: Tuple) -> Tuple[Optional[Any], Tuple]:
+        """
+        Look a tile up in both tiers
+        
+        Args:
+            key: Tile request key from variant_key
+            
+        Returns:
+            Tuple of the cached tile (or None) and the versioned key to store
+            a freshly rendered tile under
+        """
+        versioned_key = self.versioned_key(key)
+        
+        # First tier: in-process LRU
+        value = self.get_local(versioned_key)
+        if value is not None:
+            return value, versioned_key
+        
+        # Second tier: shared Redis cache
+        if self.bus:
+            value = await self._read_shared(versioned_key)
+        
+        return value, versioned_key
+    
+    async def store(self, versioned_key: Tuple, value: Any):
+        """
+        Store a rendered tile in both tiers
+        
+        The key must come from the lookup made before rendering, so a tile
+        rendered while its data changed lands under the old version.
+        
+        Args:
+            versioned_key: Versioned key returned by lookup
+            value: Tile data
+        """
+        self.set_local(versioned_key, value)
+        
+        if self.bus:
+            await self.bus.set_key(self.shared_key(versioned_key), encode_tile(value), expiration=self.ttl)
+    
+    async def get_or_render(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        tile_format: str,
+        source: Optional[str],
+        layers: Optional[List[str]],
+        render: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Get a tile from the cache, rendering and storing it on a miss
+        
+        Args:
+            z: Zoom level
+            x: Tile X coordinate
+            y: Tile Y coordinate
+            tile_format: Tile format ("json" or "mvt")
+            source: Optional source system filter
+            layers: Optional list of layers
+            render: Coroutine function producing the tile when it is not cached
+        
+        Concurrent misses for the same tile are coalesced: within a worker
+        they share one render, and across workers a short-lived Redis lock
+        lets one worker render while the others wait for its result.
+        
+        Returns:
+            Tile data (encoded GeoJSON or MVT bytes, or a dict for JSON tiles cached as dicts)
+        """
+        key = self.variant_key(z, x, y, tile_format, source, layers)
+        if not self.is_cacheable(z):
+            return await self.coalesce(key, render)
+        
+        value, versioned_key = await self.lookup(key)
+        if value is not None:
+            return value
+        
+        # Miss on both tiers: render from PostGIS, once per tile version
+        return await self.coalesce(versioned_key, lambda: self._render_once(versioned_key, render))
+    
+    async def coalesce(self, key: Tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Share one in-flight computation between concurrent identical requests
+        
+        The computation runs as its own task, so a waiting request that is
+        cancelled (e.g. a client disconnecting) does not cancel it for the
+        others.
+        
+        Args:
+            key: Key of the computation
+            compute: Coroutine function producing the value
+            
+        Returns:
+            Result of the computation
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._end_flight(key, done))
+        
+        return await asyncio.shield(task)
+    
+    def _end_flight(self, key: Tuple, task: "asyncio.Task"):
+        """
+        Forget a finished in-flight computation
+        
+        Args:
+            key: Versioned key of the tile
+            task: Finished computation
+        """
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        
+        # Mark the outcome as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+    
+    async def _render_once(self, versioned_key: Tuple, render: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Render and store a tile, letting only one worker render it at a time
+        
+        Args:
+            versioned_key: Versioned key returned by lookup
+            render: Coroutine function producing the tile
+            
+        Returns:
+            Tile data
+        """
+        if self.bus:
+            lock_key = f"lock:{self.shared_key(versioned_key)}"
+            token = uuid.uuid4().hex
+            
+            if not await self.bus.acquire_lock(lock_key, token, TILE_RENDER_LOCK_TTL_MS):
+                # Another worker is rendering this tile; wait for its result
+                value = await self._wait_for_shared(versioned_key, lock_key)
+                if value is not None:
+                    return value
+            else:
+                try:
+                    value = await render()
+                    await self.store(versioned_key, value)
+                    return value
+                finally:
+                    await self.bus.release_lock(lock_key, token)
+        
+        value = await render()
+        await self.store(versioned_key, value)
+        return value
+    
+    async def _wait_for_shared(self, versioned_key: Tuple, lock_key: str) -> Optional[Any]:
+        """
+        Wait for another worker to store a tile in the shared tier
+        
+        Gives up when the lock is released or expires without a stored
+        tile (the other render failed) or Redis stops answering.
+        
+        Args:
+            versioned_key: Versioned key the tile will be stored under
+            lock_key: Redis key of the render lock
+            
+        Returns:
+            Tile data, or None if the tile should be rendered locally
+        """
+        deadline = time.monotonic() + TILE_RENDER_LOCK_TTL_MS / 1000
+        
+        while time.monotonic() < deadline:
+            await asyncio.sleep(TILE_RENDER_POLL_INTERVAL_MS / 1000)
+            
+            value = await self._read_shared(versioned_key)
+            if value is not None:
+                return value
+            
+            if await self.bus.get_key(lock_key) is None:
+                # The tile may have been stored between the two reads, or the
+                # first read failed; look once more before rendering locally
+                return await self._read_shared(versioned_key)
+        
+        return None
+    
+    async def _read_shared(self, versioned_key: Tuple) -> Optional[Any]:
+        """
+        Read a tile from the shared tier into the in-process tier
+        
+        Args:
+            versioned_key: Versioned key of the tile
+            
+        Returns:
+            Cached tile, or None on a miss
+        """
+        cached = await self.bus.get_key(self.shared_key(versioned_key))
+        if cached is None:
+            return None
+        
+        value = decode_tile(cached)
+        self.set_local(versioned_key, value)
+        return value
+    
+    async def publish_dirty_tiles(self, notice: Dict[str, Any]):
+        """
+        Tell map clients which tiles changed, through the MCP event bus
+        
+        Registered as a tile version callback. Every worker receives each
+        change notice; only the first to claim its version publishes it.
+        Clients holding long-lived tile caches refetch only the tiles inside
+        the listed ranges. Changes of unknown layers are listed under "*",
+        and flush notices, sent after a truncation or when a listener
+        reconnects, mark the whole extent dirty under "*".
+        
+        Args:
+            notice: Change notice from the tile version listener
+        """
+        if not self.notice_bus or notice.get("version") is None:
+            return
+        
+        # A reconnected listener's flush reuses the version of the last change, so it is claimed apart
+        lock_key = f"tiles_dirty:flush:{notice['version']}" if notice.get("flush") else f"tiles_dirty:{notice['version']}"
+        token = uuid.uuid4().hex
+        if not await self.notice_bus.acquire_lock(lock_key, token, TILE_DIRTY_NOTICE_LOCK_TTL_MS):
+            return
+        
+        if notice.get("flush"):
+            # Everything may have changed
+            last = (1 << DIRTY_TILE_ZOOM) - 1
+            layers = [{"layer": "*", "ranges": [[0, 0, last, last]]}]
+        else:
+            layers = [
+                {"layer": entry.get("layer") or "*", "ranges": dirty_tile_ranges([tuple(entry["bounds"])])}
+                for entry in notice.get("layers") or []
+            ]
+        
+        await self.notice_bus.publish({
+            "type": "tiles_dirty",
+            "payload": {
+                "zoom": DIRTY_TILE_ZOOM,
+                "layers": sorted(layers, key=lambda entry: entry["layer"])
+            }
+        }, channel=MCP_EVENTS_CHANNEL)
+
+class FeatureCache:
+    """
+    In-process LRU of encoded features, each valid for one updated_at version
+    
+    Entries are never trusted blindly: every lookup sends the cached
+    versions along with the query, and the database only returns the
+    features whose updated_at changed.
+    """
+    def __init__(self, max_entries: int = FEATURE_CACHE_MAX_ENTRIES):
+        """
+        Initialize the feature cache
+        
+        Args:
+            max_entries: Maximum number of features held
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def cached(self, feature_ids: Iterable[str]) -> Dict[str, Tuple[Any, bytes]]:
+        """
+        Get the cached versions and values of some features
+        
+        Args:
+            feature_ids: Features to look up
+            
+        Returns:
+            Mapping of cached feature IDs to their version and value
+        """
+        with self._lock:
+            return {feature_id: self._entries[feature_id] for feature_id in feature_ids if feature_id in self._entries}
+    
+    def set(self, feature_id: str, updated_at: Any, value: bytes):
+        """
+        Store a feature version, evicting the least recently used
+        
+        Args:
+            feature_id: Feature ID
+            updated_at: Version of the feature
+            value: Serialized feature
+        """
+        with self._lock:
+            self._entries[feature_id] = (updated_at, value)
+            self._entries.move_to_end(feature_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def touch(self, feature_id: str):
+        """
+        Mark a feature as most recently used
+        
+        Args:
+            feature_id: Feature ID
+        """
+        with self._lock:
+            if feature_id in self._entries:
+                self._entries.move_to_end(feature_id)
+    
+    async def get_many(
+        self,
+        feature_ids: List[str],
+        load: Callable[[Dict[str, Any]], Awaitable[List[Tuple[str, Any, Optional[bytes]]]]]
+    ) -> Dict[str, bytes]:
+        """
+        Get many features, loading only missing or changed ones
+        
+        Args:
+            feature_ids: IDs of the features
+            load: Coroutine function taking the cached versions by feature ID and
+                returning (feature_id, updated_at, feature or None if unchanged)
+                for every existing feature
+                
+        Returns:
+            Encoded features by feature ID; features that do not exist are left out
+        """
+        cached = self.cached(feature_ids)
+        rows = await load({feature_id: updated_at for feature_id, (updated_at, _) in cached.items()})
+        
+        features = {}
+        for feature_id, updated_at, value in rows:
+            if value is None:
+                # Unchanged since cached
+                value = cached[feature_id][1]
+                self.touch(feature_id)
+            else:
+                self.set(feature_id, updated_at, value)
+            features[feature_id] = value
+        
+        return features
+
+def make_etag(version: str, weak: bool = False) -> str:
+    """
+    Build a quoted ETag from a data version string
+    
+    Args:
+        version: Data version
+        weak: Whether the representations the tag covers may differ in encoding
+        
+    Returns:
+        Quoted ETag, prefixed with W/ when weak
+    """
+    return ("W/" if weak else "") + '"' + hashlib.sha1(version.encode("utf-8")).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header value against an ETag
+    
+    Uses the weak comparison If-None-Match calls for: "W/" prefixes are ignored.
+    
+    Args:
+        if_none_match: Value of the If-None-Match request header
+        etag: Current quoted ETag
+        
+    Returns:
+        True if the client already holds the current representation
+    """
+    if not if_none_match:
+        return False
+    
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+def encode_tile(value: Any) -> str:
+    """
+    Encode a tile for storage in Redis
+    
+    Args:
+        value: Tile to store
+        
+    Returns:
+        Encoded tile
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return "b64:" + base64.b64encode(value).decode("ascii")
+    return "json:" + json.dumps(value)
+
+def decode_tile(value: str) -> Any:
+    """
+    Decode a tile stored in Redis
+    
+    Args:
+        value: Encoded tile
+        
+    Returns:
+        Decoded tile
+    """
+    if value.startswith("b64:"):
+        return base64.b64decode(value[4:])
+    return json.loads(value[5:])
+
+def create_redis_bus() -> RedisBus:
+    """
+    Create a Redis bus for the shared tile cache tier and dirty tile notices
+    """
+    return RedisBus(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", "6379")),
+        password=os.getenv("REDIS_PASSWORD", None),
+        channel=MCP_EVENTS_CHANNEL
+    )
+
+# Shared cache instances for the TerraMap service
+redis_bus = create_redis_bus() if TILE_CACHE_REDIS_ENABLED or TILE_DIRTY_NOTICES_ENABLED else None
+tile_cache = TileCache(
+    bus=redis_bus if TILE_CACHE_REDIS_ENABLED else None,
+    notice_bus=redis_bus if TILE_DIRTY_NOTICES_ENABLED else None
+)
+feature_cache = FeatureCache()
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+from sqlalchemy import text
+
+from services.common.database import get_db_session, postgres_engine, execute_prepared_query, execute_spatial_query_async
+from services.common.models import FeatureCatalogStats
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Catalogue dimensions, each named after the spatial_features column it groups by
+CATALOG_DIMENSIONS = ["feature_type", "source_system"]
+
+# Statement-level triggers fold each write statement into the stats table,
+# so a bulk load updates every touched row of the table once
+CATALOG_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION update_spatial_feature_stats() RETURNS trigger AS $$
+BEGIN
+    -- Emptied table: nothing is left to count
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM spatial_feature_stats;
+        RETURN NULL;
+    END IF;
+    
+    -- Removed or replaced rows: decrement counts; extents can only shrink,
+    -- so they are flagged for recomputation instead of being adjusted
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO spatial_feature_stats AS s (dimension, key, feature_count, extent_stale, updated_at)
+        SELECT d.dimension, d.key, -COUNT(*), true, now()
+        FROM old_rows o
+        CROSS JOIN LATERAL (VALUES ('feature_type', o.feature_type), ('source_system', o.source_system)) AS d(dimension, key)
+        WHERE d.key IS NOT NULL
+        GROUP BY d.dimension, d.key
+        ON CONFLICT (dimension, key) DO UPDATE SET
+            feature_count = s.feature_count + EXCLUDED.feature_count,
+            extent_stale = true,
+            updated_at = now();
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO spatial_feature_stats AS s (dimension, key, feature_count, extent_stale, updated_at)
+        SELECT d.dimension, d.key, -COUNT(*), bool_or(d.changed), now()
+        FROM old_rows o
+        JOIN new_rows n ON n.id = o.id
+        CROSS JOIN LATERAL (VALUES
+            ('feature_type', o.feature_type,
+                n.feature_type IS DISTINCT FROM o.feature_type OR n.geometry IS DISTINCT FROM o.geometry),
+            ('source_system', o.source_system,
+                n.source_system IS DISTINCT FROM o.source_system OR n.geometry IS DISTINCT FROM o.geometry)
+        ) AS d(dimension, key, changed)
+        WHERE d.key IS NOT NULL
+        GROUP BY d.dimension, d.key
+        ON CONFLICT (dimension, key) DO UPDATE SET
+            feature_count = s.feature_count + EXCLUDED.feature_count,
+            extent_stale = s.extent_stale OR EXCLUDED.extent_stale,
+            updated_at = now();
+    END IF;
+    
+    -- Added or replacing rows: increment counts and grow extents
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO spatial_feature_stats AS s (dimension, key, feature_count, min_x, min_y, max_x, max_y, extent_stale, updated_at)
+        SELECT
+            d.dimension, d.key, COUNT(*),
+            MIN(ST_XMin(n.geometry)), MIN(ST_YMin(n.geometry)),
+            MAX(ST_XMax(n.geometry)), MAX(ST_YMax(n.geometry)),
+            false, now()
+        FROM new_rows n
+        CROSS JOIN LATERAL (VALUES ('feature_type', n.feature_type), ('source_system', n.source_system)) AS d(dimension, key)
+        WHERE d.key IS NOT NULL
+        GROUP BY d.dimension, d.key
+        ON CONFLICT (dimension, key) DO UPDATE SET
+            feature_count = s.feature_count + EXCLUDED.feature_count,
+            min_x = LEAST(s.min_x, EXCLUDED.min_x),
+            min_y = LEAST(s.min_y, EXCLUDED.min_y),
+            max_x = GREATEST(s.max_x, EXCLUDED.max_x),
+            max_y = GREATEST(s.max_y, EXCLUDED.max_y),
+            updated_at = now();
+    END IF;
+    
+    DELETE FROM spatial_feature_stats WHERE feature_count <= 0;
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS spatial_features_stats_insert ON spatial_features;
+DROP TRIGGER IF EXISTS spatial_features_stats_update ON spatial_features;
+DROP TRIGGER IF EXISTS spatial_features_stats_delete ON spatial_features;
+DROP TRIGGER IF EXISTS spatial_features_stats_truncate ON spatial_features;
+
+CREATE TRIGGER spatial_features_stats_insert
+AFTER INSERT ON spatial_features
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_spatial_feature_stats();
+
+CREATE TRIGGER spatial_features_stats_update
+AFTER UPDATE ON spatial_features
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_spatial_feature_stats();
+
+CREATE TRIGGER spatial_features_stats_delete
+AFTER DELETE ON spatial_features
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_spatial_feature_stats();
+
+CREATE TRIGGER spatial_features_stats_truncate
+AFTER TRUNCATE ON spatial_features
+FOR EACH STATEMENT EXECUTE FUNCTION update_spatial_feature_stats();
+
+CREATE INDEX IF NOT EXISTS ix_spatial_features_feature_type ON spatial_features (feature_type);
+CREATE INDEX IF NOT EXISTS ix_spatial_features_source_system ON spatial_features (source_system);
+"""
+
+# Full recomputation of one dimension, optionally limited to some keys
+CATALOG_REFRESH_SQL = """
+INSERT INTO spatial_feature_stats AS s (dimension, key, feature_count, min_x, min_y, max_x, max_y, extent_stale, updated_at)
+SELECT
+    '{dimension}', {dimension}, COUNT(*),
+    MIN(ST_XMin(geometry)), MIN(ST_YMin(geometry)),
+    MAX(ST_XMax(geometry)), MAX(ST_YMax(geometry)),
+    false, now()
+FROM spatial_features
+WHERE {dimension} IS NOT NULL {key_filter}
+GROUP BY {dimension}
+ON CONFLICT (dimension, key) DO UPDATE SET
+    feature_count = EXCLUDED.feature_count,
+    min_x = EXCLUDED.min_x,
+    min_y = EXCLUDED.min_y,
+    max_x = EXCLUDED.max_x,
+    max_y = EXCLUDED.max_y,
+    extent_stale = false,
+    updated_at = now()
+"""
+
+# Counts and extents of one dimension, read by the catalogue endpoints
+CATALOG_STATS_SQL = """
+SELECT
+    key,
+    feature_count AS count,
+    min_x,
+    min_y,
+    max_x,
+    max_y,
+    extent_stale
+FROM
+    spatial_feature_stats
+WHERE
+    dimension = $1
+ORDER BY
+    key
+"""
+
+def install_catalog_stats() -> Dict[str, Any]:
+    """
+    Create the catalogue stats table and triggers, building it on first install
+    
+    Returns:
+        Installation result
+    """
+    try:
+        FeatureCatalogStats.__table__.create(bind=postgres_engine, checkfirst=True)
+        
+        with get_db_session() as db:
+            db.execute(text(CATALOG_TRIGGER_SQL))
+            
+            # Build the stats from scratch when the table is new
+            is_empty = db.execute(text("SELECT NOT EXISTS (SELECT 1 FROM spatial_feature_stats)")).scalar()
+            if is_empty:
+                for dimension in CATALOG_DIMENSIONS:
+                    db.execute(text(CATALOG_REFRESH_SQL.format(dimension=dimension, key_filter="")))
+            
+            db.commit()
+        
+        logger.info("Catalogue stats installed")
+        return {"status": "success", "rebuilt": bool(is_empty)}
+    except Exception as e:
+        logger.error(f"Error installing catalogue stats: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+def refresh_catalog_stats(dimension: str, keys: Optional[List[str]] = None):
+    """
+    Recompute the stats of a dimension from spatial_features
+    
+    Args:
+        dimension: Catalogue dimension ("feature_type" or "source_system")
+        keys: Optional list of layer or source names to limit the refresh to
+    """
+    if dimension not in CATALOG_DIMENSIONS:
+        raise ValueError(f"Unknown catalogue dimension: {dimension}")
+    
+    params = {}
+    key_filter = ""
+    if keys:
+        key_filter = f"AND {dimension} = ANY(:keys)"
+        params["keys"] = list(keys)
+    
+    with get_db_session() as db:
+        db.execute(text(CATALOG_REFRESH_SQL.format(dimension=dimension, key_filter=key_filter)), params)
+        db.commit()
+
+def get_catalog_stats(dimension: str) -> List[Dict[str, Any]]:
+    """
+    Get the counts and extents of every layer or source
+    
+    Reads the stats table; only entries whose extent went stale after a
+    delete or move are recomputed, and only for their own key.
+    
+    Args:
+        dimension: Catalogue dimension ("feature_type" or "source_system")
+        
+    Returns:
+        List of stats rows (key, count, min_x, min_y, max_x, max_y)
+    """
+    if dimension not in CATALOG_DIMENSIONS:
+        raise ValueError(f"Unknown catalogue dimension: {dimension}")
+    
+    result = execute_prepared_query("catalog_stats", CATALOG_STATS_SQL, [dimension])
+    if result["status"] != "success":
+        raise Exception(f"Error reading catalogue stats: {result.get('message')}")
+    
+    stale_keys = [row["key"] for row in result["data"] if row["extent_stale"]]
+    if stale_keys:
+        refresh_catalog_stats(dimension, stale_keys)
+        result = execute_prepared_query("catalog_stats", CATALOG_STATS_SQL, [dimension])
+        if result["status"] != "success":
+            raise Exception(f"Error reading catalogue stats: {result.get('message')}")
+    
+    return result["data"]
+
+async def get_catalog_stats_async(dimension: str) -> List[Dict[str, Any]]:
+    """
+    Get the counts and extents of every layer or source without blocking the event loop
+    
+    Stale extents are rare; their recomputation runs in a worker thread.
+    
+    Args:
+        dimension: Catalogue dimension ("feature_type" or "source_system")
+        
+    Returns:
+        List of stats rows (key, count, min_x, min_y, max_x, max_y)
+    """
+    if dimension not in CATALOG_DIMENSIONS:
+        raise ValueError(f"Unknown catalogue dimension: {dimension}")
+    
+    result = await execute_spatial_query_async(CATALOG_STATS_SQL, [dimension])
+    if result["status"] != "success":
+        raise Exception(f"Error reading catalogue stats: {result.get('message')}")
+    
+    stale_keys = [row["key"] for row in result["data"] if row["extent_stale"]]
+    if stale_keys:
+        await asyncio.to_thread(refresh_catalog_stats, dimension, stale_keys)
+        result = await execute_spatial_query_async(CATALOG_STATS_SQL, [dimension])
+        if result["status"] != "success":
+            raise Exception(f"Error reading catalogue stats: {result.get('message')}")
+    
+    return result["data"]
@@ -0,0 +1,146 @@
+import os
+import logging
+from typing import Dict, Any, List, Tuple
+from sqlalchemy import text
+
+from services.common.database import get_db_session, postgres_engine
+from services.common.models import GeneralizedGeometry
+from services.terra_map.layers import MAX_LAYER_ZOOM, WEB_MERCATOR_WORLD_SIZE
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Generalized geometries may deviate from the original by this fraction of a
+# 256-pixel tile's pixel at the deepest zoom level of their band
+GENERALIZATION_PIXEL_FRACTION = float(os.getenv("GENERALIZATION_PIXEL_FRACTION", "0.5"))
+
+# Zoom bands as (band, minimum zoom); each band covers zoom levels up to the
+# next band's minimum zoom, the last one up to MAX_LAYER_ZOOM
+ZOOM_BAND_STARTS: List[Tuple[int, int]] = [
+    (0, 0),
+    (1, 6),
+    (2, 9),
+    (3, 12),
+    (4, 15)
+]
+
+def band_tolerance(max_zoom: int) -> float:
+    """
+    Get the simplification tolerance of a band from its deepest zoom level
+    
+    Args:
+        max_zoom: Deepest zoom level the band is drawn at
+        
+    Returns:
+        Simplification tolerance in EPSG:3857 units
+    """
+    return round(WEB_MERCATOR_WORLD_SIZE / (256 * 2 ** max_zoom) * GENERALIZATION_PIXEL_FRACTION, 3)
+
+# Zoom bands as (band, minimum zoom, simplification tolerance in EPSG:3857 units),
+# e.g. about 2.4 km for z0-5 and 5 mm for z15+ at half a pixel
+ZOOM_BANDS: List[Tuple[int, int, float]] = [
+    (zoom_band, min_zoom, band_tolerance(next_start[1] - 1 if next_start else MAX_LAYER_ZOOM))
+    for (zoom_band, min_zoom), next_start in zip(ZOOM_BAND_STARTS, ZOOM_BAND_STARTS[1:] + [None])
+]
+
+# Trigger that keeps the generalized geometries in step with spatial_features
+GENERALIZATION_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION refresh_generalized_geometries() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM spatial_feature_generalized WHERE feature_id = NEW.id;
+    
+    INSERT INTO spatial_feature_generalized (feature_id, zoom_band, geometry)
+    SELECT NEW.id, bands.zoom_band, bands.geometry
+    FROM (
+        SELECT
+            band.zoom_band,
+            ST_Simplify(ST_Transform(NEW.geometry, 3857), band.tolerance) AS geometry
+        FROM ({bands}) AS band(zoom_band, tolerance)
+    ) AS bands
+    WHERE bands.geometry IS NOT NULL AND NOT ST_IsEmpty(bands.geometry);
+    
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS spatial_features_generalize ON spatial_features;
+
+CREATE TRIGGER spatial_features_generalize
+AFTER INSERT OR UPDATE OF geometry ON spatial_features
+FOR EACH ROW EXECUTE FUNCTION refresh_generalized_geometries();
+"""
+
+# Backfill for features that have no generalized geometries yet
+GENERALIZATION_BACKFILL_SQL = """
+INSERT INTO spatial_feature_generalized (feature_id, zoom_band, geometry)
+SELECT bands.feature_id, bands.zoom_band, bands.geometry
+FROM (
+    SELECT
+        f.id AS feature_id,
+        band.zoom_band,
+        ST_Simplify(ST_Transform(f.geometry, 3857), band.tolerance) AS geometry
+    FROM spatial_features f
+    CROSS JOIN ({bands}) AS band(zoom_band, tolerance)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM spatial_feature_generalized g WHERE g.feature_id = f.id
+    )
+) AS bands
+WHERE bands.geometry IS NOT NULL AND NOT ST_IsEmpty(bands.geometry)
+"""
+
+def band_for_zoom(z: int) -> int:
+    """
+    Get the zoom band for a zoom level
+    
+    Args:
+        z: Zoom level
+        
+    Returns:
+        Zoom band number
+    """
+    band = ZOOM_BANDS[0][0]
+    for zoom_band, min_zoom, _ in ZOOM_BANDS:
+        if z >= min_zoom:
+            band = zoom_band
+    return band
+
+def _bands_values_sql() -> str:
+    """
+    Render the zoom bands as a SQL VALUES list
+    """
+    return "VALUES " + ", ".join(
+        f"({zoom_band}, {float(tolerance)})" for zoom_band, _, tolerance in ZOOM_BANDS
+    )
+
+def install_generalization() -> Dict[str, Any]:
+    """
+    Create the generalized geometry table and trigger, and backfill missing rows
+    
+    Safe to run repeatedly; only features without generalized geometries are
+    backfilled, unless the band tolerances changed since the last install,
+    in which case every generalized geometry is rebuilt.
+    
+    Returns:
+        Installation result
+    """
+    try:
+        GeneralizedGeometry.__table__.create(bind=postgres_engine, checkfirst=True)
+        
+        with get_db_session() as db:
+            # The installed trigger function embeds the tolerances it simplifies with
+            installed = db.execute(text(
+                "SELECT prosrc FROM pg_proc WHERE proname = 'refresh_generalized_geometries'"
+            )).scalar()
+            if installed is not None and _bands_values_sql() not in installed:
+                logger.info("Zoom band tolerances changed, rebuilding generalized geometries")
+                db.execute(text("TRUNCATE spatial_feature_generalized"))
+            
+            db.execute(text(GENERALIZATION_TRIGGER_SQL.format(bands=_bands_values_sql())))
+            result = db.execute(text(GENERALIZATION_BACKFILL_SQL.format(bands=_bands_values_sql())))
+            db.commit()
+        
+        logger.info(f"Generalized geometries installed, backfilled {result.rowcount} rows")
+        return {"status": "success", "backfilled": result.rowcount}
+    except Exception as e:
+        logger.error(f"Error installing generalized geometries: {str(e)}")
+        return {"status": "error", "message": str(e)}
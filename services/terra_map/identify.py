@@ -0,0 +1,282 @@
+import os
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import shapely
+from shapely import STRtree
+from sqlalchemy import text
+
+from services.common.database import get_db_session, execute_spatial_query_async
+from services.terra_map.tiles import Statement, query_rows, bind_arg
+from services.terra_map.versions import tile_versions
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Comma-separated hot layers held in memory for /identify; empty disables the index
+TERRAMAP_IDENTIFY_LAYERS = [layer for layer in os.getenv("TERRAMAP_IDENTIFY_LAYERS", "").split(",") if layer]
+
+# Maximum number of features returned for one point
+IDENTIFY_MAX_RESULTS = int(os.getenv("IDENTIFY_MAX_RESULTS", "10"))
+
+# Features of the indexed layers, optionally limited to some bounds
+INDEX_FEATURES_SQL = """
+SELECT
+    f.id,
+    f.feature_id,
+    f.feature_type,
+    f.source_system,
+    ST_AsBinary(f.geometry) AS geometry
+FROM
+    spatial_features f
+WHERE
+    f.feature_type = ANY(:layers)
+    AND f.geometry IS NOT NULL
+    {bounds_filter}
+"""
+
+# Indexed snapshot: the tree, and the row ids, geometries and attributes in tree order
+IndexSnapshot = Tuple[Optional[STRtree], np.ndarray, np.ndarray, List[Dict[str, Any]]]
+
+class FeatureIndex:
+    """
+    In-process STRtree of the hot layers' geometries for point identify
+    
+    Lookups read an immutable snapshot, so they never wait on a refresh;
+    refreshes reload only the features inside changed bounds and swap in a
+    rebuilt tree.
+    """
+    def __init__(self, layers: List[str]):
+        """
+        Initialize an empty index
+        
+        Args:
+            layers: Layers (feature types) to index
+        """
+        self.layers = list(layers)
+        self._features: Dict[int, Tuple[Any, Dict[str, Any]]] = {}
+        self._snapshot: IndexSnapshot = (None, np.empty(0, dtype=np.int64), np.empty(0, dtype=object), [])
+        self._lock = threading.Lock()
+    
+    def covers(self, layers: Optional[List[str]]) -> bool:
+        """
+        Check whether the index can answer a lookup on some layers
+        
+        Args:
+            layers: Requested layers, or None for every layer
+            
+        Returns:
+            True if every requested layer is indexed
+        """
+        return layers is not None and set(layers) <= set(self.layers)
+    
+    def load(self):
+        """
+        Load every feature of the indexed layers from spatial_features
+        """
+        with self._lock:
+            self._features = dict(self._fetch(None))
+            self._rebuild()
+        
+        logger.info(f"Identify index loaded {len(self._features)} features of {', '.join(self.layers)}")
+    
+    def refresh(self, bounds_list: List[Tuple[float, float, float, float]]):
+        """
+        Reload the indexed features inside changed bounds
+        
+        Features inside the bounds that no longer exist (or left the indexed
+        layers) are dropped; features that moved are replaced by id.
+        
+        Args:
+            bounds_list: Changed bounds as (minx, miny, maxx, maxy) in EPSG:4326
+        """
+        if not bounds_list:
+            return
+        
+        with self._lock:
+            tree, ids, _, _ = self._snapshot
+            if tree is not None:
+                boxes = shapely.box(*np.asarray(bounds_list, dtype=np.float64).T)
+                _, stale = tree.query(boxes, predicate="intersects")
+                for row_id in ids[np.unique(stale)]:
+                    self._features.pop(int(row_id), None)
+            
+            self._features.update(self._fetch(bounds_list))
+            self._rebuild()
+        
+        logger.debug(f"Identify index refreshed {len(bounds_list)} changed bounds")
+    
+    def identify(self, lon: float, lat: float, layers: Optional[List[str]] = None, limit: int = IDENTIFY_MAX_RESULTS) -> List[Dict[str, Any]]:
+        """
+        Find the indexed features containing a point
+        
+        Args:
+            lon: Longitude (EPSG:4326)
+            lat: Latitude (EPSG:4326)
+            layers: Optional list of layers to limit the lookup to
+            limit: Maximum number of features to return
+            
+        Returns:
+            Matching features, smallest first so the innermost feature leads
+        """
+        tree, _, geometries, attributes = self._snapshot
+        if tree is None:
+            return []
+        
+        hits = tree.query(shapely.Point(lon, lat), predicate="intersects")
+        if layers:
+            hits = [hit for hit in hits if attributes[hit]["feature_type"] in layers]
+        
+        hits = sorted(hits, key=lambda hit: shapely.area(geometries[hit]))
+        return [attributes[hit] for hit in hits[:limit]]
+    
+    def _fetch(self, bounds_list: Optional[List[Tuple[float, float, float, float]]]) -> List[Tuple[int, Tuple[Any, Dict[str, Any]]]]:
+        """
+        Read indexed features from the database
+        
+        Args:
+            bounds_list: Optional bounds the features must intersect
+            
+        Returns:
+            (row id, (geometry, attributes)) pairs
+        """
+        params: Dict[str, Any] = {"layers": self.layers}
+        bounds_filter = ""
+        if bounds_list:
+            bounds = np.asarray(bounds_list, dtype=np.float64)
+            bounds_filter = """AND EXISTS (
+        SELECT 1
+        FROM unnest(:minx, :miny, :maxx, :maxy) AS b(minx, miny, maxx, maxy)
+        WHERE f.geometry && ST_MakeEnvelope(b.minx, b.miny, b.maxx, b.maxy, 4326)
+    )"""
+            params.update({
+                "minx": bounds[:, 0].tolist(),
+                "miny": bounds[:, 1].tolist(),
+                "maxx": bounds[:, 2].tolist(),
+                "maxy": bounds[:, 3].tolist()
+            })
+        
+        with get_db_session() as db:
+            rows = db.execute(text(INDEX_FEATURES_SQL.format(bounds_filter=bounds_filter)), params).fetchall()
+        
+        geometries = shapely.from_wkb([bytes(row.geometry) for row in rows])
+        return [
+            (row.id, (geometry, {
+                "id": row.feature_id,
+                "feature_type": row.feature_type,
+                "source_system": row.source_system
+            }))
+            for row, geometry in zip(rows, geometries)
+        ]
+    
+    def _rebuild(self):
+        """
+        Rebuild the tree from the in-memory features and publish it as a new snapshot
+        """
+        ids = np.fromiter(self._features.keys(), dtype=np.int64, count=len(self._features))
+        geometries = np.empty(len(ids), dtype=object)
+        attributes = []
+        for index, row_id in enumerate(ids):
+            geometries[index], feature_attributes = self._features[int(row_id)]
+            attributes.append(feature_attributes)
+        
+        tree = STRtree(geometries) if len(ids) else None
+        self._snapshot = (tree, ids, geometries, attributes)
+    
+    async def on_tile_change(self, notice: Dict[str, Any]):
+        """
+        Refresh the index as tile version notices report changed layer extents
+        
+        Args:
+            notice: Tile version change notice
+        """
+        if notice.get("flush"):
+            await asyncio.to_thread(self.load)
+            return
+        
+        # Extents of unknown layers may hold indexed features too
+        bounds = [
+            tuple(entry["bounds"]) for entry in notice.get("layers") or []
+            if entry.get("layer") is None or entry["layer"] in self.layers
+        ]
+        if bounds:
+            await asyncio.to_thread(self.refresh, bounds)
+
+async def start_feature_index() -> Optional[FeatureIndex]:
+    """
+    Build the identify index of the configured hot layers and keep it fresh
+    
+    Returns:
+        The index, or None when no layers are configured
+    """
+    if not TERRAMAP_IDENTIFY_LAYERS:
+        return None
+    
+    index = FeatureIndex(TERRAMAP_IDENTIFY_LAYERS)
+    
+    # Follow changes before loading, so none can fall in between
+    tile_versions.add_callback(index.on_tile_change)
+    await asyncio.to_thread(index.load)
+    
+    return index
+
+async def identify_features_async(lon: float, lat: float, layers: Optional[List[str]] = None, limit: int = IDENTIFY_MAX_RESULTS) -> List[Dict[str, Any]]:
+    """
+    Find the features containing a point with a PostGIS query
+    
+    Used for layers that are not held in the identify index.
+    
+    Args:
+        lon: Longitude (EPSG:4326)
+        lat: Latitude (EPSG:4326)
+        layers: Optional list of layers to limit the lookup to
+        limit: Maximum number of features to return
+        
+    Returns:
+        Matching features, smallest first
+    """
+    try:
+        # Execute query
+        _, query, args = identify_statement(lon, lat, layers, limit)
+        result = await execute_spatial_query_async(query, args)
+        
+        return query_rows(result, "identify query")
+    except Exception as e:
+        logger.error(f"Error identifying features at {lon},{lat}: {str(e)}")
+        raise
+
+def identify_statement(lon: float, lat: float, layers: Optional[List[str]], limit: int) -> Statement:
+    """
+    Build the query of the features containing a point
+    
+    Args:
+        lon: Longitude (EPSG:4326)
+        lat: Latitude (EPSG:4326)
+        layers: Optional list of layers to limit the lookup to
+        limit: Maximum number of features to return
+        
+    Returns:
+        Identify query statement
+    """
+    args: List[Any] = [float(lon), float(lat)]
+    query = """
+    SELECT
+        f.feature_id AS id,
+        f.feature_type,
+        f.source_system
+    FROM
+        spatial_features f
+    WHERE
+        ST_Intersects(f.geometry, ST_SetSRID(ST_MakePoint($1, $2), 4326))
+    """
+    
+    name = "identify"
+    if layers:
+        query += f" AND f.feature_type = ANY(CAST({bind_arg(args, list(layers))} AS text[]))"
+        name += "_layers"
+    
+    query += f" ORDER BY ST_Area(f.geometry) LIMIT {bind_arg(args, int(limit))}"
+    
+    return name, query, args
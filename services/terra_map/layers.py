@@ -0,0 +1,201 @@
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# JSON file with per-layer payload settings (see DEFAULT_LAYER_SETTINGS)
+TERRAMAP_LAYER_CONFIG = os.getenv("TERRAMAP_LAYER_CONFIG")
+
+# Deepest zoom level the settings are resolved for
+MAX_LAYER_ZOOM = 24
+
+# Width of the Web Mercator world in metres
+WEB_MERCATOR_WORLD_SIZE = 2 * 20037508.342789244
+
+# Payload settings of every layer, each a list of [minimum zoom, value] steps:
+# - decimals: coordinate decimal places of GeoJSON tiles, in EPSG:3857 metres
+# - extent: MVT tile extent
+# - properties: stored property keys to include, or null for all of them
+# and the zoom range the layer is drawn at:
+# - min_zoom, max_zoom: tiles outside the range never read the layer
+DEFAULT_LAYER_SETTINGS: Dict[str, Any] = {
+    "decimals": [[0, 0], [17, 1], [20, 2]],
+    "extent": [[0, 4096]],
+    "properties": [[0, None]],
+    "min_zoom": 0,
+    "max_zoom": MAX_LAYER_ZOOM
+}
+
+# EPSG:4326 outputs need about five more decimal places than metres
+# (1e-5 degrees is roughly 1.1 m at the equator)
+DEGREE_DECIMALS_OFFSET = 5
+
+def load_layer_config(path: Optional[str]) -> Dict[str, Any]:
+    """
+    Load the layer configuration file
+    
+    The file holds an optional "default" object overriding
+    DEFAULT_LAYER_SETTINGS and a "layers" object with per-layer overrides:
+        
+        {
+            "default": {"decimals": [[0, 0], [17, 1]]},
+            "layers": {
+                "parcel": {
+                    "properties": [[0, ["parcel_id"]], [14, ["parcel_id", "owner"]], [16, null]]
+                },
+                "building": {"min_zoom": 14}
+            }
+        }
+    
+    Args:
+        path: Path of the JSON file, or None for the defaults only
+        
+    Returns:
+        Layer configuration with "default" and "layers" entries
+    """
+    config: Dict[str, Any] = {"default": dict(DEFAULT_LAYER_SETTINGS), "layers": {}}
+    if not path:
+        return config
+    
+    try:
+        with open(path) as config_file:
+            loaded = json.load(config_file)
+        
+        config["default"].update(loaded.get("default") or {})
+        config["layers"] = loaded.get("layers") or {}
+        logger.info(f"Loaded layer settings for {len(config['layers'])} layers from {path}")
+    except Exception as e:
+        logger.error(f"Error loading layer config {path}: {str(e)}")
+        raise
+    
+    return config
+
+def setting_for_zoom(steps: List[List[Any]], z: int) -> Any:
+    """
+    Get the value of a zoom-stepped setting
+    
+    Args:
+        steps: [minimum zoom, value] steps
+        z: Zoom level
+        
+    Returns:
+        Value of the last step whose minimum zoom is at most z
+    """
+    value = steps[0][1] if steps else None
+    for min_zoom, step_value in sorted(steps, key=lambda step: step[0]):
+        if z >= min_zoom:
+            value = step_value
+    return value
+
+def resolve_settings(settings: Dict[str, Any], z: int) -> Dict[str, Any]:
+    """
+    Resolve a layer's settings at a zoom level
+    
+    Args:
+        settings: Zoom-stepped settings and zoom range
+        z: Zoom level
+        
+    Returns:
+        Settings values (decimals, degree_decimals, extent, properties, visible)
+    """
+    decimals = int(setting_for_zoom(settings["decimals"], z))
+    return {
+        "decimals": decimals,
+        "degree_decimals": decimals + DEGREE_DECIMALS_OFFSET,
+        "extent": int(setting_for_zoom(settings["extent"], z)),
+        "properties": setting_for_zoom(settings["properties"], z),
+        "visible": visible_at(settings, [z])
+    }
+
+def visible_at(settings: Dict[str, Any], zooms: Iterable[int]) -> bool:
+    """
+    Check whether a zoom range includes any of some zoom levels
+    
+    Args:
+        settings: Layer settings with min_zoom and max_zoom
+        zooms: Zoom levels
+        
+    Returns:
+        True if a zoom level falls inside the range
+    """
+    min_zoom = int(settings["min_zoom"])
+    max_zoom = int(settings["max_zoom"])
+    return any(min_zoom <= z <= max_zoom for z in zooms)
+
+def layer_visible(layer: str, zooms: Iterable[int]) -> bool:
+    """
+    Check whether a layer is drawn at any of some zoom levels
+    
+    Args:
+        layer: Layer name
+        zooms: Zoom levels
+        
+    Returns:
+        True if the layer's configured zoom range includes a zoom level
+    """
+    return visible_at({**layer_config["default"], **layer_config["layers"].get(layer, {})}, zooms)
+
+def visible_layers(layers: Optional[List[str]], zooms: Iterable[int]) -> Tuple[str, List[str]]:
+    """
+    Resolve which layers a tile query has to read at some zoom levels
+    
+    Args:
+        layers: Layers requested by the client, or None for every layer
+        zooms: Zoom levels of the tiles
+        
+    Returns:
+        (kind, layers) where kind is one of:
+        - "": every layer is visible, no filter is needed
+        - "layers": only the returned layers are visible
+        - "hidden": every layer but the returned ones is visible
+        - "none": no layer is visible, nothing needs to be read
+    """
+    zooms = list(zooms)
+    
+    if layers:
+        shown = [layer for layer in layers if layer_visible(layer, zooms)]
+    elif visible_at(layer_config["default"], zooms):
+        # Unconfigured layers are drawn, so only the configured ones can be excluded
+        hidden = [layer for layer in layer_config["layers"] if not layer_visible(layer, zooms)]
+        return ("hidden", hidden) if hidden else ("", [])
+    else:
+        shown = [layer for layer in layer_config["layers"] if layer_visible(layer, zooms)]
+    
+    return ("layers", shown) if shown else ("none", [])
+
+def layer_settings(z: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the payload settings of every configured layer at a zoom level
+    
+    Args:
+        z: Zoom level
+        
+    Returns:
+        Settings keyed by layer name, with the defaults under "*"
+    """
+    settings = {"*": resolve_settings(layer_config["default"], z)}
+    for layer, overrides in layer_config["layers"].items():
+        settings[layer] = resolve_settings({**layer_config["default"], **overrides}, z)
+    return settings
+
+def layer_settings_by_zoom(zooms: Iterable[int]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Get the payload settings of every configured layer at several zoom levels
+    
+    Args:
+        zooms: Zoom levels
+        
+    Returns:
+        Layer settings keyed by zoom level (as a string)
+    """
+    return {str(z): layer_settings(z) for z in set(zooms)}
+
+# Layer configuration, loaded once per process
+layer_config = load_layer_config(TERRAMAP_LAYER_CONFIG)
+
+# Fingerprint of the layer configuration, part of every cached tile's key
+LAYER_CONFIG_VERSION = hashlib.sha1(json.dumps(layer_config, sort_keys=True).encode()).hexdigest()[:12]
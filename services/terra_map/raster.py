@@ -0,0 +1,541 @@
+import os
+import zlib
+import json
+import struct
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+
+from services.common.database import execute_spatial_query_async
+from services.terra_map.generalization import band_for_zoom
+from services.terra_map.tiles import (
+    Statement,
+    WEB_MERCATOR_WORLD_SIZE,
+    query_rows,
+    tile_filters,
+    statement_name
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PNG_CONTENT_TYPE = "image/png"
+
+# Raster tile rendering settings
+RASTER_TILE_SIZE = int(os.getenv("RASTER_TILE_SIZE", "256"))
+RASTER_BUFFER = 4
+
+# Heatmap kernel radius in pixels, and the density (features per square
+# kilometre of Web Mercator area) at which the colour ramp saturates
+RASTER_HEATMAP_RADIUS = int(os.getenv("RASTER_HEATMAP_RADIUS", "8"))
+RASTER_HEATMAP_SATURATION = float(os.getenv("RASTER_HEATMAP_SATURATION", "2000"))
+
+# Raster styles: rasterized tile geometries, or a density heatmap of feature centroids
+RASTER_STYLES = ["features", "heatmap"]
+
+# Feature colours, picked per feature type
+FEATURE_PALETTE = np.array([
+    [31, 119, 180],
+    [255, 127, 14],
+    [44, 160, 44],
+    [214, 39, 40],
+    [148, 103, 189],
+    [140, 86, 75],
+    [227, 119, 194],
+    [23, 190, 207]
+], dtype=np.float32) / 255
+
+# Opacity of polygon fills, and of outlines, lines and points
+FILL_OPACITY = 0.35
+STROKE_OPACITY = 0.9
+POINT_RADIUS = 2
+
+# Heatmap colour ramp as (intensity, RGBA) stops
+HEATMAP_RAMP = [
+    (0.0, (0, 0, 255, 0)),
+    (0.2, (0, 0, 255, 110)),
+    (0.4, (0, 255, 255, 160)),
+    (0.6, (0, 255, 0, 190)),
+    (0.8, (255, 255, 0, 215)),
+    (1.0, (255, 0, 0, 235))
+]
+
+async def get_raster_tile_async(
+    z: int,
+    x: int,
+    y: int,
+    style: str = "features",
+    source: Optional[str] = None,
+    layers: Optional[List[str]] = None
+) -> bytes:
+    """
+    Render a PNG raster tile without blocking the event loop
+    
+    Rasterization runs in a worker thread; NumPy releases the GIL for most
+    of it.
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        style: Raster style ("features" or "heatmap")
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        PNG-encoded tile
+    """
+    try:
+        # Execute query
+        _, query, args = raster_statement(z, x, y, style, source, layers)
+        result = await execute_spatial_query_async(query, args)
+        
+        return await asyncio.to_thread(render_raster, z, style, query_rows(result, "raster query"))
+    except Exception as e:
+        logger.error(f"Error rendering raster tile {z}/{x}/{y}: {str(e)}")
+        raise
+
+def raster_statement(
+    z: int,
+    x: int,
+    y: int,
+    style: str,
+    source: Optional[str],
+    layers: Optional[List[str]]
+) -> Statement:
+    """
+    Build the query feeding a raster style
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        style: Raster style ("features" or "heatmap")
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Raster query statement
+    """
+    if style == "heatmap":
+        return density_grid_statement(z, x, y, source, layers)
+    if style == "features":
+        return raster_features_statement(z, x, y, source, layers)
+    raise ValueError(f"Unknown raster style: {style}")
+
+def render_raster(z: int, style: str, rows: List[Dict[str, Any]]) -> bytes:
+    """
+    Rasterize the rows of a raster query into a PNG tile
+    
+    Args:
+        z: Zoom level
+        style: Raster style ("features" or "heatmap")
+        rows: Rows of the style's query
+        
+    Returns:
+        PNG-encoded tile
+    """
+    if not rows:
+        return empty_tile()
+    
+    if style == "heatmap":
+        return encode_png(render_heatmap(z, rows))
+    return encode_png(render_features(rows))
+
+def raster_features_statement(z: int, x: int, y: int, source: Optional[str], layers: Optional[List[str]]) -> Statement:
+    """
+    Build the query of a tile's geometries in pixel coordinates
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Geometry query statement
+    """
+    args: List[Any] = [z, x, y, band_for_zoom(z), RASTER_TILE_SIZE, RASTER_BUFFER]
+    
+    # ST_AsMVTGeom clips, snaps to the pixel grid and flips the y axis,
+    # leaving coordinates ready to rasterize
+    query = """
+    WITH bounds AS (
+        SELECT ST_TileEnvelope($1, $2, $3) AS geom
+    )
+    SELECT
+        f.feature_type,
+        ST_AsGeoJSON(ST_AsMVTGeom(g.geometry, bounds.geom, $5, $6, true)) AS geometry
+    FROM
+        spatial_feature_generalized g
+        JOIN spatial_features f ON f.id = g.feature_id,
+        bounds
+    WHERE
+        g.zoom_band = $4
+        AND ST_Intersects(g.geometry, bounds.geom)
+    """
+    
+    # Add source and layers filters if specified
+    query += tile_filters(source, layers, args, [z])
+    
+    return statement_name("raster_features", source, layers, [z]), query, args
+
+def density_grid_statement(z: int, x: int, y: int, source: Optional[str], layers: Optional[List[str]]) -> Statement:
+    """
+    Build the query counting feature centroids per pixel of a tile
+    
+    The grid extends RASTER_HEATMAP_RADIUS pixels past the tile edges so
+    the heatmap kernel blends seamlessly into neighbouring tiles.
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Density grid query statement
+    """
+    pixel_size = WEB_MERCATOR_WORLD_SIZE / (RASTER_TILE_SIZE * 2 ** z)
+    args: List[Any] = [z, x, y, band_for_zoom(z), pixel_size, RASTER_HEATMAP_RADIUS * pixel_size]
+    
+    query = """
+    WITH bounds AS (
+        SELECT ST_TileEnvelope($1, $2, $3) AS geom, ST_Expand(ST_TileEnvelope($1, $2, $3), $6) AS search
+    ),
+    centroids AS (
+        SELECT
+            ST_Centroid(g.geometry) AS geom,
+            bounds.geom AS tile
+        FROM
+            spatial_feature_generalized g
+            JOIN spatial_features f ON f.id = g.feature_id,
+            bounds
+        WHERE
+            g.zoom_band = $4
+            AND g.geometry && bounds.search
+    """
+    
+    # Add source and layers filters if specified
+    query += tile_filters(source, layers, args, [z])
+    
+    query += """
+    )
+    SELECT
+        floor((ST_X(c.geom) - ST_XMin(c.tile)) / $5)::integer AS px,
+        floor((ST_YMax(c.tile) - ST_Y(c.geom)) / $5)::integer AS py,
+        COUNT(*) AS count
+    FROM
+        centroids c
+    GROUP BY
+        px, py
+    """
+    
+    return statement_name("raster_density", source, layers, [z]), query, args
+
+def geometry_parts(geometry: Dict[str, Any], polygons: List[np.ndarray], lines: List[np.ndarray], points: List[np.ndarray]):
+    """
+    Split a GeoJSON geometry into polygon rings, lines and points
+    
+    Args:
+        geometry: GeoJSON geometry in pixel coordinates
+        polygons: Collected polygon rings
+        lines: Collected line strings
+        points: Collected points
+    """
+    geometry_type = geometry["type"]
+    coordinates = geometry.get("coordinates")
+    
+    if geometry_type == "Polygon":
+        polygons.extend(np.asarray(ring, dtype=np.float64) for ring in coordinates)
+    elif geometry_type == "MultiPolygon":
+        polygons.extend(np.asarray(ring, dtype=np.float64) for polygon in coordinates for ring in polygon)
+    elif geometry_type == "LineString":
+        lines.append(np.asarray(coordinates, dtype=np.float64))
+    elif geometry_type == "MultiLineString":
+        lines.extend(np.asarray(line, dtype=np.float64) for line in coordinates)
+    elif geometry_type == "Point":
+        points.append(np.asarray([coordinates], dtype=np.float64))
+    elif geometry_type == "MultiPoint":
+        points.append(np.asarray(coordinates, dtype=np.float64))
+    elif geometry_type == "GeometryCollection":
+        for part in geometry["geometries"]:
+            geometry_parts(part, polygons, lines, points)
+
+def path_segments(paths: List[np.ndarray]) -> np.ndarray:
+    """
+    Get the segments of polygon rings or line strings
+    
+    Args:
+        paths: Coordinate arrays of shape (n, 2)
+        
+    Returns:
+        Segments as an array of (x0, y0, x1, y1) rows
+    """
+    segments = [np.hstack([path[:-1, :2], path[1:, :2]]) for path in paths if len(path) > 1]
+    if not segments:
+        return np.empty((0, 4))
+    return np.vstack(segments)
+
+def fill_mask(edges: np.ndarray, size: int) -> np.ndarray:
+    """
+    Rasterize polygon edges with the non-zero winding rule
+    
+    Each edge adds its direction at the first pixel right of where it
+    crosses a pixel row's centre line; a running sum along the row then
+    gives the winding number of every pixel. ST_AsMVTGeom winds holes
+    opposite to exterior rings, so holes stay empty.
+    
+    Args:
+        edges: Polygon edges as (x0, y0, x1, y1) rows in pixel coordinates
+        size: Tile size in pixels
+        
+    Returns:
+        Boolean mask of the filled pixels
+    """
+    edges = edges[edges[:, 1] != edges[:, 3]]
+    if not len(edges):
+        return np.zeros((size, size), dtype=bool)
+    
+    x0, y0, x1, y1 = edges.T
+    direction = np.where(y1 > y0, 1, -1)
+    
+    # Pixel rows whose centre line (row + 0.5) lies in [min y, max y)
+    first_row = np.clip(np.ceil(np.minimum(y0, y1) - 0.5), 0, size).astype(np.int64)
+    end_row = np.clip(np.ceil(np.maximum(y0, y1) - 0.5), 0, size).astype(np.int64)
+    row_counts = end_row - first_row
+    
+    edge_index = np.repeat(np.arange(len(edges)), row_counts)
+    offsets = np.arange(len(edge_index)) - np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+    rows = first_row[edge_index] + offsets
+    
+    # Column where each edge crosses each of its rows
+    row_y = rows + 0.5
+    crossing_x = x0[edge_index] + (row_y - y0[edge_index]) * (x1 - x0)[edge_index] / (y1 - y0)[edge_index]
+    columns = np.clip(np.ceil(crossing_x - 0.5), 0, size).astype(np.int64)
+    
+    winding = np.zeros((size, size + 1), dtype=np.int32)
+    np.add.at(winding, (rows, columns), direction[edge_index])
+    return np.cumsum(winding, axis=1)[:, :size] != 0
+
+def stroke_mask(segments: np.ndarray, size: int) -> np.ndarray:
+    """
+    Rasterize line segments one pixel wide
+    
+    Args:
+        segments: Segments as (x0, y0, x1, y1) rows in pixel coordinates
+        size: Tile size in pixels
+        
+    Returns:
+        Boolean mask of the stroked pixels
+    """
+    mask = np.zeros((size, size), dtype=bool)
+    if not len(segments):
+        return mask
+    
+    # Sample every segment at least once per pixel of its length
+    x0, y0, x1, y1 = segments.T
+    samples = np.ceil(np.hypot(x1 - x0, y1 - y0)).astype(np.int64) + 1
+    segment_index = np.repeat(np.arange(len(segments)), samples)
+    steps = np.arange(len(segment_index)) - np.repeat(np.cumsum(samples) - samples, samples)
+    t = steps / np.maximum(samples[segment_index] - 1, 1)
+    
+    xs = np.floor(x0[segment_index] + t * (x1 - x0)[segment_index]).astype(np.int64)
+    ys = np.floor(y0[segment_index] + t * (y1 - y0)[segment_index]).astype(np.int64)
+    inside = (xs >= 0) & (xs < size) & (ys >= 0) & (ys < size)
+    mask[ys[inside], xs[inside]] = True
+    return mask
+
+def point_mask(points: np.ndarray, size: int, radius: int = POINT_RADIUS) -> np.ndarray:
+    """
+    Rasterize points as small squares
+    
+    Args:
+        points: Points as (x, y) rows in pixel coordinates
+        size: Tile size in pixels
+        radius: Half the square's side in pixels
+        
+    Returns:
+        Boolean mask of the covered pixels
+    """
+    mask = np.zeros((size, size), dtype=bool)
+    if not len(points):
+        return mask
+    
+    xs = np.floor(points[:, 0]).astype(np.int64)
+    ys = np.floor(points[:, 1]).astype(np.int64)
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            px, py = xs + dx, ys + dy
+            inside = (px >= 0) & (px < size) & (py >= 0) & (py < size)
+            mask[py[inside], px[inside]] = True
+    return mask
+
+def composite(canvas: np.ndarray, mask: np.ndarray, color: np.ndarray, opacity: float):
+    """
+    Paint a colour over the masked pixels of a premultiplied RGBA canvas
+    
+    Args:
+        canvas: Float RGBA canvas with premultiplied alpha, updated in place
+        mask: Boolean mask of the pixels to paint
+        color: RGB colour in [0, 1]
+        opacity: Paint opacity
+    """
+    alpha = mask.astype(np.float32)[..., None] * opacity
+    canvas[..., :3] = color * alpha + canvas[..., :3] * (1 - alpha)
+    canvas[..., 3:] = alpha + canvas[..., 3:] * (1 - alpha)
+
+def render_features(rows: List[Dict[str, Any]], size: int = RASTER_TILE_SIZE) -> np.ndarray:
+    """
+    Rasterize tile geometries, one colour per feature type
+    
+    Args:
+        rows: Rows with "feature_type" and pixel-space GeoJSON "geometry" columns
+        size: Tile size in pixels
+        
+    Returns:
+        RGBA image as a (size, size, 4) uint8 array
+    """
+    # Collect each feature type's geometry parts so every type is painted in one pass
+    parts: Dict[str, Tuple[List[np.ndarray], List[np.ndarray], List[np.ndarray]]] = {}
+    for row in rows:
+        if not row["geometry"]:
+            continue
+        polygons, lines, points = parts.setdefault(row["feature_type"], ([], [], []))
+        geometry_parts(json.loads(row["geometry"]), polygons, lines, points)
+    
+    canvas = np.zeros((size, size, 4), dtype=np.float32)
+    for feature_type in sorted(parts):
+        polygons, lines, points = parts[feature_type]
+        color = FEATURE_PALETTE[zlib.crc32(feature_type.encode()) % len(FEATURE_PALETTE)]
+        
+        if polygons:
+            edges = path_segments(polygons)
+            composite(canvas, fill_mask(edges, size), color, FILL_OPACITY)
+            composite(canvas, stroke_mask(edges, size), color, STROKE_OPACITY)
+        if lines:
+            composite(canvas, stroke_mask(path_segments(lines), size), color, STROKE_OPACITY)
+        if points:
+            composite(canvas, point_mask(np.vstack(points), size), color, STROKE_OPACITY)
+    
+    # Un-premultiply for PNG's straight alpha
+    alpha = canvas[..., 3:]
+    rgb = np.divide(canvas[..., :3], alpha, out=np.zeros_like(canvas[..., :3]), where=alpha > 0)
+    return (np.concatenate([rgb, alpha], axis=2) * 255 + 0.5).astype(np.uint8)
+
+def gaussian_blur(grid: np.ndarray, radius: int) -> np.ndarray:
+    """
+    Blur a grid with a separable Gaussian kernel
+    
+    Args:
+        grid: 2D array
+        radius: Kernel radius in cells (the kernel's sigma is half of it)
+        
+    Returns:
+        Blurred grid of the same shape
+    """
+    if radius <= 0:
+        return grid
+    
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-(offsets ** 2) / (2 * (radius / 2) ** 2))
+    kernel /= kernel.sum()
+    
+    # Sum shifted copies along each axis instead of looping over cells
+    for axis in (0, 1):
+        padding = [(0, 0), (0, 0)]
+        padding[axis] = (radius, radius)
+        padded = np.pad(grid, padding)
+        length = grid.shape[axis]
+        grid = sum(weight * np.take(padded, np.arange(i, i + length), axis=axis) for i, weight in enumerate(kernel))
+    return grid
+
+def heatmap_lut() -> np.ndarray:
+    """
+    Build the 256-entry RGBA lookup table of the heatmap colour ramp
+    """
+    stops = np.array([stop for stop, _ in HEATMAP_RAMP])
+    colors = np.array([color for _, color in HEATMAP_RAMP], dtype=np.float64)
+    levels = np.linspace(0, 1, 256)
+    return np.stack([np.interp(levels, stops, colors[:, channel]) for channel in range(4)], axis=1).round().astype(np.uint8)
+
+def render_heatmap(z: int, rows: List[Dict[str, Any]], size: int = RASTER_TILE_SIZE, radius: int = RASTER_HEATMAP_RADIUS) -> np.ndarray:
+    """
+    Render a density heatmap from per-pixel centroid counts
+    
+    Intensity follows the density per unit area, so the same data looks the
+    same at every zoom level and neighbouring tiles match at their edges.
+    
+    Args:
+        z: Zoom level
+        rows: Rows with "px", "py" and "count" columns (pixel offsets from the tile's top left)
+        size: Tile size in pixels
+        radius: Kernel radius in pixels
+        
+    Returns:
+        RGBA image as a (size, size, 4) uint8 array
+    """
+    px = np.array([row["px"] for row in rows], dtype=np.int64) + radius
+    py = np.array([row["py"] for row in rows], dtype=np.int64) + radius
+    counts = np.array([row["count"] for row in rows], dtype=np.float64)
+    
+    # Density grid including the margin the kernel reaches into
+    extent = size + 2 * radius
+    inside = (px >= 0) & (px < extent) & (py >= 0) & (py < extent)
+    grid = np.zeros((extent, extent), dtype=np.float64)
+    np.add.at(grid, (py[inside], px[inside]), counts[inside])
+    
+    density = gaussian_blur(grid, radius)[radius:radius + size, radius:radius + size]
+    
+    # Features per pixel at which the ramp saturates
+    pixel_area_km2 = (WEB_MERCATOR_WORLD_SIZE / (size * 2 ** z)) ** 2 / 1e6
+    saturation = RASTER_HEATMAP_SATURATION * pixel_area_km2
+    
+    intensity = np.clip(np.log1p(density) / np.log1p(saturation), 0, 1)
+    return HEATMAP_LUT[(intensity * 255).astype(np.uint8)]
+
+def encode_png(image: np.ndarray) -> bytes:
+    """
+    Encode an RGBA image as PNG
+    
+    Args:
+        image: RGBA image as a (height, width, 4) uint8 array
+        
+    Returns:
+        PNG file content
+    """
+    height, width, _ = image.shape
+    
+    # Every scanline starts with its filter type (0: none)
+    scanlines = np.hstack([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, width * 4)])
+    
+    def chunk(chunk_type: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+    
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6)),
+        chunk(b"IEND", b"")
+    ])
+
+def empty_tile(size: int = RASTER_TILE_SIZE) -> bytes:
+    """
+    Get a fully transparent PNG tile
+    
+    Args:
+        size: Tile size in pixels
+        
+    Returns:
+        PNG file content
+    """
+    if size not in EMPTY_TILES:
+        EMPTY_TILES[size] = encode_png(np.zeros((size, size, 4), dtype=np.uint8))
+    return EMPTY_TILES[size]
+
+# Heatmap colour lookup table and transparent tiles, built once per process
+HEATMAP_LUT = heatmap_lut()
+EMPTY_TILES: Dict[int, bytes] = {}
@@ -1,18 +1,41 @@
+import os
 import json
 import logging
 import math
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 import mercantile
 from shapely.geometry import box
-from services.common.database import execute_spatial_query
+from services.common.database import execute_prepared_query, execute_spatial_query_async, stream_spatial_query_async
 from services.common.models import SpatialFeature
+from services.terra_map.catalog import get_catalog_stats, get_catalog_stats_async
+from services.terra_map.generalization import band_for_zoom
+from services.terra_map.layers import MAX_LAYER_ZOOM, WEB_MERCATOR_WORLD_SIZE, layer_settings, layer_settings_by_zoom, visible_layers
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def get_vector_tile(z: int, x: int, y: int, source: Optional[str] = None, layers: Optional[List[str]] = None) -> Dict[str, Any]:
+# Mapbox Vector Tile encoding settings
+MVT_CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+
+# Tiles with more features than the budget are aggregated into grid cells
+TILE_FEATURE_BUDGET = int(os.getenv("TILE_FEATURE_BUDGET", "5000"))
+TILE_AGGREGATION_MAX_ZOOM = int(os.getenv("TILE_AGGREGATION_MAX_ZOOM", "14"))
+TILE_AGGREGATION_GRID_SIZE = int(os.getenv("TILE_AGGREGATION_GRID_SIZE", "64"))
+
+# A query as (prepared statement name, SQL with $n placeholders, arguments).
+# Each query is built once and run either synchronously through
+# execute_prepared_query (ETL, archive seeding) or through the asyncpg pool
+# (request handlers, the *_async functions).
+Statement = Tuple[str, str, List[Any]]
+
+def get_vector_tile_mvt(z: int, x: int, y: int, source: Optional[str] = None, layers: Optional[List[str]] = None) -> bytes:
     """
-    Get a vector tile for the specified tile coordinates
+    Get a vector tile for the specified tile coordinates as a Mapbox Vector Tile
+    
+    The tile is encoded by PostGIS with ST_AsMVTGeom/ST_AsMVT, producing one
+    MVT layer per feature type, so no GeoJSON is built or parsed in Python.
     
     Args:
         z: Zoom level
@@ -22,150 +45,1232 @@ def get_vector_tile(z: int, x: int, y: int, source: Optional[str] = None, layers
         layers: Optional list of layers to include
         
     Returns:
-        Vector tile data in GeoJSON format
+        Protobuf-encoded vector tile (empty bytes if the tile has no features)
     """
     try:
-        # Convert tile coordinates to bounding box
-        bbox = tile_to_bbox(z, x, y)
-        
-        # Build SQL query for PostGIS
-        query = f"""
-        SELECT 
-            id, 
-            feature_id, 
-            feature_type, 
-            properties, 
-            ST_AsGeoJSON(ST_Simplify(
-                ST_Transform(
-                    ST_Intersection(
-                        geometry, 
-                        ST_Transform(
-                            ST_MakeEnvelope({bbox[0]}, {bbox[1]}, {bbox[2]}, {bbox[3]}, 4326),
-                            4326
-                        )
-                    ),
-                    3857
-                ),
-                {simplification_factor_for_zoom(z)}
-            )) as geometry,
-            source_system,
-            is_synced
-        FROM 
-            spatial_features
-        WHERE 
-            ST_Intersects(
-                geometry, 
-                ST_Transform(
-                    ST_MakeEnvelope({bbox[0]}, {bbox[1]}, {bbox[2]}, {bbox[3]}, 4326),
-                    4326
-                )
+        # Dense tiles are aggregated into grid cells to cap payload and DB work
+        if tile_exceeds_feature_budget(z, x, y, source, layers):
+            return get_aggregated_tile_mvt(z, x, y, source, layers)
+        
+        # Execute query
+        result = execute_prepared_query(*vector_tile_mvt_statement(z, x, y, source, layers))
+        
+        return mvt_from_rows(query_rows(result, "spatial query"))
+    except Exception as e:
+        logger.error(f"Error generating MVT tile {z}/{x}/{y}: {str(e)}")
+        raise
+
+async def get_vector_tile_mvt_async(z: int, x: int, y: int, source: Optional[str] = None, layers: Optional[List[str]] = None) -> bytes:
+    """
+    Get a Mapbox Vector Tile without blocking the event loop
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Protobuf-encoded vector tile (empty bytes if the tile has no features)
+    """
+    try:
+        # Dense tiles are aggregated into grid cells to cap payload and DB work
+        if await tile_exceeds_feature_budget_async(z, x, y, source, layers):
+            return await get_aggregated_tile_mvt_async(z, x, y, source, layers)
+        
+        # Execute query
+        _, query, args = vector_tile_mvt_statement(z, x, y, source, layers)
+        result = await execute_spatial_query_async(query, args)
+        
+        return mvt_from_rows(query_rows(result, "spatial query"))
+    except Exception as e:
+        logger.error(f"Error generating MVT tile {z}/{x}/{y}: {str(e)}")
+        raise
+
+def vector_tile_mvt_statement(z: int, x: int, y: int, source: Optional[str], layers: Optional[List[str]]) -> Statement:
+    """
+    Build the query of a Mapbox Vector Tile
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        MVT query statement
+    """
+    args: List[Any] = [z, x, y, band_for_zoom(z), MVT_BUFFER]
+    settings = bind_layer_settings(args, z)
+    extent = layer_setting_sql(settings, "extent")
+    
+    # Build SQL query for PostGIS against the pre-simplified geometries
+    # of the tile's zoom band, clipping in Web Mercator tile space
+    query = f"""
+    WITH bounds AS (
+        SELECT ST_TileEnvelope($1, $2, $3) AS geom
+    ),
+    mvtgeom AS (
+        SELECT
+            f.id AS fid,
+            f.feature_id AS id,
+            f.feature_type,
+            {layer_properties_sql(settings)} AS properties,
+            f.source_system,
+            f.is_synced,
+            {extent} AS layer_extent,
+            ST_AsMVTGeom(g.geometry, bounds.geom, {extent}, $5, true) AS geom
+        FROM
+            spatial_feature_generalized g
+            JOIN spatial_features f ON f.id = g.feature_id,
+            bounds
+        WHERE
+            g.zoom_band = $4
+            AND ST_Intersects(g.geometry, bounds.geom)
+    """
+    
+    # Add source and layers filters if specified
+    query += tile_filters(source, layers, args, [z])
+    
+    # Encode one MVT layer per feature type, each with its own extent;
+    # the lateral row leaves layer_extent out of the encoded attributes
+    query += """
+    )
+    SELECT
+        ST_AsMVT(features, m.feature_type, m.layer_extent, 'geom', 'fid') AS mvt
+    FROM
+        mvtgeom m
+        CROSS JOIN LATERAL (
+            SELECT m.fid, m.id, m.feature_type, m.properties, m.source_system, m.is_synced, m.geom
+        ) AS features
+    WHERE
+        m.geom IS NOT NULL
+    GROUP BY
+        m.feature_type
+    """
+    
+    return statement_name("tile_mvt", source, layers, [z]), query, args
+
+def mvt_from_rows(rows: List[Dict[str, Any]]) -> bytes:
+    """
+    Join the per-layer rows of an MVT query into one tile
+    
+    Args:
+        rows: Rows with an "mvt" column
+        
+    Returns:
+        Protobuf-encoded vector tile
+    """
+    # MVT layers are independent protobuf messages and can be concatenated
+    return b"".join(bytes(row["mvt"]) for row in rows if row["mvt"])
+
+def query_rows(result: Dict[str, Any], description: str) -> List[Dict[str, Any]]:
+    """
+    Get the rows of a query result, raising if the query failed
+    
+    Args:
+        result: Result of execute_prepared_query or execute_spatial_query_async
+        description: Description of the query for the error message
+        
+    Returns:
+        Result rows
+    """
+    if result["status"] != "success":
+        raise Exception(f"Error executing {description}: {result.get('message')}")
+    
+    return result["data"]
+
+def bind_arg(args: List[Any], value: Any) -> str:
+    """
+    Append a value to the positional arguments of a prepared query
+    
+    Args:
+        args: Query arguments, updated with the value
+        value: Value to bind
+        
+    Returns:
+        Placeholder of the value ($1, $2, ...)
+    """
+    args.append(value)
+    return f"${len(args)}"
+
+def bind_layer_settings(args: List[Any], z: int) -> str:
+    """
+    Bind the payload settings of every layer at a zoom level
+    
+    Args:
+        args: Query arguments, updated with the settings
+        z: Zoom level
+        
+    Returns:
+        SQL expression of the settings as jsonb keyed by layer name
+    """
+    return f"CAST(CAST({bind_arg(args, json.dumps(layer_settings(z)))} AS text) AS jsonb)"
+
+def bind_layer_settings_by_zoom(args: List[Any], zooms: List[int], zoom_column: str) -> str:
+    """
+    Bind the payload settings of every layer at several zoom levels
+    
+    Args:
+        args: Query arguments, updated with the settings
+        zooms: Zoom levels
+        zoom_column: SQL expression of each row's zoom level
+        
+    Returns:
+        SQL expression of the row's settings as jsonb keyed by layer name
+    """
+    settings = bind_arg(args, json.dumps(layer_settings_by_zoom(zooms)))
+    return f"(CAST(CAST({settings} AS text) AS jsonb) -> CAST({zoom_column} AS text))"
+
+def layer_setting_sql(settings: str, key: str) -> str:
+    """
+    Build the SQL expression of an integer layer setting for spatial_features f
+    
+    Args:
+        settings: SQL expression of the bound layer settings
+        key: Setting name ("decimals", "degree_decimals" or "extent")
+        
+    Returns:
+        SQL expression of type integer
+    """
+    return f"CAST(COALESCE({settings} -> f.feature_type, {settings} -> '*') ->> '{key}' AS integer)"
+
+def layer_visible_sql(settings: str) -> str:
+    """
+    Build the SQL condition of spatial_features f being drawn at the row's zoom level
+    
+    Batches can mix zoom levels, so layers hidden at only some of them
+    are dropped per row.
+    
+    Args:
+        settings: SQL expression of the bound layer settings
+        
+    Returns:
+        SQL expression of type boolean
+    """
+    return f"CAST(COALESCE({settings} -> f.feature_type, {settings} -> '*') ->> 'visible' AS boolean)"
+
+def layer_properties_sql(settings: str) -> str:
+    """
+    Build the SQL expression of the properties of spatial_features f kept by its layer settings
+    
+    Args:
+        settings: SQL expression of the bound layer settings
+        
+    Returns:
+        SQL expression of type jsonb
+    """
+    keys = f"(COALESCE({settings} -> f.feature_type, {settings} -> '*') -> 'properties')"
+    return f"""CASE
+            WHEN jsonb_typeof({keys}) = 'array' THEN (
+                SELECT jsonb_object_agg(p.key, p.value)
+                FROM jsonb_each(f.properties) AS p
+                WHERE {keys} ? p.key
             )
-        """
+            ELSE f.properties
+        END"""
+
+def tile_filters(source: Optional[str], layers: Optional[List[str]], args: List[Any], zooms: List[int]) -> str:
+    """
+    Build the optional source and layer filters of a tile query
+    
+    Layers outside their configured zoom range at every tile zoom are
+    dropped here, before the query runs.
+    
+    Args:
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        args: Query arguments, updated with the filter values
+        zooms: Zoom levels of the queried tiles
+        
+    Returns:
+        SQL conditions to append to the WHERE clause of a query on spatial_features f
+    """
+    conditions = ""
+    
+    if source:
+        conditions += f" AND f.source_system = {bind_arg(args, source)}"
+    
+    kind, visible = visible_layers(layers, zooms)
+    if kind == "layers":
+        conditions += f" AND f.feature_type = ANY(CAST({bind_arg(args, visible)} AS text[]))"
+    elif kind == "hidden":
+        conditions += f" AND f.feature_type <> ALL(CAST({bind_arg(args, visible)} AS text[]))"
+    elif kind == "none":
+        # Constant false lets PostgreSQL skip the scan entirely
+        conditions += " AND false"
+    
+    return conditions
+
+def statement_name(base: str, source: Optional[str], layers: Optional[List[str]], zooms: List[int]) -> str:
+    """
+    Get the prepared statement name of a tile query variant
+    
+    The optional filters change the query text, so each combination of
+    filters is prepared as its own statement.
+    
+    Args:
+        base: Base statement name
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        zooms: Zoom levels of the queried tiles
+        
+    Returns:
+        Statement name
+    """
+    name = base
+    if source:
+        name += "_source"
+    kind, _ = visible_layers(layers, zooms)
+    if kind:
+        name += f"_{kind}"
+    return name
+
+def tile_exceeds_feature_budget(z: int, x: int, y: int, source: Optional[str] = None, layers: Optional[List[str]] = None) -> bool:
+    """
+    Check whether a tile holds more features than the per-tile budget
+    
+    Only counts up to the budget, so the check stays cheap on dense tiles.
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        True if the tile should be aggregated
+    """
+    if z > TILE_AGGREGATION_MAX_ZOOM:
+        return False
+    
+    result = execute_prepared_query(*feature_budget_statement(z, x, y, source, layers))
+    
+    return query_rows(result, "tile feature count")[0]["count"] > TILE_FEATURE_BUDGET
+
+async def tile_exceeds_feature_budget_async(z: int, x: int, y: int, source: Optional[str] = None, layers: Optional[List[str]] = None) -> bool:
+    """
+    Check whether a tile holds more features than the per-tile budget without blocking the event loop
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        True if the tile should be aggregated
+    """
+    if z > TILE_AGGREGATION_MAX_ZOOM:
+        return False
+    
+    _, query, args = feature_budget_statement(z, x, y, source, layers)
+    result = await execute_spatial_query_async(query, args)
+    
+    return query_rows(result, "tile feature count")[0]["count"] > TILE_FEATURE_BUDGET
+
+def feature_budget_statement(z: int, x: int, y: int, source: Optional[str], layers: Optional[List[str]]) -> Statement:
+    """
+    Build the query counting a tile's features up to the budget
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Count query statement
+    """
+    args: List[Any] = [z, x, y, band_for_zoom(z)]
+    query = """
+    SELECT COUNT(*) AS count FROM (
+        SELECT 1
+        FROM
+            spatial_feature_generalized g
+            JOIN spatial_features f ON f.id = g.feature_id
+        WHERE
+            g.zoom_band = $4
+            AND g.geometry && ST_TileEnvelope($1, $2, $3)
+    """
+    query += tile_filters(source, layers, args, [z])
+    query += f"""
+        LIMIT {bind_arg(args, TILE_FEATURE_BUDGET + 1)}
+    ) AS candidates
+    """
+    
+    return statement_name("tile_count", source, layers, [z]), query, args
+
+async def tiles_exceeding_feature_budget_async(
+    tiles: List[Tuple[int, int, int]],
+    source: Optional[str] = None,
+    layers: Optional[List[str]] = None
+) -> List[Tuple[int, int, int]]:
+    """
+    Find the dense tiles of a batch without blocking the event loop
+    
+    Args:
+        tiles: Tile coordinates as (z, x, y)
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Tiles that should be aggregated
+    """
+    candidates = [tile for tile in tiles if tile[0] <= TILE_AGGREGATION_MAX_ZOOM]
+    if not candidates:
+        return []
+    
+    _, query, args = batch_feature_budget_statement(candidates, source, layers)
+    result = await execute_spatial_query_async(query, args)
+    rows = query_rows(result, "tile feature count")
+    
+    return [(row["z"], row["x"], row["y"]) for row in rows if row["count"] > TILE_FEATURE_BUDGET]
+
+def batch_feature_budget_statement(
+    tiles: List[Tuple[int, int, int]],
+    source: Optional[str],
+    layers: Optional[List[str]]
+) -> Statement:
+    """
+    Build the query counting the features of several tiles up to the budget
+    
+    Args:
+        tiles: Tile coordinates as (z, x, y)
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Count query statement
+    """
+    zooms = [tile[0] for tile in tiles]
+    args: List[Any] = [
+        zooms,
+        [tile[1] for tile in tiles],
+        [tile[2] for tile in tiles],
+        [band_for_zoom(z) for z in zooms]
+    ]
+    query = """
+    SELECT
+        t.z, t.x, t.y,
+        (
+            SELECT COUNT(*) FROM (
+                SELECT 1
+                FROM
+                    spatial_feature_generalized g
+                    JOIN spatial_features f ON f.id = g.feature_id
+                WHERE
+                    g.zoom_band = t.zoom_band
+                    AND g.geometry && ST_TileEnvelope(t.z, t.x, t.y)
+    """
+    query += tile_filters(source, layers, args, zooms)
+    query += f"""
+                LIMIT {bind_arg(args, TILE_FEATURE_BUDGET + 1)}
+            ) AS candidates
+        ) AS count
+    FROM
+        unnest(
+            CAST($1 AS integer[]),
+            CAST($2 AS integer[]),
+            CAST($3 AS integer[]),
+            CAST($4 AS integer[])
+        ) AS t(z, x, y, zoom_band)
+    """
+    
+    return statement_name("tile_batch_count", source, layers, zooms), query, args
+
+def aggregated_cells_query(z: int, x: int, y: int, source: Optional[str], layers: Optional[List[str]], args: List[Any]) -> str:
+    """
+    Build the CTEs that aggregate a tile's features into grid cells
+    
+    Features are reduced to a point on their surface, snapped to a grid of
+    TILE_AGGREGATION_GRID_SIZE cells per tile side and grouped per layer.
+    Defines the CTEs "bounds" and "cells" (feature_type, count, point).
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        args: Query arguments, updated with the values used
+        
+    Returns:
+        SQL WITH clause
+    """
+    bbox = mercantile.xy_bounds(x, y, z)
+    cell_size = WEB_MERCATOR_WORLD_SIZE / (2 ** z) / TILE_AGGREGATION_GRID_SIZE
+    
+    query = f"""
+    WITH bounds AS (
+        SELECT ST_TileEnvelope({bind_arg(args, z)}, {bind_arg(args, x)}, {bind_arg(args, y)}) AS geom
+    ),
+    points AS (
+        SELECT
+            f.feature_type,
+            ST_PointOnSurface(g.geometry) AS point
+        FROM
+            spatial_feature_generalized g
+            JOIN spatial_features f ON f.id = g.feature_id,
+            bounds
+        WHERE
+            g.zoom_band = {bind_arg(args, band_for_zoom(z))}
+            AND ST_Intersects(g.geometry, bounds.geom)
+    """
+    query += tile_filters(source, layers, args, [z])
+    origin_x = bind_arg(args, float(bbox.left))
+    origin_y = bind_arg(args, float(bbox.bottom))
+    cell = bind_arg(args, float(cell_size))
+    query += f"""
+    ),
+    cells AS (
+        SELECT
+            feature_type,
+            COUNT(*) AS count,
+            ST_Centroid(ST_Collect(point)) AS point
+        FROM
+            points
+        GROUP BY
+            feature_type,
+            ST_SnapToGrid(point, {origin_x}, {origin_y}, {cell}, {cell})
+    )
+    """
+    return query
+
+def get_aggregated_tile_mvt(z: int, x: int, y: int, source: Optional[str] = None, layers: Optional[List[str]] = None) -> bytes:
+    """
+    Get a Mapbox Vector Tile whose features are aggregated into grid cells
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Protobuf-encoded vector tile with one point per grid cell
+    """
+    try:
+        # Execute query
+        result = execute_prepared_query(*aggregated_tile_mvt_statement(z, x, y, source, layers))
+        
+        return mvt_from_rows(query_rows(result, "aggregation query"))
+    except Exception as e:
+        logger.error(f"Error generating aggregated MVT tile {z}/{x}/{y}: {str(e)}")
+        raise
+
+async def get_aggregated_tile_mvt_async(z: int, x: int, y: int, source: Optional[str] = None, layers: Optional[List[str]] = None) -> bytes:
+    """
+    Get an aggregated Mapbox Vector Tile without blocking the event loop
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Protobuf-encoded vector tile with one point per grid cell
+    """
+    try:
+        # Execute query
+        _, query, args = aggregated_tile_mvt_statement(z, x, y, source, layers)
+        result = await execute_spatial_query_async(query, args)
+        
+        return mvt_from_rows(query_rows(result, "aggregation query"))
+    except Exception as e:
+        logger.error(f"Error generating aggregated MVT tile {z}/{x}/{y}: {str(e)}")
+        raise
+
+def aggregated_tile_mvt_statement(z: int, x: int, y: int, source: Optional[str], layers: Optional[List[str]]) -> Statement:
+    """
+    Build the query of a Mapbox Vector Tile aggregated into grid cells
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Aggregation query statement
+    """
+    args: List[Any] = []
+    query = aggregated_cells_query(z, x, y, source, layers, args)
+    extent, buffer = bind_arg(args, MVT_EXTENT), bind_arg(args, MVT_BUFFER)
+    query += f"""
+    , mvtgeom AS (
+        SELECT
+            cells.feature_type,
+            cells.count,
+            true AS cluster,
+            ST_AsMVTGeom(cells.point, bounds.geom, {extent}, {buffer}, true) AS geom
+        FROM
+            cells, bounds
+    )
+    SELECT
+        ST_AsMVT(mvtgeom.*, feature_type, {extent}, 'geom') AS mvt
+    FROM
+        mvtgeom
+    WHERE
+        geom IS NOT NULL
+    GROUP BY
+        feature_type
+    """
+    
+    return statement_name("tile_cells_mvt", source, layers, [z]), query, args
+
+def query_features_statement(
+    bbox: Tuple[float, float, float, float],
+    layer: Optional[str],
+    limit: Optional[int],
+    zoom: Optional[int],
+    after: Optional[int] = None
+) -> Statement:
+    """
+    Build the query of the features within a bounding box
+    
+    Features come in id order, so a page ends at a keyset cursor (its last
+    id) from which the next page continues without an OFFSET scan.
+    
+    Args:
+        bbox: Bounding box as (minx, miny, maxx, maxy) in EPSG:4326
+        layer: Optional layer name to filter by
+        limit: Maximum number of features to return, or None for all of them
+        zoom: Optional map zoom level selecting the layer payload settings
+        after: Optional keyset cursor; only features with a greater id are returned
+        
+    Returns:
+        Feature query statement
+    """
+    args: List[Any] = [float(value) for value in bbox]
+    
+    # Without a zoom level, results carry the settings of the deepest zoom
+    settings = bind_layer_settings(args, MAX_LAYER_ZOOM if zoom is None else zoom)
+    query = f"""
+    SELECT
+        f.id,
+        f.feature_id,
+        f.feature_type,
+        {layer_properties_sql(settings)} AS properties,
+        ST_AsGeoJSON(f.geometry, {layer_setting_sql(settings, "degree_decimals")}) as geometry,
+        f.source_system,
+        f.is_synced
+    FROM
+        spatial_features f
+    WHERE
+        ST_Intersects(f.geometry, ST_MakeEnvelope($1, $2, $3, $4, 4326))
+    """
+    
+    name = "bbox_features"
+    if layer:
+        query += f" AND f.feature_type = {bind_arg(args, layer)}"
+        name += "_layer"
+    
+    if after is not None:
+        query += f" AND f.id > {bind_arg(args, int(after))}"
+        name += "_after"
+    
+    query += " ORDER BY f.id"
+    
+    if limit is not None:
+        query += f" LIMIT {bind_arg(args, int(limit))}"
+    else:
+        name += "_all"
+    
+    return name, query, args
+
+def feature_json_sql(geometry: str, extra_properties: str = "") -> str:
+    """
+    Build the SQL expression of a GeoJSON feature of spatial_features f
+    
+    The feature's own columns override stored properties of the same name.
+    
+    Args:
+        geometry: SQL expression of the feature's GeoJSON geometry text
+        extra_properties: Additional jsonb_build_object arguments, each prefixed with a comma
         
-        # Add source filter if specified
-        if source:
-            query += f" AND source_system = '{source}'"
+    Returns:
+        SQL expression of type json
+    """
+    return f"""json_build_object(
+        'type', 'Feature',
+        'id', f.feature_id,
+        'properties', COALESCE(f.properties, '{{}}'::jsonb) || jsonb_build_object(
+            'id', f.feature_id,
+            'feature_type', f.feature_type,
+            'source_system', f.source_system,
+            'is_synced', f.is_synced{extra_properties}
+        ),
+        'geometry', ({geometry})::json
+    )"""
+
+def bbox_json_sql(z: int, x: int, y: int, args: List[Any]) -> str:
+    """
+    Build the SQL expression of a tile's bbox as a JSON array
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        args: Query arguments, updated with the bbox values
         
-        # Add layers filter if specified
-        if layers:
-            layers_str = "', '".join(layers)
-            query += f" AND feature_type IN ('{layers_str}')"
+    Returns:
+        SQL expression of type json
+    """
+    values = ", ".join(f"CAST({bind_arg(args, float(value))} AS double precision)" for value in tile_to_bbox(z, x, y))
+    return f"json_build_array({values})"
+
+def raw_feature_collection(features: Optional[str], bbox: Tuple[float, float, float, float]) -> bytes:
+    """
+    Wrap a JSON array of features built by PostGIS in a FeatureCollection
+    
+    Args:
+        features: JSON array text of the features, or None for no features
+        bbox: Bounding box of the collection
+        
+    Returns:
+        Encoded GeoJSON FeatureCollection
+    """
+    return (
+        b'{"type": "FeatureCollection", "features": '
+        + (features or "[]").encode()
+        + b', "bbox": '
+        + json.dumps(list(bbox)).encode()
+        + b"}"
+    )
+
+async def get_vector_tile_json_async(z: int, x: int, y: int, source: Optional[str] = None, layers: Optional[List[str]] = None) -> bytes:
+    """
+    Get a vector tile as GeoJSON text assembled by PostGIS
+    
+    The FeatureCollection is built with json_build_object/json_agg and
+    returned as-is, so no GeoJSON is parsed or re-serialized in Python.
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Encoded GeoJSON FeatureCollection
+    """
+    try:
+        # Dense tiles are aggregated into grid cells to cap payload and DB work
+        if await tile_exceeds_feature_budget_async(z, x, y, source, layers):
+            _, query, args = aggregated_tile_json_statement(z, x, y, source, layers)
+        else:
+            _, query, args = vector_tile_json_statement(z, x, y, source, layers)
         
         # Execute query
-        result = execute_spatial_query(query)
-        
-        if result["status"] != "success":
-            raise Exception(f"Error executing spatial query: {result.get('message')}")
-        
-        # Convert to GeoJSON
-        features = []
-        for row in result["data"]:
-            # Skip if geometry is null or invalid
-            if not row["geometry"]:
-                continue
-                
-            feature = {
-                "type": "Feature",
-                "id": row["feature_id"],
-                "properties": {
-                    **(row["properties"] or {}),
-                    "id": row["feature_id"],
-                    "feature_type": row["feature_type"],
-                    "source_system": row["source_system"],
-                    "is_synced": row["is_synced"]
-                },
-                "geometry": json.loads(row["geometry"])
-            }
-            features.append(feature)
-        
-        return {
-            "type": "FeatureCollection",
-            "features": features,
-            "bbox": bbox
-        }
+        result = await execute_spatial_query_async(query, args)
+        
+        return query_rows(result, "spatial query")[0]["tile"].encode()
     except Exception as e:
         logger.error(f"Error generating vector tile {z}/{x}/{y}: {str(e)}")
         raise
 
-def get_feature_info(feature_id: str) -> Optional[Dict[str, Any]]:
+def vector_tile_json_statement(z: int, x: int, y: int, source: Optional[str], layers: Optional[List[str]]) -> Statement:
     """
-    Get detailed information about a specific feature
+    Build the query of a GeoJSON vector tile assembled by PostGIS
     
     Args:
-        feature_id: ID of the feature
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
         
     Returns:
-        Feature information in GeoJSON format
+        Tile query statement returning one "tile" text column
+    """
+    args: List[Any] = [z, x, y, band_for_zoom(z)]
+    settings = bind_layer_settings(args, z)
+    query = f"""
+    WITH bounds AS (
+        SELECT ST_TileEnvelope($1, $2, $3) AS geom
+    ),
+    clipped AS (
+        SELECT
+            f.feature_id,
+            f.feature_type,
+            {layer_properties_sql(settings)} AS properties,
+            f.source_system,
+            f.is_synced,
+            ST_AsGeoJSON(
+                ST_Intersection(g.geometry, bounds.geom),
+                {layer_setting_sql(settings, "decimals")}
+            ) AS geometry
+        FROM
+            spatial_feature_generalized g
+            JOIN spatial_features f ON f.id = g.feature_id,
+            bounds
+        WHERE
+            g.zoom_band = $4
+            AND ST_Intersects(g.geometry, bounds.geom)
+    """
+    
+    # Add source and layers filters if specified
+    query += tile_filters(source, layers, args, [z])
+    
+    # Assemble the FeatureCollection, skipping null geometries
+    query += f"""
+    )
+    SELECT
+        json_build_object(
+            'type', 'FeatureCollection',
+            'features', COALESCE(json_agg({feature_json_sql("f.geometry")}), '[]'::json),
+            'bbox', {bbox_json_sql(z, x, y, args)}
+        )::text AS tile
+    FROM
+        clipped f
+    WHERE
+        f.geometry IS NOT NULL
+    """
+    
+    return statement_name("tile_geojson_raw", source, layers, [z]), query, args
+
+def aggregated_tile_json_statement(z: int, x: int, y: int, source: Optional[str], layers: Optional[List[str]]) -> Statement:
+    """
+    Build the query of an aggregated GeoJSON vector tile assembled by PostGIS
+    
+    Each grid cell becomes a point feature with the layer's feature count.
+    
+    Args:
+        z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Aggregation query statement returning one "tile" text column
+    """
+    args: List[Any] = []
+    query = aggregated_cells_query(z, x, y, source, layers, args)
+    cell_prefix = bind_arg(args, f"cell_{z}_{x}_{y}_")
+    query += f"""
+    SELECT
+        json_build_object(
+            'type', 'FeatureCollection',
+            'features', COALESCE(json_agg(json_build_object(
+                'type', 'Feature',
+                'id', c.cell_id,
+                'properties', json_build_object(
+                    'id', c.cell_id,
+                    'feature_type', c.feature_type,
+                    'cluster', true,
+                    'count', c.count
+                ),
+                'geometry', ST_AsGeoJSON(c.point)::json
+            )), '[]'::json),
+            'bbox', {bbox_json_sql(z, x, y, args)},
+            'aggregated', true
+        )::text AS tile
+    FROM (
+        SELECT
+            cells.*,
+            CAST({cell_prefix} AS text) || (row_number() OVER () - 1) AS cell_id
+        FROM
+            cells
+    ) c
+    """
+    
+    return statement_name("tile_cells_raw", source, layers, [z]), query, args
+
+async def get_vector_tiles_batch_json_async(
+    tiles: List[Tuple[int, int, int]],
+    source: Optional[str] = None,
+    layers: Optional[List[str]] = None
+) -> Dict[Tuple[int, int, int], bytes]:
+    """
+    Get several vector tiles as GeoJSON text assembled by PostGIS
+    
+    Features are aggregated into one JSON array per tile by the database;
+    Python only wraps each array in its FeatureCollection.
+    
+    Args:
+        tiles: Tile coordinates as (z, x, y)
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Encoded GeoJSON FeatureCollections keyed by (z, x, y)
     """
     try:
-        # Build SQL query
-        query = f"""
-        SELECT 
-            id, 
-            feature_id, 
-            feature_type, 
-            properties, 
-            ST_AsGeoJSON(geometry) as geometry,
-            source_system,
-            is_synced,
-            created_at,
-            updated_at
-        FROM 
-            spatial_features
-        WHERE 
-            feature_id = '{feature_id}'
-        """
+        tiles = list(dict.fromkeys(tiles))
+        results: Dict[Tuple[int, int, int], bytes] = {}
+        
+        # Dense tiles are aggregated into grid cells, like single tiles
+        dense_tiles = set(await tiles_exceeding_feature_budget_async(tiles, source, layers))
+        for z, x, y in dense_tiles:
+            _, query, args = aggregated_tile_json_statement(z, x, y, source, layers)
+            result = await execute_spatial_query_async(query, args)
+            results[(z, x, y)] = query_rows(result, "aggregation query")[0]["tile"].encode()
+        
+        batch_tiles = [tile for tile in tiles if tile not in dense_tiles]
+        if not batch_tiles:
+            return results
+        
+        # Execute one query over all tile envelopes
+        _, query, args = vector_tiles_batch_json_statement(batch_tiles, source, layers)
+        result = await execute_spatial_query_async(query, args)
+        
+        features = {(row["z"], row["x"], row["y"]): row["features"] for row in query_rows(result, "batch tile query")}
+        for z, x, y in batch_tiles:
+            results[(z, x, y)] = raw_feature_collection(features.get((z, x, y)), tile_to_bbox(z, x, y))
+        
+        return results
+    except Exception as e:
+        logger.error(f"Error generating batch of {len(tiles)} vector tiles: {str(e)}")
+        raise
+
+def vector_tiles_batch_json_statement(
+    tiles: List[Tuple[int, int, int]],
+    source: Optional[str],
+    layers: Optional[List[str]]
+) -> Statement:
+    """
+    Build the query of a batch of GeoJSON vector tiles assembled by PostGIS
+    
+    Args:
+        tiles: Tile coordinates as (z, x, y)
+        source: Optional source system filter
+        layers: Optional list of layers to include
+        
+    Returns:
+        Batch tile query statement returning z, x, y and a "features" JSON array text per non-empty tile
+    """
+    zooms = [tile[0] for tile in tiles]
+    args: List[Any] = [
+        zooms,
+        [tile[1] for tile in tiles],
+        [tile[2] for tile in tiles],
+        [band_for_zoom(z) for z in zooms]
+    ]
+    settings = bind_layer_settings_by_zoom(args, zooms, "r.z")
+    query = f"""
+    WITH requested AS (
+        SELECT
+            t.z, t.x, t.y, t.zoom_band,
+            ST_TileEnvelope(t.z, t.x, t.y) AS geom
+        FROM
+            unnest(
+                CAST($1 AS integer[]),
+                CAST($2 AS integer[]),
+                CAST($3 AS integer[]),
+                CAST($4 AS integer[])
+            ) AS t(z, x, y, zoom_band)
+    ),
+    clipped AS (
+        SELECT
+            r.z,
+            r.x,
+            r.y,
+            f.feature_id,
+            f.feature_type,
+            {layer_properties_sql(settings)} AS properties,
+            f.source_system,
+            f.is_synced,
+            ST_AsGeoJSON(
+                ST_Intersection(g.geometry, r.geom),
+                {layer_setting_sql(settings, "decimals")}
+            ) AS geometry
+        FROM
+            requested r
+            JOIN spatial_feature_generalized g
+                ON g.zoom_band = r.zoom_band AND ST_Intersects(g.geometry, r.geom)
+            JOIN spatial_features f ON f.id = g.feature_id
+        WHERE
+            {layer_visible_sql(settings)}
+    """
+    
+    # Add source and layers filters if specified
+    query += tile_filters(source, layers, args, zooms)
+    
+    # One features array per tile, skipping null geometries
+    query += f"""
+    )
+    SELECT
+        f.z,
+        f.x,
+        f.y,
+        json_agg({feature_json_sql("f.geometry")})::text AS features
+    FROM
+        clipped f
+    WHERE
+        f.geometry IS NOT NULL
+    GROUP BY
+        f.z, f.x, f.y
+    """
+    
+    return statement_name("tile_batch_raw", source, layers, zooms), query, args
+
+async def get_feature_info_json_async(feature_id: str) -> Optional[bytes]:
+    """
+    Get a feature as GeoJSON text assembled by PostGIS
+    
+    Args:
+        feature_id: ID of the feature
         
+    Returns:
+        Encoded GeoJSON feature, or None if the feature does not exist
+    """
+    try:
         # Execute query
-        result = execute_spatial_query(query)
-        
-        if result["status"] != "success" or not result["data"]:
-            return None
-        
-        # Get first (and should be only) row
-        row = result["data"][0]
-        
-        # Convert to GeoJSON
-        feature = {
-            "type": "Feature",
-            "id": row["feature_id"],
-            "properties": {
-                **(row["properties"] or {}),
-                "id": row["feature_id"],
-                "feature_type": row["feature_type"],
-                "source_system": row["source_system"],
-                "is_synced": row["is_synced"],
-                "created_at": row["created_at"],
-                "updated_at": row["updated_at"]
-            },
-            "geometry": json.loads(row["geometry"])
-        }
-        
-        return feature
+        _, query, args = feature_info_json_statement(feature_id)
+        result = await execute_spatial_query_async(query, args)
+        
+        rows = query_rows(result, "feature query")
+        return rows[0]["feature"].encode() if rows else None
     except Exception as e:
         logger.error(f"Error getting feature info for {feature_id}: {str(e)}")
         raise
 
+def feature_info_json_statement(feature_id: str) -> Statement:
+    """
+    Build the query of a single feature assembled by PostGIS
+    
+    Args:
+        feature_id: ID of the feature
+        
+    Returns:
+        Feature query statement returning one "feature" text column
+    """
+    query = f"""
+    SELECT
+        {feature_info_json_sql()}::text AS feature
+    FROM
+        spatial_features f
+    WHERE
+        f.feature_id = $1
+    """
+    
+    return "feature_info_raw", query, [feature_id]
+
+def feature_info_json_sql() -> str:
+    """
+    Build the SQL expression of a detailed GeoJSON feature of spatial_features f
+    
+    Returns:
+        SQL expression of type json, with full-precision geometry and timestamps
+    """
+    return feature_json_sql(
+        "ST_AsGeoJSON(f.geometry)",
+        ",\n            'created_at', f.created_at,\n            'updated_at', f.updated_at"
+    )
+
+async def get_features_json_async(
+    feature_ids: List[str],
+    known_versions: Optional[Dict[str, Any]] = None
+) -> List[Tuple[str, Any, Optional[bytes]]]:
+    """
+    Get many features as GeoJSON text assembled by PostGIS in one query
+    
+    Features whose updated_at matches the version the caller already holds
+    come back without their GeoJSON, so cached features cost no payload.
+    
+    Args:
+        feature_ids: IDs of the features
+        known_versions: Optional updated_at of the features the caller holds, by feature ID
+        
+    Returns:
+        (feature_id, updated_at, encoded GeoJSON feature or None if unchanged)
+        for every feature that exists
+    """
+    try:
+        # Execute query
+        _, query, args = features_json_statement(feature_ids, known_versions or {})
+        result = await execute_spatial_query_async(query, args)
+        
+        return [
+            (row["feature_id"], row["updated_at"], row["feature"].encode() if row["feature"] is not None else None)
+            for row in query_rows(result, "feature batch query")
+        ]
+    except Exception as e:
+        logger.error(f"Error getting {len(feature_ids)} features: {str(e)}")
+        raise
+
+def features_json_statement(feature_ids: List[str], known_versions: Dict[str, Any]) -> Statement:
+    """
+    Build the query of many features assembled by PostGIS
+    
+    Args:
+        feature_ids: IDs of the features
+        known_versions: updated_at of the features the caller holds, by feature ID
+        
+    Returns:
+        Feature batch query statement returning "feature_id", "updated_at" and
+        a "feature" text column (NULL when the known version is current)
+    """
+    args: List[Any] = [list(feature_ids), list(known_versions.keys()), list(known_versions.values())]
+    query = f"""
+    SELECT
+        f.feature_id,
+        f.updated_at,
+        CASE
+            WHEN k.feature_id IS NOT NULL AND k.updated_at IS NOT DISTINCT FROM f.updated_at THEN NULL
+            ELSE {feature_info_json_sql()}::text
+        END AS feature
+    FROM
+        spatial_features f
+        LEFT JOIN unnest(CAST($2 AS text[]), CAST($3 AS timestamp[])) AS k(feature_id, updated_at)
+            ON k.feature_id = f.feature_id
+    WHERE
+        f.feature_id = ANY(CAST($1 AS text[]))
+    """
+    
+    return "features_batch_raw", query, args
+
+async def query_features_json_async(
+    bbox: Tuple[float, float, float, float],
+    layer: Optional[str] = None,
+    limit: int = 100,
+    zoom: Optional[int] = None,
+    after: Optional[int] = None
+) -> Tuple[bytes, int, Optional[int]]:
+    """
+    Query a page of features within a bounding box as GeoJSON text assembled by PostGIS
+    
+    Args:
+        bbox: Bounding box as (minx, miny, maxx, maxy) in EPSG:4326
+        layer: Optional layer name to filter by
+        limit: Maximum number of features to return
+        zoom: Optional map zoom level selecting the layer payload settings
+        after: Optional keyset cursor from the previous page
+        
+    Returns:
+        Encoded JSON array of GeoJSON features, the number of features, and
+        the cursor of the next page (None on the last page)
+    """
+    try:
+        # Execute query
+        _, query, args = query_features_json_statement(bbox, layer, limit, zoom, after)
+        result = await execute_spatial_query_async(query, args)
+        
+        row = query_rows(result, "spatial query")[0]
+        next_cursor = row["last_id"] if row["matched"] >= limit else None
+        return row["features"].encode(), row["count"], next_cursor
+    except Exception as e:
+        logger.error(f"Error querying features in {bbox}: {str(e)}")
+        raise
+
+def query_features_json_statement(
+    bbox: Tuple[float, float, float, float],
+    layer: Optional[str],
+    limit: int,
+    zoom: Optional[int],
+    after: Optional[int] = None
+) -> Statement:
+    """
+    Build the query of a page of features within a bounding box assembled by PostGIS
+    
+    Args:
+        bbox: Bounding box as (minx, miny, maxx, maxy) in EPSG:4326
+        layer: Optional layer name to filter by
+        limit: Maximum number of features to return
+        zoom: Optional map zoom level selecting the layer payload settings
+        after: Optional keyset cursor from the previous page
+        
+    Returns:
+        Feature query statement returning a "features" JSON array text, its
+        "count", and the "matched" rows and "last_id" the next page continues from
+    """
+    name, matches, args = query_features_statement(bbox, layer, limit, zoom, after)
+    
+    # Rows without a valid geometry are skipped but still advance the cursor
+    query = f"""
+    SELECT
+        COALESCE(
+            json_agg({feature_json_sql("f.geometry")} ORDER BY f.id) FILTER (WHERE f.geometry IS NOT NULL),
+            '[]'::json
+        )::text AS features,
+        COUNT(*) FILTER (WHERE f.geometry IS NOT NULL) AS count,
+        COUNT(*) AS matched,
+        MAX(f.id) AS last_id
+    FROM (
+        {matches}
+    ) f
+    """
+    
+    return f"{name}_raw", query, args
+
+async def stream_features_ndjson_async(
+    bbox: Tuple[float, float, float, float],
+    layer: Optional[str] = None,
+    limit: Optional[int] = None,
+    zoom: Optional[int] = None,
+    after: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    Stream the features within a bounding box as newline-delimited GeoJSON
+    
+    Features are read through a server-side cursor in id order, so memory
+    stays flat for any result size. Each feature carries a "cursor" member
+    with its keyset cursor, so an interrupted export can resume after the
+    last feature received.
+    
+    Args:
+        bbox: Bounding box as (minx, miny, maxx, maxy) in EPSG:4326
+        layer: Optional layer name to filter by
+        limit: Maximum number of features to return, or None for all of them
+        zoom: Optional map zoom level selecting the layer payload settings
+        after: Optional keyset cursor; only features with a greater id are returned
+        
+    Yields:
+        One encoded GeoJSON feature per line
+    """
+    _, query, args = query_features_ndjson_statement(bbox, layer, limit, zoom, after)
+    async for row in stream_spatial_query_async(query, args):
+        # The feature's "id" is its feature_id; the cursor is the numeric id pages are keyed on
+        yield row["feature"][:-1].encode() + f', "cursor": {row["id"]}}}\n'.encode()
+
+def query_features_ndjson_statement(
+    bbox: Tuple[float, float, float, float],
+    layer: Optional[str],
+    limit: Optional[int],
+    zoom: Optional[int],
+    after: Optional[int] = None
+) -> Statement:
+    """
+    Build the query of the features within a bounding box, one GeoJSON text per row
+    
+    Args:
+        bbox: Bounding box as (minx, miny, maxx, maxy) in EPSG:4326
+        layer: Optional layer name to filter by
+        limit: Maximum number of features to return, or None for all of them
+        zoom: Optional map zoom level selecting the layer payload settings
+        after: Optional keyset cursor; only features with a greater id are returned
+        
+    Returns:
+        Feature query statement returning a "feature" JSON text per row
+    """
+    name, matches, args = query_features_statement(bbox, layer, limit, zoom, after)
+    query = f"""
+    SELECT
+        f.id,
+        {feature_json_sql("f.geometry")}::text AS feature
+    FROM (
+        {matches}
+    ) f
+    WHERE
+        f.geometry IS NOT NULL
+    ORDER BY
+        f.id
+    """
+    
+    return f"{name}_ndjson", query, args
+
 def get_map_layers() -> List[Dict[str, Any]]:
     """
     Get available map layers
@@ -174,103 +1279,69 @@ def get_map_layers() -> List[Dict[str, Any]]:
         List of layer definitions
     """
     try:
-        # Build SQL query to get distinct feature types
-        query = """
-        SELECT 
-            feature_type, 
-            COUNT(*) as count,
-            MIN(ST_XMin(ST_Envelope(geometry))) as min_x,
-            MIN(ST_YMin(ST_Envelope(geometry))) as min_y,
-            MAX(ST_XMax(ST_Envelope(geometry))) as max_x,
-            MAX(ST_YMax(ST_Envelope(geometry))) as max_y
-        FROM 
-            spatial_features
-        GROUP BY 
-            feature_type
-        ORDER BY 
-            feature_type
-        """
-        
-        # Execute query
-        result = execute_spatial_query(query)
-        
-        if result["status"] != "success":
-            raise Exception(f"Error executing layer query: {result.get('message')}")
-        
-        # Convert to layer definitions
-        layers = []
-        for row in result["data"]:
-            layers.append({
-                "id": row["feature_type"],
-                "name": row["feature_type"].replace("_", " ").title(),
-                "count": row["count"],
-                "bounds": [
-                    row["min_x"],
-                    row["min_y"],
-                    row["max_x"],
-                    row["max_y"]
-                ]
-            })
-        
-        return layers
+        # Read the incrementally maintained catalogue stats
+        return catalog_definitions(get_catalog_stats("feature_type"))
     except Exception as e:
         logger.error(f"Error getting map layers: {str(e)}")
         raise
 
-def get_map_sources() -> List[Dict[str, Any]]:
+async def get_map_layers_async() -> List[Dict[str, Any]]:
     """
-    Get available map sources
+    Get available map layers without blocking the event loop
+    
+    Returns:
+        List of layer definitions
+    """
+    try:
+        # Read the incrementally maintained catalogue stats
+        return catalog_definitions(await get_catalog_stats_async("feature_type"))
+    except Exception as e:
+        logger.error(f"Error getting map layers: {str(e)}")
+        raise
+
+async def get_map_sources_async() -> List[Dict[str, Any]]:
+    """
+    Get available map sources without blocking the event loop
     
     Returns:
         List of source definitions
     """
     try:
-        # Build SQL query to get distinct source systems
-        query = """
-        SELECT 
-            source_system, 
-            COUNT(*) as count,
-            MIN(ST_XMin(ST_Envelope(geometry))) as min_x,
-            MIN(ST_YMin(ST_Envelope(geometry))) as min_y,
-            MAX(ST_XMax(ST_Envelope(geometry))) as max_x,
-            MAX(ST_YMax(ST_Envelope(geometry))) as max_y
-        FROM 
-            spatial_features
-        GROUP BY 
-            source_system
-        ORDER BY 
-            source_system
-        """
-        
-        # Execute query
-        result = execute_spatial_query(query)
-        
-        if result["status"] != "success":
-            raise Exception(f"Error executing source query: {result.get('message')}")
-        
-        # Convert to source definitions
-        sources = []
-        for row in result["data"]:
-            sources.append({
-                "id": row["source_system"],
-                "name": row["source_system"].replace("_", " ").title(),
-                "count": row["count"],
-                "bounds": [
-                    row["min_x"],
-                    row["min_y"],
-                    row["max_x"],
-                    row["max_y"]
-                ]
-            })
-        
-        return sources
+        # Read the incrementally maintained catalogue stats
+        return catalog_definitions(await get_catalog_stats_async("source_system"))
     except Exception as e:
         logger.error(f"Error getting map sources: {str(e)}")
         raise
 
-def tile_to_bbox(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+def catalog_definitions(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    Convert tile coordinates to a bounding box
+    Convert catalogue stats rows to layer or source definitions
+    
+    Args:
+        rows: Catalogue stats rows
+        
+    Returns:
+        List of layer or source definitions
+    """
+    definitions = []
+    for row in rows:
+        definitions.append({
+            "id": row["key"],
+            "name": row["key"].replace("_", " ").title(),
+            "count": row["count"],
+            "bounds": [
+                row["min_x"],
+                row["min_y"],
+                row["max_x"],
+                row["max_y"]
+            ]
+        })
+    
+    return definitions
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    """
+    Check whether tile coordinates lie on the Web Mercator tile grid
     
     Args:
         z: Zoom level
@@ -278,31 +1349,22 @@ def tile_to_bbox(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
         y: Tile Y coordinate
         
     Returns:
-        Bounding box as (minx, miny, maxx, maxy)
+        True if the zoom level is supported and x and y lie within it
     """
-    # Use mercantile library to convert tile to bounding box
-    bounds = mercantile.bounds(x, y, z)
-    return (bounds.west, bounds.south, bounds.east, bounds.north)
+    return 0 <= z <= MAX_LAYER_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)
 
-def simplification_factor_for_zoom(z: int) -> float:
+def tile_to_bbox(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
     """
-    Calculate a simplification factor based on zoom level
+    Convert tile coordinates to a bounding box
     
     Args:
         z: Zoom level
+        x: Tile X coordinate
+        y: Tile Y coordinate
         
     Returns:
-        Simplification tolerance
+        Bounding box as (minx, miny, maxx, maxy)
     """
-    # Increase simplification as zoom level decreases
-    # These values can be tuned based on your data
-    if z >= 15:
-        return 0.1  # Minimal simplification at high zoom
-    elif z >= 12:
-        return 1.0
-    elif z >= 9:
-        return 5.0
-    elif z >= 6:
-        return 10.0
-    else:
-        return 20.0  # Maximum simplification at low zoom
+    # Use mercantile library to convert tile to bounding box
+    bounds = mercantile.bounds(x, y, z)
+    return (bounds.west, bounds.south, bounds.east, bounds.north)
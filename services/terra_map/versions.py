@@ -0,0 +1,436 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable, Iterable
+import asyncpg
+from sqlalchemy import text
+
+from services.common.database import get_db_session, postgres_engine, get_postgres_connection_string
+from services.common.models import TileVersion
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Data versions are kept per tile of this zoom level; deeper tiles share the
+# version of their ancestor, shallower tiles derive theirs from their descendants
+TILE_VERSION_ZOOM = int(os.getenv("TILE_VERSION_ZOOM", "12"))
+
+# PostgreSQL channel on which the trigger announces every change of spatial_features
+TILE_VERSION_CHANNEL = "spatial_tile_versions"
+
+# NOTIFY payloads must stay below 8000 bytes
+TILE_VERSION_MAX_NOTICE_BYTES = 7900
+
+# Seconds without a notice after which the listener connection is checked
+TILE_VERSION_PING_INTERVAL = int(os.getenv("TILE_VERSION_PING_INTERVAL", "30"))
+
+# Seconds between attempts to reconnect a lost listener connection
+TILE_VERSION_RECONNECT_DELAY = int(os.getenv("TILE_VERSION_RECONNECT_DELAY", "5"))
+
+# Statement-level triggers bump the version of every tile area a write
+# touches, before and after the change, and announce the change with the
+# extent of each layer involved. Every writer is covered, whatever its path.
+TILE_VERSION_TRIGGER_SQL = """
+CREATE SEQUENCE IF NOT EXISTS spatial_tile_version_seq;
+
+CREATE OR REPLACE FUNCTION spatial_tile_column(lon double precision) RETURNS integer AS $$
+    SELECT LEAST(GREATEST(floor((lon + 180.0) / 360.0 * {tiles}), 0), {tiles} - 1)::integer
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION spatial_tile_row(lat double precision) RETURNS integer AS $$
+    SELECT LEAST(GREATEST(floor(
+        (1.0 - ln(tan(radians(clamped.lat)) + 1.0 / cos(radians(clamped.lat))) / pi()) / 2.0 * {tiles}
+    ), 0), {tiles} - 1)::integer
+    FROM (SELECT LEAST(GREATEST(lat, -85.0511), 85.0511) AS lat) AS clamped
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION record_spatial_tile_versions() RETURNS trigger AS $$
+DECLARE
+    changed_version bigint := nextval('spatial_tile_version_seq');
+    old_layers text[] := ARRAY[]::text[];
+    old_boxes box2d[] := ARRAY[]::box2d[];
+    new_layers text[] := ARRAY[]::text[];
+    new_boxes box2d[] := ARRAY[]::box2d[];
+    notice text;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        UPDATE spatial_tile_versions SET version = GREATEST(version + 1, changed_version), updated_at = now();
+        PERFORM pg_notify('{channel}', json_build_object('version', changed_version, 'flush', true)::text);
+        RETURN NULL;
+    END IF;
+    
+    -- Rows before and after the statement, so features that move or change
+    -- layer dirty both their old and their new place
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT COALESCE(array_agg(feature_type), ARRAY[]::text[]), COALESCE(array_agg(Box2D(geometry)), ARRAY[]::box2d[])
+        INTO old_layers, old_boxes
+        FROM old_rows;
+    END IF;
+    
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT COALESCE(array_agg(feature_type), ARRAY[]::text[]), COALESCE(array_agg(Box2D(geometry)), ARRAY[]::box2d[])
+        INTO new_layers, new_boxes
+        FROM new_rows;
+    END IF;
+    
+    IF cardinality(old_boxes) + cardinality(new_boxes) = 0 THEN
+        RETURN NULL;
+    END IF;
+    
+    -- Versions only ever grow, even when concurrent writers commit out of order
+    INSERT INTO spatial_tile_versions AS v (zoom, x, y, version, updated_at)
+    SELECT DISTINCT {zoom}, tile_x, tile_y, changed_version, now()
+    FROM unnest(old_boxes || new_boxes) AS r(box)
+    CROSS JOIN LATERAL generate_series(spatial_tile_column(ST_XMin(r.box)), spatial_tile_column(ST_XMax(r.box))) AS tile_x
+    CROSS JOIN LATERAL generate_series(spatial_tile_row(ST_YMax(r.box)), spatial_tile_row(ST_YMin(r.box))) AS tile_y
+    ON CONFLICT (zoom, x, y) DO UPDATE SET
+        version = GREATEST(v.version + 1, EXCLUDED.version),
+        updated_at = now();
+    
+    SELECT json_build_object('version', changed_version, 'layers', json_agg(json_build_object(
+        'layer', extents.layer,
+        'bounds', json_build_array(extents.min_x, extents.min_y, extents.max_x, extents.max_y)
+    )))::text
+    INTO notice
+    FROM (
+        SELECT
+            r.layer,
+            MIN(ST_XMin(r.box)) AS min_x, MIN(ST_YMin(r.box)) AS min_y,
+            MAX(ST_XMax(r.box)) AS max_x, MAX(ST_YMax(r.box)) AS max_y
+        FROM unnest(old_layers || new_layers, old_boxes || new_boxes) AS r(layer, box)
+        GROUP BY r.layer
+    ) AS extents;
+    
+    -- Too many layers for one notice: announce their common extent instead
+    IF octet_length(notice) > {max_notice_bytes} THEN
+        SELECT json_build_object('version', changed_version, 'layers', json_build_array(json_build_object(
+            'layer', NULL,
+            'bounds', json_build_array(MIN(ST_XMin(r.box)), MIN(ST_YMin(r.box)), MAX(ST_XMax(r.box)), MAX(ST_YMax(r.box)))
+        )))::text
+        INTO notice
+        FROM unnest(old_boxes || new_boxes) AS r(box);
+    END IF;
+    
+    PERFORM pg_notify('{channel}', notice);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS spatial_features_versions_insert ON spatial_features;
+DROP TRIGGER IF EXISTS spatial_features_versions_update ON spatial_features;
+DROP TRIGGER IF EXISTS spatial_features_versions_delete ON spatial_features;
+DROP TRIGGER IF EXISTS spatial_features_versions_truncate ON spatial_features;
+
+CREATE TRIGGER spatial_features_versions_insert
+AFTER INSERT ON spatial_features
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION record_spatial_tile_versions();
+
+CREATE TRIGGER spatial_features_versions_update
+AFTER UPDATE ON spatial_features
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION record_spatial_tile_versions();
+
+CREATE TRIGGER spatial_features_versions_delete
+AFTER DELETE ON spatial_features
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION record_spatial_tile_versions();
+
+CREATE TRIGGER spatial_features_versions_truncate
+AFTER TRUNCATE ON spatial_features
+FOR EACH STATEMENT EXECUTE FUNCTION record_spatial_tile_versions();
+"""
+
+# First version of every tile area holding features, on a fresh install
+TILE_VERSION_REBUILD_SQL = """
+INSERT INTO spatial_tile_versions (zoom, x, y, version, updated_at)
+SELECT DISTINCT {zoom}, tile_x, tile_y, initial.version, now()
+FROM spatial_features f
+CROSS JOIN (SELECT nextval('spatial_tile_version_seq') AS version) AS initial
+CROSS JOIN LATERAL generate_series(spatial_tile_column(ST_XMin(f.geometry)), spatial_tile_column(ST_XMax(f.geometry))) AS tile_x
+CROSS JOIN LATERAL generate_series(spatial_tile_row(ST_YMax(f.geometry)), spatial_tile_row(ST_YMin(f.geometry))) AS tile_y
+"""
+
+# Every tile version, read when the listener (re)connects
+TILE_VERSIONS_SQL = """
+SELECT x, y, version FROM spatial_tile_versions WHERE zoom = $1
+"""
+
+# Tile versions written by a change or any change committed after it
+CHANGED_TILE_VERSIONS_SQL = """
+SELECT x, y, version FROM spatial_tile_versions WHERE zoom = $1 AND version >= $2
+"""
+
+# Latest version handed out, identifying the data a reconnected listener reloaded
+LATEST_TILE_VERSION_SQL = """
+SELECT last_value FROM spatial_tile_version_seq
+"""
+
+Notice = Dict[str, Any]
+
+def install_tile_versions() -> Dict[str, Any]:
+    """
+    Create the tile version table and triggers, building it on first install
+    
+    Returns:
+        Installation result
+    """
+    try:
+        TileVersion.__table__.create(bind=postgres_engine, checkfirst=True)
+        
+        with get_db_session() as db:
+            db.execute(text(TILE_VERSION_TRIGGER_SQL.format(
+                zoom=TILE_VERSION_ZOOM,
+                tiles=1 << TILE_VERSION_ZOOM,
+                channel=TILE_VERSION_CHANNEL,
+                max_notice_bytes=TILE_VERSION_MAX_NOTICE_BYTES
+            )))
+            
+            # Versions kept at another zoom level no longer match the trigger
+            db.execute(text("DELETE FROM spatial_tile_versions WHERE zoom <> :zoom"), {"zoom": TILE_VERSION_ZOOM})
+            
+            is_empty = db.execute(text("SELECT NOT EXISTS (SELECT 1 FROM spatial_tile_versions)")).scalar()
+            if is_empty:
+                db.execute(text(TILE_VERSION_REBUILD_SQL.format(zoom=TILE_VERSION_ZOOM)))
+            
+            db.commit()
+        
+        logger.info(f"Tile versions installed at zoom {TILE_VERSION_ZOOM}")
+        return {"status": "success", "rebuilt": bool(is_empty)}
+    except Exception as e:
+        logger.error(f"Error installing tile versions: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+def read_tile_versions() -> List[Tuple[int, int, int]]:
+    """
+    Read every tile version from the database
+    
+    Returns:
+        (x, y, version) of the tiles at TILE_VERSION_ZOOM
+    """
+    with get_db_session() as db:
+        rows = db.execute(
+            text("SELECT x, y, version FROM spatial_tile_versions WHERE zoom = :zoom"),
+            {"zoom": TILE_VERSION_ZOOM}
+        ).fetchall()
+    
+    return [(row.x, row.y, row.version) for row in rows]
+
+class TileVersions:
+    """
+    In-process copy of the tile versions kept by the spatial_features trigger
+    
+    Versions of tiles at TILE_VERSION_ZOOM come from the database; every
+    shallower tile holds the sum of its descendants' versions. Versions only
+    grow, so any change below a tile changes its version too, and no version
+    ever comes back. A LISTEN connection applies changes as they commit.
+    """
+    def __init__(self, zoom: int = TILE_VERSION_ZOOM):
+        """
+        Initialize an empty, not yet loaded copy
+        
+        Args:
+            zoom: Zoom level the versions are kept at
+        """
+        self.zoom = zoom
+        self.ready = False
+        self._levels: List[Dict[Tuple[int, int], int]] = [{} for _ in range(zoom + 1)]
+        self._notices: "asyncio.Queue[str]" = asyncio.Queue()
+        self._callbacks: List[Callable[[Notice], Awaitable[None]]] = []
+        self._task: Optional["asyncio.Task"] = None
+    
+    def tile_version(self, z: int, x: int, y: int) -> int:
+        """
+        Get the data version of a tile
+        
+        Args:
+            z: Zoom level
+            x: Tile X coordinate
+            y: Tile Y coordinate
+            
+        Returns:
+            Version, 0 for tiles whose area never held any feature
+        """
+        if z >= self.zoom:
+            shift = z - self.zoom
+            return self._levels[self.zoom].get((x >> shift, y >> shift), 0)
+        
+        return self._levels[z].get((x, y), 0)
+    
+    def dataset_version(self) -> int:
+        """
+        Get the data version of the whole dataset
+        """
+        return self._levels[0].get((0, 0), 0)
+    
+    def add_callback(self, callback: Callable[[Notice], Awaitable[None]]):
+        """
+        Call a coroutine function with every change notice once it is applied
+        
+        Notices carry "version" and per-layer "layers" extents, or "flush"
+        when changes may have been missed and everything must be reloaded.
+        
+        Args:
+            callback: Coroutine function taking the notice
+        """
+        self._callbacks.append(callback)
+    
+    def _apply(self, x: int, y: int, version: int):
+        """
+        Raise the version of one tile and of all its ancestors
+        
+        Args:
+            x, y: Tile coordinates at the maximum zoom level
+            version: New data version
+        """
+        increase = version - self._levels[self.zoom].get((x, y), 0)
+        if increase <= 0:
+            return
+        
+        for z in range(self.zoom, -1, -1):
+            shift = self.zoom - z
+            level = self._levels[z]
+            tile = (x >> shift, y >> shift)
+            level[tile] = level.get(tile, 0) + increase
+    
+    def replace(self, rows: Iterable[Tuple[int, int, int]]):
+        """
+        Replace every version
+        
+        Args:
+            rows: (x, y, version) of the tiles at the version zoom level
+        """
+        current = self._levels
+        self._levels = [{} for _ in range(self.zoom + 1)]
+        try:
+            for x, y, version in rows:
+                self._apply(x, y, version)
+        except Exception:
+            self._levels = current
+            raise
+        
+        self.ready = True
+    
+    async def _reload(self, connection: asyncpg.Connection):
+        """
+        Replace every version with the ones stored in the database
+        
+        Args:
+            connection: Database connection
+        """
+        rows = await connection.fetch(TILE_VERSIONS_SQL, self.zoom)
+        self.replace((row["x"], row["y"], row["version"]) for row in rows)
+        logger.info(f"Loaded {len(rows)} tile versions")
+    
+    async def _connect(self) -> asyncpg.Connection:
+        """
+        Open the listener connection and load the versions
+        
+        Listening starts before loading, so no change can fall in between.
+        """
+        connection = await asyncpg.connect(get_postgres_connection_string())
+        try:
+            await connection.add_listener(
+                TILE_VERSION_CHANNEL,
+                lambda _connection, _pid, _channel, payload: self._notices.put_nowait(payload)
+            )
+            await self._reload(connection)
+            return connection
+        except Exception:
+            await connection.close()
+            raise
+    
+    async def start(self):
+        """
+        Load the versions and keep them current in the background
+        
+        If the database is unreachable, tiles are served uncached until
+        the listener manages to connect.
+        """
+        connection = None
+        try:
+            connection = await self._connect()
+        except Exception as e:
+            logger.error(f"Error loading tile versions: {str(e)}")
+        
+        self._task = asyncio.create_task(self._listen(connection))
+    
+    async def stop(self):
+        """
+        Stop listening for changes
+        """
+        if self._task:
+            self._task.cancel()
+            self._task = None
+    
+    async def _listen(self, connection: Optional[asyncpg.Connection]):
+        """
+        Apply change notices, reconnecting whenever the connection is lost
+        
+        Args:
+            connection: Database connection
+        """
+        while True:
+            if connection is None:
+                await asyncio.sleep(TILE_VERSION_RECONNECT_DELAY)
+                try:
+                    connection = await self._connect()
+                except Exception as e:
+                    logger.error(f"Error reconnecting tile version listener: {str(e)}")
+                    continue
+                
+                # Changes made while disconnected were never announced; every
+                # worker reconnecting to the same data sends the same version
+                try:
+                    version = await connection.fetchval(LATEST_TILE_VERSION_SQL)
+                except Exception as e:
+                    logger.error(f"Error reading the latest tile version: {str(e)}")
+                    await connection.close()
+                    connection = None
+                    continue
+                await self._notify({"version": version, "flush": True})
+            
+            try:
+                while True:
+                    try:
+                        payload = await asyncio.wait_for(self._notices.get(), TILE_VERSION_PING_INTERVAL)
+                    except asyncio.TimeoutError:
+                        await connection.execute("SELECT 1")
+                        continue
+                    
+                    notice = json.loads(payload)
+                    if notice.get("flush"):
+                        await self._reload(connection)
+                    else:
+                        rows = await connection.fetch(CHANGED_TILE_VERSIONS_SQL, self.zoom, notice["version"])
+                        for row in rows:
+                            self._apply(row["x"], row["y"], row["version"])
+                    
+                    await self._notify(notice)
+            except asyncio.CancelledError:
+                await connection.close()
+                raise
+            except Exception as e:
+                logger.error(f"Error in tile version listener: {str(e)}")
+                try:
+                    await connection.close()
+                except Exception:
+                    pass
+                connection = None
+    
+    async def _notify(self, notice: Notice):
+        """
+        Pass an applied notice on to the callbacks
+        
+        Args:
+            notice: Applied change notice
+        """
+        for callback in self._callbacks:
+            try:
+                await callback(notice)
+            except Exception as e:
+                logger.error(f"Error handling tile change notice: {str(e)}")
+
+# Tile versions shared by the TerraMap service
+tile_versions = TileVersions()